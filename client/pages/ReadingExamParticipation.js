@@ -203,6 +203,14 @@ function AnswerSheet({ sessionDetails, progress, saveProgress, isVisible }) {
                 console.log('answer submitted', r)
                 setSubmissionDetails(r.data)
                 setSubmissionCompleteDialogVisible(true)
+                if (r.data.feedbackStatus === 'pending') {
+                  // the feedback is generated in the background, show it once it is ready
+                  Remote.waitForJob(r.data.feedbackJobId).then(j => {
+                    if (j.status && j.data.status === 'succeeded') {
+                      setSubmissionDetails(j.data.result)
+                    }
+                  })
+                }
               } else {
                 setMessage(r.message)
               }
@@ -229,7 +237,7 @@ function AnswerSheet({ sessionDetails, progress, saveProgress, isVisible }) {
               <Text variant="titleMedium">反馈: </Text>
               <ScrollView style={{ height: 200 }} contentInsetAdjustmentBehavior="automatic">
                 <Markdown style={theme}>
-                  {submissionDetails ? submissionDetails.feedback : ''}
+                  {submissionDetails ? (submissionDetails.feedbackStatus !== 'ready' ? '反馈生成中，请稍候...' : submissionDetails.feedback) : ''}
                 </Markdown>
               </ScrollView>
             </View>
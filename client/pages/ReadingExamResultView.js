@@ -86,7 +86,7 @@ export default function ReadingExamResultView({ navigation, route }) {
               <Text variant="titleMedium">反馈：</Text>
             </Text>
             <Markdown style={{ padding: 10 }} contentInsetAdjustmentBehavior="automatic" style={mkedTheme}>
-              {examResult.feedback}
+              {examResult.feedbackStatus !== 'ready' ? '反馈生成中，请稍后刷新查看。' : examResult.feedback}
             </Markdown>
           </Card.Content>
         </Card>
@@ -128,13 +128,16 @@ function AnswerSheet({ sessionDetails, setProgress, progress }) {
             // TODO: send answer to server
             setSubmissionSent(true)
             Remote.finalizeWritingExamSession(sessionDetails.sessionId, text).then(r => {
+              // the answer is graded in the background, wait for the grading job
+              return r.status ? Remote.waitForJob(r.data.jobId) : r
+            }).then(r => {
               setSubmissionSent(false)
-              if (r.status) {
+              if (r.status && r.data.status === 'succeeded') {
                 console.log('answer submitted', r)
-                setSubmissionDetails(r.data)
+                setSubmissionDetails(r.data.result)
                 setSubmissionCompleteDialogVisible(true)
               } else {
-                setMessage(r.message)
+                setMessage(r.status ? r.data.error : r.message)
               }
             })
           }}>提交并结束考试</Button>
@@ -188,6 +188,24 @@ function finalizeReadingExamSession(sessionId, answer = undefined) {
   })
 }
 
+function getJobStatus(jobId) {
+  return axios.post(`${serverUrl}/api/v1/job/status`, {
+    jobId
+  }).then(r => {
+    return r.data
+  })
+}
+
+// poll a background job until it succeeded or failed
+function waitForJob(jobId, interval = 2000) {
+  return getJobStatus(jobId).then(r => {
+    if (!r.status || r.data.status === 'succeeded' || r.data.status === 'failed') {
+      return r
+    }
+    return new Promise(resolve => setTimeout(resolve, interval)).then(() => waitForJob(jobId, interval))
+  })
+}
+
 function getWritingExamResult(id) {
   return axios.post(`${serverUrl}/api/v1/exam_result/writing/get`, {
     id
@@ -266,6 +284,8 @@ export {
   updateReadingExamSessionAnswer,
   finalizeWritingExamSession,
   finalizeReadingExamSession,
+  getJobStatus,
+  waitForJob,
   getWritingExamResult,
   getReadingExamResult,
   getReadingExamResultList,
@@ -9,65 +9,175 @@ import chatModel
 import io
 import time
 import os
+import tools
+import functools
 
 app = flask.Flask(__name__)
 flask_cors.CORS(app)
 # set secret
 app.secret_key = data.config.SECRET_KEY
+# grade submitted exams in the background
+DataProvider.jobQueue.start()
 
 
-def parseRequestRange(s, flen):
-    s = s[s.find('=')+1:]
-    c = s.split('-')
-    if len(c) != 2:
-        return None
-    else:
-        if c[0] == '' and c[1] == '':
-            return [0, flen - 1]
-        elif c[1] == '':
-            return [int(c[0]), flen - 1]
-        elif c[0] == '':
-            return [flen - int(c[1]) - 1, flen - 1]
-        else:
-            return [int(i) for i in c]
-
-
-def makeFileResponse(file: bytes, mime: str):
-    isPreview = not mime.startswith('application')
-    if flask.request.headers.get('Range') != None:
-        fileLength = len(file)
-        reqRange = parseRequestRange(
-            flask.request.headers.get('Range'), fileLength)
-
-        response_file = bytes()
+def parseRequestRange(s: str, flen: int) -> list[tuple[int, int]] | None:
+    """
+    Parse a `Range: bytes=...` header into inclusive byte ranges, e.g. `bytes=0-99, 200-, -500`.
 
-        response_file = file[reqRange[0]:reqRange[1]
-                             if reqRange[0] != reqRange[1] else reqRange[1] + 1]
+    Args:
+        s (str): The value of the Range header.
+        flen (int): The length of the file.
 
-        response = flask.make_response(response_file)
-        response.headers['Accept-Ranges'] = 'bytes'
-        response.headers['Content-Range'] = 'bytes ' + \
-            str(reqRange[0]) + '-' + \
-            str(reqRange[1]) + '/' + str(fileLength)
-        response.headers['Content-Type'] = mime
-        if response.headers['Content-Type'].startswith('application'):
-            response.headers['Content-Disposition'] = "attachment;"
+    Returns:
+        list[tuple[int, int]] | None: The satisfiable ranges, an empty list if none of them are satisfiable, or None if the header is malformed and should be ignored.
+    """
+    unit, _, spec = s.partition('=')
+    if unit.strip().lower() != 'bytes':
+        return None
 
-        response.status_code = 206
+    ranges = []
+    for part in spec.split(','):
+        start, sep, end = part.strip().partition('-')
+        if sep != '-' or not (start.isdigit() or start == '') or not (end.isdigit() or end == '') or start == end == '':
+            return None
+        if start == '':
+            # suffix range, the last N bytes
+            if int(end) == 0 or flen == 0:
+                continue
+            ranges.append((max(flen - int(end), 0), flen - 1))
+        else:
+            if end != '' and int(end) < int(start):
+                return None
+            if int(start) >= flen:
+                continue
+            ranges.append((int(start), flen - 1 if end == '' else min(int(end), flen - 1)))
+    return ranges
+
+
+def streamFileRanges(file: typing.BinaryIO, ranges: list[tuple[int, int]], chunkSize: int, separators: list[bytes] = None) -> typing.Generator[bytes, None, None]:
+    """
+    Read the byte ranges of the file chunk by chunk, closing it once done.
+
+    Args:
+        file (typing.BinaryIO): The seekable file to read.
+        ranges (list[tuple[int, int]]): The inclusive byte ranges to read.
+        chunkSize (int): The maximum size of each chunk.
+        separators (list[bytes], optional): The bytes yielded before each range and after the last one, used by multipart responses. Defaults to None.
+
+    Yields:
+        bytes: The next chunk.
+    """
+    try:
+        for i, (start, end) in enumerate(ranges):
+            if separators is not None:
+                yield separators[i]
+            file.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = file.read(min(chunkSize, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        if separators is not None:
+            yield separators[-1]
+    finally:
+        file.close()
+
+
+def getPagination() -> dict[str, typing.Any] | None:
+    """
+    Get the pagination options (`cursor`, `limit`, `count`) of a list request from its JSON body.
+    """
+    form = flask.request.get_json(silent=True)
+    return form.get('pagination') if isinstance(form, dict) else None
+
+
+def getPrincipal() -> dict[str, typing.Any] | None:
+    """
+    Get the principal of the logged in user, resolved at most once per request and kept in `flask.g`.
+    """
+    if 'principal' not in flask.g:
+        flask.g.principal = DataProvider.getPrincipal(flask.session['userAuth']) if 'userAuth' in flask.session else None
+    return flask.g.principal
+
+
+def hasPermission(permission: str) -> dict[str, typing.Any]:
+    """
+    Check if the logged in user has the permission.
+    """
+    return DataProvider.checkPrincipalPermission(getPrincipal(), permission)
+
+
+def requirePermission(permission: str | None = None):
+    """
+    Route decorator rejecting requests of users who are not logged in, or who lack the permission.
+
+    Args:
+        permission (str | None, optional): The required permission, only a login is required if None. Defaults to None.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if 'userAuth' not in flask.session:
+                return DataProvider.makeResult(False, 'Please login first.')
+            if permission is not None:
+                perm_result = hasPermission(permission)
+                if not perm_result['status']:
+                    return perm_result
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def makeFileResponse(file: bytes | typing.BinaryIO, mime: str):
+    """
+    Stream a file to the client, honoring single, multiple and suffix byte ranges.
+    Only the requested bytes are read, at most `FILE_RESPONSE_CHUNK_SIZE` bytes at a time.
+
+    Args:
+        file (bytes | typing.BinaryIO): The content, or a seekable file object which is closed once the response is done.
+        mime (str): The MIME type of the content.
+    """
+    if isinstance(file, bytes):
+        file = io.BytesIO(file)
+    file.seek(0, os.SEEK_END)
+    fileLength = file.tell()
+    chunkSize = data.config.FILE_RESPONSE_CHUNK_SIZE
+
+    reqRange = parseRequestRange(flask.request.headers['Range'], fileLength) if 'Range' in flask.request.headers else None
+    if reqRange is None:
+        response = flask.Response(streamFileRanges(file, [(0, fileLength - 1)], chunkSize), status=200, mimetype=mime)
+        response.headers['Content-Length'] = str(fileLength)
+    elif len(reqRange) == 0:
+        file.close()
+        response = flask.Response(status=416)
+        response.headers['Content-Range'] = f'bytes */{fileLength}'
         return response
-
-    return flask.send_file(io.BytesIO(file), as_attachment=not isPreview, mimetype=mime)
-
-
-@app.before_request
-def before_request():
-    if DataProvider.getGoogleApiKey() is not None:
-        chatModel.genai.configure(api_key=DataProvider.getGoogleApiKey())
+    elif len(reqRange) == 1:
+        start, end = reqRange[0]
+        response = flask.Response(streamFileRanges(file, reqRange, chunkSize), status=206, mimetype=mime)
+        response.headers['Content-Range'] = f'bytes {start}-{end}/{fileLength}'
+        response.headers['Content-Length'] = str(end - start + 1)
+    else:
+        boundary = tools.RandomHashProvider()
+        separators = [f'\r\n--{boundary}\r\nContent-Type: {mime}\r\nContent-Range: bytes {start}-{end}/{fileLength}\r\n\r\n'.encode() for start, end in reqRange]
+        separators[0] = separators[0][2:]
+        separators.append(f'\r\n--{boundary}--\r\n'.encode())
+        response = flask.Response(streamFileRanges(file, reqRange, chunkSize, separators), status=206, content_type=f'multipart/byteranges; boundary={boundary}')
+        response.headers['Content-Length'] = str(sum(len(i) for i in separators) + sum(end - start + 1 for start, end in reqRange))
+
+    # closes the file when the client goes away before the stream has started
+    response.call_on_close(file.close)
+    response.headers['Accept-Ranges'] = 'bytes'
+    if mime.startswith('application'):
+        response.headers['Content-Disposition'] = "attachment;"
+    return response
 
 
 @app.after_request
 def after_request(response):
-    DataProvider.db.db.commit()
+    DataProvider.db.commit()
     return response
 
 @app.route('/v1/service/info', methods=['GET'])
@@ -77,7 +187,7 @@ def service_status():
         'version': data.config.VERSION,
         'buildNumber': data.config.BUILD_NUMBER,
         'authenticated_session': flask.session.get('userAuth') if 'userAuth' in flask.session else -1,
-        'initialized': DataProvider.checkIfInitialized(),
+        'initialized': DataProvider.isInitialized(),
         "authorized_organization": data.config.AUTHORIZED_ORGANIZATION,
     }
     
@@ -99,9 +209,8 @@ def initialize():
     
 
 @app.route('/v1/user/info', methods=['POST'])
+@requirePermission()
 def get_current_user_info():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
     userId = flask.session['userAuth']
     return DataProvider.makeResult(True, DataProvider.getUserInfoByID(userId))
 
@@ -140,93 +249,66 @@ def logout():
 
 
 @app.route('/v1/user/info', methods=['POST'])
+@requirePermission()
 def get_user_info():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
     return DataProvider.makeResult(True, DataProvider.getUserInfoByID(userId))
 
 
 @app.route('/v1/user/avatar', methods=['GET'])
+@requirePermission()
 def get_user_avatar_by_id():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
-    data, mime =  DataProvider.getUserAvatarByID(userId)
-    if data:
-        return makeFileResponse(data, mime)
+    avatar = DataProvider.openUserAvatarByID(userId)
+    if avatar:
+        return makeFileResponse(*avatar)
     else:
         return DataProvider.makeResult(False, 'User avatar not found.')
 
 
 @app.route('/v1/user/<int:userId>/avatar', methods=['GET'])
+@requirePermission()
 def get_user_avatar_by_id_admin(userId):
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-
-    data, mime =  DataProvider.getUserAvatarByID(userId)
-    if data:
-        return makeFileResponse(data, mime)
+    avatar = DataProvider.openUserAvatarByID(userId)
+    if avatar:
+        return makeFileResponse(*avatar)
     else:
         return DataProvider.makeResult(False, 'User avatar not found.')
 
 
 @app.route('/v1/user/<int:userId>/info', methods=['POST'])
+@requirePermission()
 def get_user_info_id(userId):
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     return DataProvider.makeResult(True, DataProvider.getUserInfoByID(userId, True))
 
 
 @app.route('/v1/user/recent_results', methods=['POST'])
+@requirePermission()
 def get_recent_results():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
     return DataProvider.getRecentExamResults(userId)
 
 @app.route('/v1/user/exam_results', methods=['POST'])
+@requirePermission()
 def get_exam_results():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
     filters = flask.request.json
     examType = filters.get('examType')
     
     
 @app.route('/v1/admin/exams/reading/list', methods=['POST'])
+@requirePermission('new_exam_paper_creat')
 def get_reading_exams():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'new_exam_paper_creat')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     filters = form.get('filters')
     if not filters:
         return DataProvider.makeResult(False, 'Filters are required.')
     
-    return DataProvider.getAllReadingExams(filters)
+    return DataProvider.getAllReadingExams(filters, getPagination())
         
         
 @app.route('/v1/admin/exams/reading/delete', methods=['POST'])  
+@requirePermission('new_exam_paper_creat')
 def delete_reading_exam():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'new_exam_paper_creat')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     examId = form.get('examId')
     if not examId:
@@ -236,28 +318,14 @@ def delete_reading_exam():
 
 
 @app.route('/v1/admin/config/get', methods=['POST'])
+@requirePermission('administrator')
 def get_config():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     return json.loads(json.dumps(DataProvider.getConfig(), default=lambda x: None))
 
 
 @app.route('/v1/admin/config/update', methods=['POST'])
+@requirePermission('administrator')
 def update_config():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     formerConfig = DataProvider.getConfig()['data']
     
     form: dict[str, typing.Any] = flask.request.json
@@ -286,8 +354,7 @@ def ask_ai():
     if system_prompt is None or user_prompt is None or not token:
         return DataProvider.makeResult(ok=False, data='System prompt, user prompt and Google API key is required.')
     else:
-        chatModel.genai.configure(api_key=token)
-        instance = chatModel.ChatGoogleGenerativeAI(model, temperature, system_prompt)
+        instance = chatModel.ChatGoogleGenerativeAI(model, temperature, system_prompt=system_prompt, api_key=token)
         return DataProvider.makeResult(ok=True, data={
             'answer': instance.initiate([user_prompt]),
             'temperature': temperature,
@@ -298,15 +365,8 @@ def ask_ai():
 
 
 @app.route('/v1/admin/generate_answer_sheet', methods=['POST'])
+@requirePermission('new_exam_paper_creat')
 def generate_answer_sheet():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'new_exam_paper_creat')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     examPaper = form.get('examPaper')
     if not examPaper:
@@ -315,8 +375,7 @@ def generate_answer_sheet():
         prompt = chatModel.Prompt(data.config.PROMPT_FOR_ANSWER_SHEET_GENERATION, {
             'examPaper': examPaper
         })
-        model = chatModel.ChatGoogleGenerativeAI('gemini-2.0-flash-thinking-exp-01-21', 0.9)
-        resp = model.initiate([prompt])
+        resp = chatModel.CompletePrompt('gemini-2.0-flash-thinking-exp-01-21', 0.9, prompt, data.config.LLM_CACHE_TTL, lambda r: '[/answer_sheet_format]' in r)
         answer_sheet_format = resp[resp.rfind('[answer_sheet_format]') + 22: resp.rfind('[/answer_sheet_format]')]
         print(resp, '\n', answer_sheet_format)
         try:
@@ -327,15 +386,8 @@ def generate_answer_sheet():
 
 
 @app.route('/v1/admin/users/create', methods=['POST'])
+@requirePermission('administrator')
 def create_user_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     username = form.get('username')
     password = form.get('password')
@@ -351,14 +403,9 @@ def create_user_admin():
         return DataProvider.createUser(username, password, email, oralExamQuota, oralExamViewQuota, permissions)
         
 @app.route('/v1/admin/users/delete', methods=['POST'])
+@requirePermission('administrator')
 def delete_user_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
     
     form: dict[str, typing.Any] = flask.request.json
     userId = form.get('userId')
@@ -369,14 +416,9 @@ def delete_user_admin():
         
         
 @app.route('/v1/admin/users/update', methods=['POST'])
+@requirePermission('administrator')
 def update_user_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
     
     form: dict[str, typing.Any] = flask.request.json
     username = form.get('username')
@@ -395,10 +437,8 @@ def update_user_admin():
     
     
 @app.route('/v1/user/update_password', methods=['POST'])
+@requirePermission()
 def edit_password():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
     form: dict[str, typing.Any] = flask.request.json
     oldPassword = form.get('oldPassword')
@@ -413,10 +453,8 @@ def edit_password():
         
         
 @app.route('/v1/user/update_email', methods=['POST'])
+@requirePermission()
 def edit_email():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']    
     form: dict[str, typing.Any] = flask.request.json
     newEmail = form.get('newEmail')
@@ -427,10 +465,8 @@ def edit_email():
     
     
 @app.route('/v1/user/update_username', methods=['POST'])
+@requirePermission()
 def edit_username():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
     form: dict[str, typing.Any] = flask.request.json
     newUsername = form.get('newUsername')
@@ -441,32 +477,20 @@ def edit_username():
         
         
 @app.route('/v1/admin/users/list', methods=['POST'])
+@requirePermission('administrator')
 def get_users():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     filters = form.get('filters')
     if filters is None:
         return DataProvider.makeResult(False, 'Filters are required.')
     
-    return DataProvider.makeResult(True, DataProvider.getUsers(filters))
+    return DataProvider.getUsers(filters, getPagination())
 
 
 @app.route('/v1/artifact/create', methods=['POST'])
+@requirePermission('artifact_rw')
 def upload_artifact():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'artifact_rw')
-    if not perm_result['status']:
-        return perm_result
     
     args = flask.request.args
     isPrivate = args.get('isPrivate')
@@ -485,14 +509,9 @@ def upload_artifact():
 
 
 @app.route('/v1/artifact/get')
+@requirePermission('artifact_rw')
 def download_artifact():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'artifact_rw')
-    if not perm_result['status']:
-        return perm_result
     
     artifactId = flask.request.args.get('id')
     if artifactId is None:
@@ -501,21 +520,19 @@ def download_artifact():
         artifact = DataProvider.getArtifactById(artifactId)
         if artifact is None:
             return DataProvider.makeResult(False, 'Artifact not found.')
-        if artifact['userId'] != userId and DataProvider.checkIfUserHasPermission(userId, 'administrator')['status'] == False:
+        if artifact['userId'] != userId and hasPermission('administrator')['status'] == False:
             return DataProvider.makeResult(False, 'You do not have permission to access this artifact.')
         
-        return makeFileResponse(DataProvider.getArtifactContentById(artifactId), artifact['mimetype'])
+        content = DataProvider.openArtifactContentById(artifactId)
+        if content is None:
+            return DataProvider.makeResult(False, 'Artifact content not found.')
+        return makeFileResponse(content, artifact['mimetype'])
 
     
 @app.route('/v1/artifact/list', methods=['POST'])
+@requirePermission('artifact_rw')
 def get_artifacts():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'artifact_rw')
-    if not perm_result['status']:
-        return perm_result
     
     form: dict[str, typing.Any] = flask.request.json
     filters = form.get('filters')
@@ -524,19 +541,12 @@ def get_artifacts():
     
     filters['userId'] = userId
     
-    return DataProvider.makeResult(True, DataProvider.getArtifacts(filters))
+    return DataProvider.getArtifacts(filters, getPagination())
 
 
 @app.route('/v1/artifact/delete', methods=['POST'])
+@requirePermission('artifact_rw')
 def delete_artifact():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'artifact_rw')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     artifactId = form.get('artifactId')
     if artifactId is None:
@@ -546,33 +556,19 @@ def delete_artifact():
     
     
 @app.route('/v1/admin/artifact/list', methods=['POST'])
+@requirePermission('administrator')
 def get_artifacts_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     filters = form.get('filters')
     if filters is None:
         return DataProvider.makeResult(False, 'Filters are required.')
     
-    return DataProvider.makeResult(True, DataProvider.getArtifacts(filters))
+    return DataProvider.getArtifacts(filters, getPagination())
 
 
 @app.route('/v1/admin/artifact/delete', methods=['POST'])
+@requirePermission('administrator')
 def delete_artifacts_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     artifactId = form.get('artifactId')
     if artifactId is None:
@@ -582,15 +578,8 @@ def delete_artifacts_admin():
     
 
 @app.route('/v1/admin/artifact/get')
+@requirePermission('administrator')
 def download_artifacts_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')    
-    if not perm_result['status']:
-        return perm_result
-    
     artifactId = flask.request.args.get('id')
     if artifactId is None:
         return DataProvider.makeResult(False, 'Artifact ID is required.')
@@ -599,50 +588,56 @@ def download_artifacts_admin():
         if artifact is None:
             return DataProvider.makeResult(False, 'Artifact not found.')
         
-        return makeFileResponse(DataProvider.getArtifactContentById(artifactId), artifact['mimetype'])
+        content = DataProvider.openArtifactContentById(artifactId)
+        if content is None:
+            return DataProvider.makeResult(False, 'Artifact content not found.')
+        return makeFileResponse(content, artifact['mimetype'])
     
     
 @app.route('/v1/admin/artifact/delete_outdated', methods=['POST'])
+@requirePermission('administrator')
 def delete_outdated_artifacts():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     return DataProvider.deleteAllOutdatedArtifacts()
 
 
+@app.route('/v1/admin/database/statement_cache', methods=['POST'])
+@requirePermission('administrator')
+def get_statement_cache_stats():
+    return DataProvider.getStatementCacheStats()
+
+
+@app.route('/v1/admin/judgers/stats', methods=['POST'])
+@requirePermission('administrator')
+def get_judger_stats():
+    return DataProvider.getJudgerStats()
+
+
+@app.route('/v1/admin/llm_cache/stats', methods=['POST'])
+@requirePermission('administrator')
+def get_llm_cache_stats():
+    return DataProvider.makeResult(True, chatModel.responseCache.stats())
+
+
+@app.route('/v1/admin/llm_models/stats', methods=['POST'])
+@requirePermission('administrator')
+def get_llm_model_stats():
+    return DataProvider.makeResult(True, chatModel.modelRegistry.stats())
+
+
 @app.route('/v1/admin/examination/reading/list', methods=['POST'])
+@requirePermission('administrator')
 def get_examination_list_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     filters = form.get('filters')
     if filters is None:
         return DataProvider.makeResult(False, 'Filters are required.')
     
-    return DataProvider.makeResult(True, DataProvider.getAllReadingExams(filters))
+    return DataProvider.getAllReadingExams(filters, getPagination())
 
 
 @app.route('/v1/admin/examination/reading/delete', methods=['POST'])
+@requirePermission('administrator')
 def delete_examination_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     examId = form.get('examId')
     if examId is None:
@@ -652,14 +647,9 @@ def delete_examination_admin():
     
     
 @app.route('/v1/admin/examination/reading/create', methods=['POST'])
+@requirePermission('administrator')
 def create_examination_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
     
     form = flask.request.json
     passages = form.get('passages')
@@ -683,15 +673,8 @@ def create_examination_admin():
 
 
 @app.route('/v1/admin/examination/reading/update', methods=['POST'])
+@requirePermission('administrator')
 def update_examination_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form = flask.request.json
     examId = form.get('examId')
     passages = form.get('articles')
@@ -715,15 +698,8 @@ def update_examination_admin():
 
 
 @app.route('/v1/admin/examination/reading/get', methods=['POST'])
+@requirePermission('administrator')
 def get_examination_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     examId = form.get('examId')
     if examId is None:
@@ -733,33 +709,19 @@ def get_examination_admin():
     
 
 @app.route('/v1/admin/examination/writing/list', methods=['POST'])
+@requirePermission('administrator')
 def get_writing_exam_list_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     filters = form.get('filters')
     if filters is None:
         return DataProvider.makeResult(False, 'Filters are required.')
     
-    return DataProvider.makeResult(True, DataProvider.getWritingExams(filters))
+    return DataProvider.getWritingExams(filters, getPagination())
 
 
 @app.route('/v1/admin/examination/writing/delete', methods=['POST'])
+@requirePermission('administrator')
 def delete_writing_exam_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     examId = form.get('examId')
     if examId is None:
@@ -768,14 +730,9 @@ def delete_writing_exam_admin():
         return DataProvider.deleteWritingExam(examId)
 
 @app.route('/v1/admin/examination/writing/create', methods=['POST'])
+@requirePermission('administrator')
 def create_writing_exam_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
     
     form = flask.request.json
     title = form.get('title')
@@ -799,15 +756,8 @@ def create_writing_exam_admin():
         
         
 @app.route('/v1/admin/examination/writing/get', methods=['POST'])
+@requirePermission('administrator')
 def get_writing_exam_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     examId = form.get('examId')
     if examId is None:
@@ -818,15 +768,8 @@ def get_writing_exam_admin():
 
 
 @app.route('/v1/admin/examination/writing/update', methods=['POST'])
+@requirePermission('administrator')
 def update_writing_exam_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form = flask.request.json
     examId = form.get('examId')
     title = form.get('title')
@@ -850,33 +793,19 @@ def update_writing_exam_admin():
 
 
 @app.route('/v1/admin/examination/oral/list', methods=['POST'])
+@requirePermission('administrator')
 def get_oral_exam_list_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     filters = form.get('filters')
     if filters is None:
         return DataProvider.makeResult(False, 'Filters are required.')
     
-    return DataProvider.makeResult(True, DataProvider.getAllOralExams(filters))
+    return DataProvider.getAllOralExams(filters, getPagination())
 
 
 @app.route('/v1/admin/examination/oral/delete', methods=['POST'])
+@requirePermission('administrator')
 def delete_oral_exam_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     examId = form.get('examId')
     if examId is None:
@@ -885,26 +814,14 @@ def delete_oral_exam_admin():
         return DataProvider.deleteOralExam(examId)
 
 @app.route('/v1/admin/examination/oral/create/get_preferred_topics')
+@requirePermission('administrator')
 def get_preferred_topics_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     return DataProvider.makeResult(True, data.config.PREFERRED_ORAL_EXAM_TOPICS)
 
 @app.route('/v1/admin/examination/oral/create', methods=['POST'])
+@requirePermission('administrator')
 def create_oral_exam_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
     
     form = flask.request.json
     title = form.get('title')
@@ -926,15 +843,8 @@ def create_oral_exam_admin():
 
 
 @app.route('/v1/admin/examination/oral/get', methods=['POST'])
+@requirePermission('administrator')
 def get_oral_exam_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     examId = form.get('examId')
     if examId is None:
@@ -944,15 +854,8 @@ def get_oral_exam_admin():
 
 
 @app.route('/v1/admin/examination/oral/update', methods=['POST'])
+@requirePermission('administrator')
 def update_oral_exam_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form = flask.request.json
     examId = form.get('examId')
     title = form.get('title')
@@ -974,53 +877,27 @@ def update_oral_exam_admin():
 
 
 @app.route('/v1/exam/reading/list', methods=['POST'])
+@requirePermission('exam_rw')
 def get_reading_exam_list():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'exam_rw')
-    if not perm_result['status']:
-        return perm_result
-    
-    return DataProvider.makeResult(True, DataProvider.getAllReadingExams())
+    return DataProvider.getAllReadingExams(None, getPagination())
 
 
 @app.route('/v1/exam/writing/list', methods=['POST'])
+@requirePermission('exam_rw')
 def get_writing_exam_list():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'exam_rw')
-    if not perm_result['status']:
-        return perm_result
-
-    
-    return DataProvider.makeResult(True, DataProvider.getAllWritingExams())
+    return DataProvider.getAllWritingExams(None, getPagination())
 
 
 @app.route('/v1/exam/oral/list', methods=['POST'])
+@requirePermission('exam_rw')
 def get_oral_exam_list():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'exam_rw')
-    if not perm_result['status']:
-        return perm_result
-    
-    return DataProvider.makeResult(True, DataProvider.getAllOralExams())
+    return DataProvider.getAllOralExams(None, getPagination())
 
 
 @app.route('/v1/exam/session/reading/establish', methods=['POST'])
+@requirePermission('exam_rw')
 def establish_reading_exam_session():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'exam_rw')
-    if not perm_result['status']:
-        return perm_result
     
     if ExamSessionManager.getOngoingSessionOfUser(userId) is not None:
         return DataProvider.makeResult(False, 'You have an ongoing session.')
@@ -1040,14 +917,9 @@ def establish_reading_exam_session():
             
             
 @app.route('/v1/exam/session/writing/establish', methods=['POST'])
+@requirePermission('exam_rw')
 def establish_writing_exam_session():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'exam_rw')
-    if not perm_result['status']:
-        return perm_result
     
     if ExamSessionManager.getOngoingSessionOfUser(userId) is not None:
         return DataProvider.makeResult(False, 'You have an ongoing session.')
@@ -1063,14 +935,9 @@ def establish_writing_exam_session():
     
     
 @app.route('/v1/exam/session/oral/establish', methods=['POST'])
+@requirePermission('exam_rw')
 def establish_oral_exam_session():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'exam_rw')
-    if not perm_result['status']:
-        return perm_result
     
     if ExamSessionManager.getOngoingSessionOfUser(userId) is not None:
         return DataProvider.makeResult(False, 'You have an ongoing session.')
@@ -1086,15 +953,8 @@ def establish_oral_exam_session():
         
         
 @app.route('/v1/exam/session/oral/get_details', methods=['POST'])
+@requirePermission('exam_rw')
 def get_oral_exam_session_details():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'exam_rw')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     sessionId = form.get('sessionId')
     if sessionId is None:
@@ -1108,15 +968,8 @@ def get_oral_exam_session_details():
     
     
 @app.route('/v1/exam/session/reading/get_details', methods=['POST'])
+@requirePermission('exam_rw')
 def get_reading_exam_session_details():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'exam_rw')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     sessionId = form.get('sessionId')
     if sessionId is None:
@@ -1126,14 +979,9 @@ def get_reading_exam_session_details():
     
 
 @app.route('/v1/exam/session/reading/update_answer', methods=['POST'])
+@requirePermission('exam_rw')
 def update_reading_exam_session_answer():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'exam_rw')
-    if not perm_result['status']:
-        return perm_result
     
     form: dict[str, typing.Any] = flask.request.json
     sessionId = form.get('sessionId')
@@ -1147,15 +995,8 @@ def update_reading_exam_session_answer():
     
     
 @app.route('/v1/exam/session/reading/finalize', methods=['POST'])
+@requirePermission('exam_rw')
 def finalize_reading_exam_session():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'exam_rw')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     sessionId = form.get('sessionId')
     answer = form.get('answer')
@@ -1167,15 +1008,8 @@ def finalize_reading_exam_session():
         return ExamSessionManager.finalizeReadingExamSession(sessionId)
     
 @app.route('/v1/exam/session/writing/get_details', methods=['POST'])
+@requirePermission('exam_rw')
 def get_writing_exam_session_details():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'exam_rw')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     sessionId = form.get('sessionId')
     if sessionId is None:
@@ -1185,14 +1019,9 @@ def get_writing_exam_session_details():
     
 
 @app.route('/v1/exam/session/writing/update_answer', methods=['POST'])
+@requirePermission('exam_rw')
 def update_writing_exam_session_answer():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'exam_rw')
-    if not perm_result['status']:
-        return perm_result
     
     form: dict[str, typing.Any] = flask.request.json
     sessionId = form.get('sessionId')
@@ -1206,15 +1035,8 @@ def update_writing_exam_session_answer():
     
     
 @app.route('/v1/exam/session/writing/finalize', methods=['POST'])
+@requirePermission('exam_rw')
 def finalize_writing_exam_session():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'exam_rw')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     sessionId = form.get('sessionId')
     answer = form.get('answer')
@@ -1229,28 +1051,31 @@ def finalize_writing_exam_session():
 
 
 @app.route('/v1/exam/session/ongoing', methods=['POST'])
+@requirePermission('exam_rw')
 def get_ongoing_exam_session():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'exam_rw')
-    if not perm_result['status']:
-        return perm_result
     
     result = ExamSessionManager.getOngoingSessionOfUser(userId)
     return DataProvider.makeResult(True, result) if result else DataProvider.makeResult(False, 'No ongoing session.')
 
 
+@app.route('/v1/job/status', methods=['POST'])
+@requirePermission()
+def get_job_status():
+    userId = flask.session['userAuth']
+    
+    form: dict[str, typing.Any] = flask.request.json
+    jobId = form.get('jobId')
+    if jobId is None:
+        return DataProvider.makeResult(False, 'Job ID is required.')
+    else:
+        return DataProvider.getJobStatus(jobId, userId)
+
+
 @app.route('/v1/exam_result/reading/list', methods=['POST'])
+@requirePermission('exam_rw')
 def get_reading_exam_result_list():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'exam_rw')
-    if not perm_result['status']:
-        return perm_result
     
     filters = {
         'userId': userId
@@ -1258,18 +1083,13 @@ def get_reading_exam_result_list():
     if filters is None:
         return DataProvider.makeResult(False, 'Filters are required.')
     else:
-        return DataProvider.makeResult(True, DataProvider.getReadingExamResultList(filters))
+        return DataProvider.getReadingExamResultList(filters, getPagination())
     
 
 @app.route('/v1/exam_result/writing/list', methods=['POST'])
+@requirePermission('exam_rw')
 def get_writing_exam_result_list():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'exam_rw')
-    if not perm_result['status']:
-        return perm_result
     
     filters = {
         'userId': userId
@@ -1277,18 +1097,13 @@ def get_writing_exam_result_list():
     if filters is None:
         return DataProvider.makeResult(False, 'Filters are required.')
     else:
-        return DataProvider.makeResult(True, DataProvider.getWritingExamResultList(filters))
+        return DataProvider.getWritingExamResultList(filters, getPagination())
     
     
 @app.route('/v1/exam_result/oral/list', methods=['POST'])
+@requirePermission('exam_rw')
 def get_oral_exam_result_list():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
     userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'exam_rw')
-    if not perm_result['status']:
-        return perm_result
     
     filters = {
         'userId': userId
@@ -1296,19 +1111,12 @@ def get_oral_exam_result_list():
     if filters is None:
         return DataProvider.makeResult(False, 'Filters are required.')
     else:
-        return DataProvider.makeResult(True, DataProvider.getOralExamResultList(filters))
+        return DataProvider.getOralExamResultList(filters, getPagination())
     
     
 @app.route('/v1/exam_result/reading/get', methods=['POST'])
+@requirePermission('exam_rw')
 def get_reading_exam_result():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'exam_rw')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     recordId = form.get('id')
     if recordId is None:
@@ -1318,15 +1126,8 @@ def get_reading_exam_result():
     
     
 @app.route('/v1/exam_result/writing/get', methods=['POST'])
+@requirePermission('exam_rw')
 def get_writing_exam_result():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'exam_rw')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     recordId = form.get('id')
     if recordId is None:
@@ -1336,15 +1137,8 @@ def get_writing_exam_result():
     
     
 @app.route('/v1/exam_result/oral/get', methods=['POST'])
+@requirePermission('exam_rw')
 def get_oral_exam_result():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'exam_rw')
-    if not perm_result['status']:
-        return perm_result
-    
     form: dict[str, typing.Any] = flask.request.json
     recordId = form.get('id')
     if recordId is None:
@@ -1354,82 +1148,47 @@ def get_oral_exam_result():
 
 
 @app.route('/v1/admin/exam_session/list', methods=['POST'])
+@requirePermission('administrator')
 def get_exam_session_list():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     return DataProvider.makeResult(True, ExamSessionManager.getExaminationSessionList())
 
 
 @app.route('/v1/admin/exam_result/reading/list', methods=['POST'])
+@requirePermission('administrator')
 def get_reading_exam_result_list_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form = flask.request.json
     filters = form.get('filters')
     if filters is None:
         return DataProvider.makeResult(False, 'Filters are required.')
     else:
-        return DataProvider.makeResult(True, DataProvider.getReadingExamResultList(filters))
+        return DataProvider.getReadingExamResultList(filters, getPagination())
     
     
 @app.route('/v1/admin/exam_result/writing/list', methods=['POST'])
+@requirePermission('administrator')
 def get_writing_exam_result_list_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form = flask.request.json
     filters = form.get('filters')
     if filters is None:
         return DataProvider.makeResult(False, 'Filters are required.')
     else:
-        return DataProvider.makeResult(True, DataProvider.getWritingExamResultList(filters))
+        return DataProvider.getWritingExamResultList(filters, getPagination())
     
     
 @app.route('/v1/admin/exam_result/oral/list', methods=['POST'])
+@requirePermission('administrator')
 def get_oral_exam_result_list_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form = flask.request.json
     filters = form.get('filters')
     if filters is None:
         return DataProvider.makeResult(False, 'Filters are required.')
     else:
-        return DataProvider.makeResult(True, DataProvider.getOralExamResultList(filters))
+        return DataProvider.getOralExamResultList(filters, getPagination())
 
 
 @app.route('/v1/admin/exam_result/reading/get', methods=['POST'])
+@requirePermission('administrator')
 def get_reading_exam_result_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form = flask.request.json
     recordId = form.get('id')
     if recordId is None:
@@ -1439,15 +1198,8 @@ def get_reading_exam_result_admin():
     
 
 @app.route('/v1/admin/exam_result/writing/get', methods=['POST'])
+@requirePermission('administrator')
 def get_writing_exam_result_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form = flask.request.json
     recordId = form.get('id')
     if recordId is None:
@@ -1457,15 +1209,8 @@ def get_writing_exam_result_admin():
 
 
 @app.route('/v1/admin/exam_result/oral/get', methods=['POST'])
+@requirePermission('administrator')
 def get_oral_exam_result_admin():
-    if 'userAuth' not in flask.session:
-        return DataProvider.makeResult(False, 'Please login first.')
-    
-    userId = flask.session['userAuth']
-    perm_result = DataProvider.checkIfUserHasPermission(userId, 'administrator')
-    if not perm_result['status']:
-        return perm_result
-    
     form = flask.request.json
     recordId = form.get('id')
     if recordId is None:
@@ -0,0 +1,5 @@
+"""
+Benchmarks for the Yoi English backend.
+
+Run them from the `server` directory, e.g. `python -m benchmarks.result_list_queries`.
+"""
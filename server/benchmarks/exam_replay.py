@@ -0,0 +1,184 @@
+"""
+Replay reading, writing and automatically answered oral exam sessions end to end through `_ExamSessionManager`,
+with the language model and the text to speech service replaced by the scripted backends of `scriptedBackends`.
+Reports the p50 and p99 latency of every stage and the number of sessions completed per minute.
+
+The oral sessions run the examiner conversation of `SpeakingExaminationSessionBackend` without a LiveKit room,
+and skip the pronunciation assessment, which runs local speech models rather than calling a service.
+
+Usage: `python -m benchmarks.exam_replay [--sessions 30] [--concurrency 6] [--llm-latency 0.8] [--tts-latency 0.3] [--script recorded.json]`
+"""
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import json
+import tempfile
+import threading
+import time
+import chatModel
+import data.config
+import dataProvider
+import examSessionManager
+import llmCache
+import logger
+import scriptedBackends
+import tools
+
+
+class OfflineParticipant():
+    async def publish_data(self, payload: str, reliable: bool = True, topic: str = '') -> None:
+        pass
+
+
+class OfflineRoom():
+    """
+    Stands in for the LiveKit room of an oral session, dropping the events the examiner sends to the client.
+    """
+
+    def __init__(self):
+        self.local_participant = OfflineParticipant()
+
+    async def disconnect(self) -> None:
+        pass
+
+
+class StageTimer():
+    def __init__(self):
+        self.samples: dict[str, list[float]] = collections.defaultdict(list)
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def measure(self, stage: str):
+        begin = time.perf_counter()
+        yield
+        with self.lock:
+            self.samples[stage].append(time.perf_counter() - begin)
+
+
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+
+
+def waitForJob(provider: dataProvider._DataProvider, jobId: int) -> dict:
+    while True:
+        job = provider.jobQueue.getJob(jobId)
+        if job['status'] in ('succeeded', 'failed'):
+            if job['status'] == 'failed':
+                raise RuntimeError(f'Job {jobId} ({job["kind"]}) failed: {job["error"]}')
+            return job
+        time.sleep(0.01)
+
+
+def runReadingSession(provider, manager, timer: StageTimer, userId: int) -> None:
+    sessionId = manager.createReadingExamSession(1, userId)
+    manager.updateReadingExamSessionAnswer(sessionId, ['A', 'B', 'A', 'C'])
+    with timer.measure('reading.submit'):
+        res = manager.finalizeReadingExamSession(sessionId)
+    with timer.measure('reading.feedback'):
+        waitForJob(provider, res['data']['feedbackJobId'])
+
+
+def runWritingSession(provider, manager, timer: StageTimer, userId: int) -> None:
+    sessionId = manager.createWritingExamSession(1, userId)
+    # a distinct composition per session, so grading is not answered by the response cache
+    manager.updateWritingExamSessionAnswer(sessionId, f'Composition {sessionId}. ' + 'Cities should invest in public transport. ' * 40)
+    with timer.measure('writing.submit'):
+        res = manager.finalizeWritingExamSession(sessionId)
+    with timer.measure('writing.grading'):
+        waitForJob(provider, res['data']['jobId'])
+
+
+def runOralSession(provider, manager, timer: StageTimer, userId: int) -> None:
+    exam = provider.getOralExamById(1)['data']
+    backend = examSessionManager.SpeakingExaminationSessionBackend(userId, exam['warmUpTopics'], exam['mainTopic'])
+    sessionId = tools.RandomHashProvider()
+    manager.session_pool[sessionId] = {'type': 'oral', 'examId': 1, 'userId': userId, 'startTime': int(time.time()), 'answerDetails': {}, 'sessionBackend': backend}
+    result = {}
+
+    def onExit(llmStateInfo: dict) -> None:
+        manager.session_pool[sessionId]['answerDetails'] = dict(llmStateInfo, Pronunciation_Evaluation_Result={})
+        result.update(manager.finalizeOralExamSession(sessionId))
+
+    backend.onExit(onExit)
+    backend.automaticAnswering = True
+    backend.connected = True
+    backend.chatRoom = OfflineRoom()
+    backend.loggerCallbackId = logger.Logger.registerCallback(backend.connectionLogs.append)
+    # automatic answering still waits for the examinee to finish every answer, two in part I, the preparation
+    # and the statement in part II, three follow up and three discussion answers
+    for _ in range(10):
+        backend.userAnswers.put(b'')
+    backend.llmState = examSessionManager.SpeakingExaminationLLMState.PARTI_INITIATION
+
+    loop = asyncio.new_event_loop()
+    try:
+        with timer.measure('oral.conversation'):
+            loop.run_until_complete(backend.chat())
+        # terminating the session leaves the room disconnection task behind
+        pending = asyncio.all_tasks(loop)
+        if pending:
+            loop.run_until_complete(asyncio.wait(pending))
+    finally:
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
+        backend.ttsManager.finalize()
+    with timer.measure('oral.grading'):
+        waitForJob(provider, result['data']['jobId'])
+
+
+def populate(provider: dataProvider._DataProvider) -> None:
+    now = int(time.time())
+    provider.initialize('bench', 'bench', 'bench@localhost', 'Yoi', 'A friendly IELTS examiner.', 'scripted', 'http://localhost', 'Yoimiya')
+    provider.createReadingExam(1, 'reading', now, now + 3600, 'Lorem ipsum dolor sit amet. ' * 200,
+                               [{'type': 'choice', 'answer': answer, 'candidateAnswers': ['A', 'B', 'C', 'D']} for answer in 'ABCD'], 60)
+    provider.createWritingExam(1, 'writing', now, now + 3600, 'Should cities invest more in public transport?', '', 60)
+    provider.createOralExam(1, 'oral', now, now + 3600, ['hometown', 'hobbies'], 'a place you enjoy visiting')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay exam sessions against scripted language model and text to speech backends.')
+    parser.add_argument('--sessions', type=int, default=30, help='number of sessions, split evenly between reading, writing and oral')
+    parser.add_argument('--concurrency', type=int, default=6, help='number of sessions running at the same time')
+    parser.add_argument('--llm-latency', type=float, default=0.8, help='seconds before the first chunk of a model response')
+    parser.add_argument('--tts-latency', type=float, default=0.3, help='seconds before the audio of a sentence is returned')
+    parser.add_argument('--script', help='JSON file of recorded model responses, see scriptedBackends.loadScript')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        data.config.ARTIFACT_STORAGE_PATH = f'{directory}/artifacts'
+        chatModel.modelRegistry.setBackend(scriptedBackends.ScriptedModelBackend(
+            scriptedBackends.loadScript(args.script) if args.script else None, firstChunkLatency=args.llm_latency))
+        chatModel.responseCache = llmCache.LLMResponseCache(f'{directory}/llmCache.db', data.config.LLM_CACHE_MEMORY_SIZE)
+        # the exam session manager reads the module level provider
+        provider = dataProvider.DataProvider = dataProvider._DataProvider(f'{directory}/database.db')
+        populate(provider)
+        provider.jobQueue.start()
+
+        examSessionManager.dubBackend = lambda url: scriptedBackends.ScriptedDubAPI(url, firstByteLatency=args.tts_latency)
+        manager = examSessionManager.ExamSessionManager
+        runners = [runReadingSession, runWritingSession, runOralSession]
+        timer = StageTimer()
+
+        def runSession(index: int) -> None:
+            runner = runners[index % len(runners)]
+            with timer.measure(f'{runner.__name__[3:-7].lower()}.session'):
+                runner(provider, manager, timer, 1)
+
+        begin = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(args.concurrency) as executor:
+            for future in [executor.submit(runSession, i) for i in range(args.sessions)]:
+                future.result()
+        elapsed = time.perf_counter() - begin
+
+        print(f"{'stage':<20} {'count':>6} {'p50 s':>8} {'p99 s':>8}")
+        for stage, samples in sorted(timer.samples.items()):
+            print(f"{stage:<20} {len(samples):>6} {percentile(samples, 50):>8.3f} {percentile(samples, 99):>8.3f}")
+        print(f'{args.sessions} sessions in {elapsed:.1f} s, {args.sessions / elapsed * 60:.1f} sessions/min')
+        print(json.dumps({'models': chatModel.modelRegistry.stats(), 'responseCache': chatModel.responseCache.stats()}))
+
+
+if __name__ == '__main__':
+    main()
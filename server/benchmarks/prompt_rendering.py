@@ -0,0 +1,42 @@
+"""
+Compare rendering the reading feedback prompt, which embeds a whole exam paper, with the former
+one `str.replace` pass per argument and with the precompiled `chatModel.PromptTemplate`.
+"""
+import json
+import timeit
+import chatModel
+import data.config
+
+
+def legacyPrompt(prompt: str, args: dict) -> str:
+    for i in args:
+        prompt = prompt.replace('{{' + f'{i}' + '}}', str(args[i]))
+    return prompt
+
+
+def main():
+    answerSheetFormat = [{'type': 'choice', 'answer': 'A', 'candidateAnswers': ['A', 'B', 'C', 'D']} for _ in range(40)]
+    print(f"{'passage KiB':>12} {'method':<12} {'us/render':>10}")
+    for size in [4, 64, 512]:
+        args = {
+            'exam_paper': ('Lorem ipsum dolor sit amet. ' * (size * 1024 // 28)),
+            'correct_ans_count': 30,
+            'total_ans_count': 40,
+            'band': 'B',
+            'trouble_problems': [{'user_ans': 'A', 'index': i} for i in range(10)],
+            'answer_sheet_format': json.dumps(answerSheetFormat),
+        }
+        assert legacyPrompt(data.config.PROMPT_FOR_ANALYZE_READING_EXAM_RESULT, args) == chatModel.Prompt(data.config.PROMPT_FOR_ANALYZE_READING_EXAM_RESULT, args)
+
+        methods = {
+            'legacy': lambda: legacyPrompt(data.config.PROMPT_FOR_ANALYZE_READING_EXAM_RESULT, args),
+            'template': lambda: chatModel.Prompt(data.config.PROMPT_FOR_ANALYZE_READING_EXAM_RESULT, args),
+        }
+        for name, func in methods.items():
+            number = 200
+            seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+            print(f"{size:>12} {name:<12} {seconds * 1e6:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Count the SQLite round trips of the exam result list methods for growing result tables.
+The count should stay constant no matter how many rows are listed.
+"""
+import tempfile
+import time
+import dataProvider
+
+
+def countQueries(provider: dataProvider._DataProvider, func, *args) -> tuple[int, float]:
+    counter = {'queries': 0}
+    query = provider.db.query
+
+    def countingQuery(*a, **kw):
+        counter['queries'] += 1
+        return query(*a, **kw)
+
+    provider.db.query = countingQuery
+    try:
+        begin = time.perf_counter()
+        func(*args)
+        return counter['queries'], time.perf_counter() - begin
+    finally:
+        provider.db.query = query
+
+
+def populate(provider: dataProvider._DataProvider, rows: int) -> None:
+    now = int(time.time())
+    provider.db.query("insert into users (username, passwordSalted, email, avatar) values (?,?,?,?)", ('bench', '', 'bench@localhost', b''))
+    provider.db.query("insert into academicalPassageExamPaper (userId, createTime, availableTime, expireTime, title, passages, answerSheetFormat, answers, duration) values (1,?,?,?,?,?,?,?,?)", (now, now, now, 'reading', '', '[]', '', 60))
+    provider.db.query("insert into essayWritingExamPaper (userId, createTime, availableTime, expireTime, title, problemStatement, onePossibleVersion, duration) values (1,?,?,?,?,?,?,?)", (now, now, now, 'writing', '', '', 60))
+    provider.db.query("insert into oralEnglishExamPaper (userId, createTime, availableTime, expireTime, title, mainTopic) values (1,?,?,?,?,?)", (now, now, now, 'oral', ''))
+    for i in range(rows):
+        provider.db.query("insert into academicalPassageExamResult (completeTime, examSessionId, examPaperId, correctAnsCount, band, feedback, userId) values (?,'',1,0,'A','',1)", (now + i,))
+        provider.db.query("insert into essayWritingExamResult (completeTime, examPaperId, band, feedback, userId) values (?,1,'A','',1)", (now + i,))
+        provider.db.query("insert into oralEnglishExamResult (completeTime, examPaperId, band, overallFeedback, contentFeedback, pronounciationFeedback, userId) values (?,1,'A','','','',1)", (now + i,))
+
+
+def main():
+    print(f"{'rows':>8} {'method':<28} {'queries':>8} {'seconds':>10}")
+    for rows in [10, 100, 1000]:
+        with tempfile.TemporaryDirectory() as directory:
+            provider = dataProvider._DataProvider(f'{directory}/database.db')
+            populate(provider, rows)
+            for method in [provider.getReadingExamResultList, provider.getWritingExamResultList, provider.getOralExamResultList]:
+                queries, seconds = countQueries(provider, method, {'userId': 1})
+                print(f"{rows:>8} {method.__name__:<28} {queries:>8} {seconds:>10.4f}")
+            provider.db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Compare the cost of turning a large result set into rows: the former per-cell dictionary building,
+`DatabaseObject.query` with dictionaries and tuples, and streaming with `DatabaseObject.iterquery`.
+"""
+import tempfile
+import time
+import tracemalloc
+import dataProvider
+
+
+def legacyQuery(db: dataProvider.DatabaseObject, query: str) -> list[dict]:
+    cur = db.reader().execute(query)
+    rv = [dict((cur.description[idx][0], value)
+               for idx, value in enumerate(row)) for row in cur.fetchall()]
+    cur.close()
+    return rv
+
+
+def measure(func) -> tuple[float, int]:
+    tracemalloc.start()
+    begin = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - begin
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    query = "select id, completeTime, examPaperId, band, feedback, userId from essayWritingExamResult"
+    print(f"{'rows':>8} {'method':<20} {'seconds':>10} {'peak KiB':>10}")
+    for rows in [1000, 10000, 100000]:
+        with tempfile.TemporaryDirectory() as directory:
+            db = dataProvider.DatabaseObject(f'{directory}/database.db')
+            db.runScript("create table essayWritingExamResult (id integer primary key, completeTime integer, examPaperId integer, band string, feedback string, userId integer)")
+            db.query("with recursive seq(n) as (select 1 union all select n + 1 from seq where n < ?) insert into essayWritingExamResult (completeTime, examPaperId, band, feedback, userId) select n, 1, 'A', 'feedback', 1 from seq", (rows,))
+
+            methods = {
+                'legacy dict': lambda: legacyQuery(db, query),
+                'query dict': lambda: db.query(query),
+                'query tuples': lambda: db.query(query, asTuples=True),
+                'iterquery dict': lambda: sum(1 for _ in db.iterquery(query)),
+                'iterquery tuples': lambda: sum(1 for _ in db.iterquery(query, asTuples=True)),
+            }
+            for name, func in methods.items():
+                seconds, peak = measure(func)
+                print(f"{rows:>8} {name:<20} {seconds:>10.4f} {peak / 1024:>10.1f}")
+            db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+import abc
+import hashlib
+import os
+import pathlib
+import tempfile
+import typing
+
+
+class BlobStore(abc.ABC):
+    """
+    Interface of the artifact storage backends.
+    Contents are addressed by the hex SHA-256 digest of their bytes, so storing the same content twice keeps a single copy.
+    Concurrent puts of the same content must be safe without any locking by the caller.
+    """
+
+    @abc.abstractmethod
+    def put(self, content: bytes) -> str:
+        """
+        Store the content.
+
+        Args:
+            content (bytes): The content to store.
+
+        Returns:
+            str: The digest of the content.
+        """
+
+    @abc.abstractmethod
+    def open(self, digest: str) -> typing.BinaryIO | None:
+        """
+        Open the content for reading.
+
+        Args:
+            digest (str): The digest of the content.
+
+        Returns:
+            typing.BinaryIO | None: A readable binary file object, or None if not found. The caller is responsible for closing it.
+        """
+
+    def get(self, digest: str) -> bytes | None:
+        """
+        Read the whole content.
+
+        Args:
+            digest (str): The digest of the content.
+
+        Returns:
+            bytes | None: The content, or None if not found.
+        """
+        file = self.open(digest)
+        if file is None:
+            return None
+        with file:
+            return file.read()
+
+    @abc.abstractmethod
+    def exists(self, digest: str) -> bool:
+        """
+        Check whether the content is stored.
+
+        Args:
+            digest (str): The digest of the content.
+
+        Returns:
+            bool: Whether the content is stored.
+        """
+
+    @abc.abstractmethod
+    def delete(self, digest: str) -> bool:
+        """
+        Remove the content.
+
+        Args:
+            digest (str): The digest of the content.
+
+        Returns:
+            bool: Whether the content existed.
+        """
+
+
+class FileSystemBlobStore(BlobStore):
+    """
+    Content-addressed blob store keeping every content in its own file under a sharded directory tree.
+    """
+
+    def __init__(self, root: str, shardDepth: int = 2):
+        self.root = pathlib.Path(root)
+        self.shardDepth = shardDepth
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def digestOf(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    def path(self, digest: str) -> pathlib.Path:
+        """
+        Get the file path of the content.
+
+        Args:
+            digest (str): The digest of the content.
+
+        Returns:
+            pathlib.Path: The path, `<root>/ab/cd/abcd...` for a shard depth of 2.
+        """
+        if len(digest) != 64 or any(c not in '0123456789abcdef' for c in digest):
+            raise ValueError(f'Invalid blob digest: {digest}')
+        shards = [digest[i * 2:i * 2 + 2] for i in range(self.shardDepth)]
+        return self.root.joinpath(*shards, digest)
+
+    def put(self, content: bytes) -> str:
+        digest = self.digestOf(content)
+        path = self.path(digest)
+        if path.exists():
+            return digest
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first, the rename makes the blob appear atomically for concurrent readers and writers
+        fd, temp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp, path)
+        except BaseException:
+            pathlib.Path(temp).unlink(missing_ok=True)
+            raise
+        return digest
+
+    def exists(self, digest: str) -> bool:
+        return self.path(digest).exists()
+
+    def open(self, digest: str) -> typing.BinaryIO | None:
+        try:
+            return open(self.path(digest), 'rb')
+        except FileNotFoundError:
+            return None
+
+    def delete(self, digest: str) -> bool:
+        try:
+            self.path(digest).unlink()
+            return True
+        except FileNotFoundError:
+            return False
@@ -1,11 +1,20 @@
+import asyncio
+import collections
+import io
 import mimetypes
+import re
+import threading
+import time
 from typing import Any
 import typing
 import google.generativeai as genai
+import google.generativeai.client as genaiClient
+from google.ai import generativelanguage as glm
 import google.generativeai.types.content_types
 from google.generativeai.types.safety_types import HarmBlockThreshold, HarmCategory
 import data.config
 
+import llmCache
 import logger
 
 DEFAULT_MODEL_SAFETY_SETTING = {
@@ -16,6 +25,148 @@ DEFAULT_MODEL_SAFETY_SETTING = {
 }
 
 
+apiKeyProvider: typing.Callable[[], str | None] = lambda: None
+"""
+Returns the Google API key of the server, used by models created without an explicit key. Set by the data provider.
+"""
+
+
+class ModelRegistry():
+    """
+    LRU pool of `genai.GenerativeModel` objects shared between chats, keyed by API key, model name, temperature, system prompt and tools.
+    Every model is bound to an API client of its own key instead of the process-wide `genai.configure` one,
+    so concurrent chats can use different keys, and reusing the model keeps the transport of its client alive between calls.
+    The clients are built with the public `client_options` of the SDK, but `genai.GenerativeModel` takes no client argument,
+    so binding one relies on its private `_client` attribute; the SDK version this works with is pinned in requirements.txt.
+
+    Models and file clients can come from another backend instead of the Google API, see `setBackend`.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.backend: typing.Any | None = None
+        self.models: collections.OrderedDict[tuple, genai.GenerativeModel] = collections.OrderedDict()
+        self.clients: collections.OrderedDict[tuple[type, str | None], typing.Any] = collections.OrderedDict()
+        self.calls: collections.Counter[str] = collections.Counter()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    def client(self, clientType: type, api_key: str | None) -> typing.Any:
+        """
+        Get the API client of the type and the key, creating it on first use. Must be called with the lock held.
+
+        Args:
+            clientType (type): The client class, e.g. `glm.GenerativeServiceClient`.
+            api_key (str | None): The Google API key.
+
+        Returns:
+            typing.Any: The client.
+        """
+        key = (clientType, api_key)
+        client = self.clients.get(key)
+        if client is None:
+            client = clientType(client_options={'api_key': api_key})
+            self.clients[key] = client
+            if len(self.clients) > self.capacity:
+                self.clients.popitem(last=False)
+        self.clients.move_to_end(key)
+        return client
+
+    def setBackend(self, backend: typing.Any | None) -> None:
+        """
+        Create models and file clients with another backend instead of the Google API, dropping the pooled ones.
+        The backend provides `model(model, temperature, system_prompt, tools)` and `fileClient(api_key)`,
+        returning objects which behave like `genai.GenerativeModel` and `genaiClient.FileServiceClient`, e.g. `scriptedBackends.ScriptedModelBackend`.
+
+        Args:
+            backend (typing.Any | None): The backend, None restores the Google API.
+        """
+        with self.lock:
+            self.backend = backend
+            self.models.clear()
+            self.clients.clear()
+
+    def fileClient(self, api_key: str | None) -> genaiClient.FileServiceClient:
+        """
+        Get the File API client of the key, creating it on first use.
+
+        Args:
+            api_key (str | None): The Google API key.
+
+        Returns:
+            genaiClient.FileServiceClient: The client.
+        """
+        with self.lock:
+            if self.backend is not None:
+                return self.backend.fileClient(api_key)
+            return self.client(genaiClient.FileServiceClient, api_key)
+
+    def get(self, api_key: str | None, model: str, temperature: float, system_prompt: str | None, tools: list[typing.Any]) -> genai.GenerativeModel:
+        """
+        Get the shared model object, creating it on first use.
+
+        Args:
+            api_key (str | None): The Google API key the model calls the API with.
+            model (str): The name of the model.
+            temperature (float): The temperature of the model.
+            system_prompt (str | None): The system instruction of the model.
+            tools (list[typing.Any]): The tools of the model.
+
+        Returns:
+            genai.GenerativeModel: The model object.
+        """
+        key = (api_key, model, temperature, system_prompt, tuple(tools))
+        with self.lock:
+            instance = self.models.get(key)
+            if instance is not None:
+                self.models.move_to_end(key)
+                return instance
+
+        backend = self.backend
+        if backend is not None:
+            instance = backend.model(model, temperature, system_prompt, tools)
+        else:
+            instance = genai.GenerativeModel(model_name=model, system_instruction=system_prompt, generation_config={
+                'temperature': temperature,
+            }, tools=tools)
+            if '_client' not in vars(instance):
+                raise RuntimeError('genai.GenerativeModel no longer has a `_client` attribute, the model cannot be bound to the client of its API key; check the google-generativeai version pinned in requirements.txt')
+        with self.lock:
+            # keep the model created first if another thread raced us
+            if key in self.models:
+                instance = self.models[key]
+            else:
+                if backend is None:
+                    # the model creates the default client lazily when `_client` is unset, bind it to the client of its key instead
+                    instance._client = self.client(glm.GenerativeServiceClient, api_key)
+                self.models[key] = instance
+                self.created += 1
+            self.models.move_to_end(key)
+            if len(self.models) > self.capacity:
+                self.models.popitem(last=False)
+        return instance
+
+    def countCall(self, model: str) -> None:
+        with self.lock:
+            self.calls[model] += 1
+
+    def stats(self) -> dict[str | typing.Any]:
+        with self.lock:
+            return {'pooledModels': len(self.models), 'createdModels': self.created, 'apiClients': len(self.clients), 'calls': dict(self.calls)}
+
+
+modelRegistry = ModelRegistry(data.config.LLM_MODEL_POOL_SIZE)
+"""
+The shared model objects used by `ChatGoogleGenerativeAI`.
+"""
+
+
+responseCache = llmCache.LLMResponseCache(data.config.LLM_CACHE_PATH, data.config.LLM_CACHE_MEMORY_SIZE)
+"""
+Cache of the responses of one-shot prompts, used by the call sites opting in through `CompletePrompt`.
+"""
+
+
 def Message(role: str, content: str, content_type: str) -> dict[str, str]:
     return {
         'role': role,
@@ -43,38 +194,199 @@ class ChatGoogleGenerativeAI():
         safety_settings (Any): Safety settings for the model.
         system_prompt (str): The system prompt to use for the chat.
         tools (list[typing.Any]): Tools to use for the chat.
+        api_key (str | None): The Google API key of the chat, defaults to the key of the server.
 
     Methods:
         initiate(begin_msg: list[dict[str, str]]) -> str: Initiate the chat session with the beginning message.
         chat(user_msg: list[dict[str, str]]) -> str: Chat with the user message.
+        initiateStream(begin_msg: list[dict[str, str]]) -> Iterator[str]: Like `initiate`, yielding the response in chunks as they are generated.
+        chatStream(user_msg: list[dict[str, str]]) -> Iterator[str]: Like `chat`, yielding the response in chunks as they are generated.
+        initiateAsync(begin_msg: list[dict[str, str]]) -> str: Like `initiate`, awaitable without blocking the event loop.
+        chatAsync(user_msg: list[dict[str, str]]) -> str: Like `chat`, awaitable without blocking the event loop.
+        uploadFile(content: bytes, mime_type: str) -> genai.types.File: Upload a file which messages can reference instead of carrying its content.
+        deleteFile(file: genai.types.File) -> None: Delete an uploaded file.
     """
 
-    def __init__(self, model: str, temperature: float = 0.9, safety_settings: Any = DEFAULT_MODEL_SAFETY_SETTING, system_prompt: str | None = None, tools: list[typing.Any] = []) -> None:
-        self.model: genai.GenerativeModel = genai.GenerativeModel(model_name=model, system_instruction=system_prompt, generation_config={
-            'temperature': temperature,
-        }, tools=tools)
+    def __init__(self, model: str, temperature: float = 0.9, safety_settings: Any = DEFAULT_MODEL_SAFETY_SETTING, system_prompt: str | None = None, tools: list[typing.Any] = [], api_key: str | None = None) -> None:
+        self.model_name = model
+        self.tools = tools
+        self.api_key = api_key or apiKeyProvider()
+        self.model: genai.GenerativeModel = modelRegistry.get(self.api_key, model, temperature, system_prompt, tools)
         self.chat_session: genai.ChatSession | None = None
 
-    def initiate(self, begin_msg: list[dict[str, str]]) -> str:
+    def startChat(self) -> None:
         if self.chat_session is None:
+            # automatic function calling only does something with tools, and the SDK refuses to stream with it enabled
             self.chat_session = self.model.start_chat(
-                enable_automatic_function_calling=True)
+                enable_automatic_function_calling=bool(self.tools))
+
+    def initiate(self, begin_msg: list[dict[str, str]]) -> str:
+        self.startChat()
         # initiate chat with beginning message
+        modelRegistry.countCall(self.model_name)
         return self.chat_session.send_message(begin_msg).text
 
     def chat(self, user_msg: list[dict[str, str]]) -> str:
         if self.chat_session is None:
             raise ValueError(f'{__name__}: Chat session not initiated')
         # chat with user message
+        modelRegistry.countCall(self.model_name)
         return self.chat_session.send_message(user_msg).text
+
+    async def initiateAsync(self, begin_msg: list[dict[str, str]]) -> str:
+        # the SDK call blocks, so it runs in the default executor of the loop
+        return await asyncio.to_thread(self.initiate, begin_msg)
+
+    async def chatAsync(self, user_msg: list[dict[str, str]]) -> str:
+        return await asyncio.to_thread(self.chat, user_msg)
+
+    def uploadFile(self, content: bytes, mime_type: str, timeout: float = 60) -> genai.types.File:
+        """
+        Upload a file to the File API with the key of the chat and wait until it can be used.
+        A message referencing the file carries only its URI, which keeps the chat history resent with every message small.
+
+        Args:
+            content (bytes): The content of the file.
+            mime_type (str): The MIME type of the file.
+            timeout (float, optional): Seconds to wait for the file to be processed. Defaults to 60.
+
+        Raises:
+            TimeoutError: If the file is still processing after the timeout.
+            RuntimeError: If processing the file failed.
+
+        Returns:
+            genai.types.File: The file, usable as a part of messages.
+        """
+        client = modelRegistry.fileClient(self.api_key)
+        file = client.create_file(io.BytesIO(content), mime_type=mime_type)
+        deadline = time.monotonic() + timeout
+        while file.state == glm.File.State.PROCESSING:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f'{__name__}: File {file.name} is still processing')
+            time.sleep(0.2)
+            file = client.get_file(name=file.name)
+        if file.state != glm.File.State.ACTIVE:
+            raise RuntimeError(f'{__name__}: Processing file {file.name} failed')
+        return genai.types.File(file)
+
+    def deleteFile(self, file: genai.types.File) -> None:
+        modelRegistry.fileClient(self.api_key).delete_file(name=file.name)
+
+    def streamMessage(self, msg: list[dict[str, str]]) -> typing.Iterator[str]:
+        if self.tools:
+            raise ValueError(f'{__name__}: Streaming is not supported for chats with tools')
+        modelRegistry.countCall(self.model_name)
+        # the chat history takes the response once it has been iterated to the end
+        for chunk in self.chat_session.send_message(msg, stream=True):
+            # the last chunk may carry only the finish reason
+            if chunk.parts:
+                yield chunk.text
+
+    def initiateStream(self, begin_msg: list[dict[str, str]]) -> typing.Iterator[str]:
+        self.startChat()
+        return self.streamMessage(begin_msg)
+
+    def chatStream(self, user_msg: list[dict[str, str]]) -> typing.Iterator[str]:
+        if self.chat_session is None:
+            raise ValueError(f'{__name__}: Chat session not initiated')
+        return self.streamMessage(user_msg)
     
     
-def Prompt(prompt: str, args: dict[str, typing.Any]):
-    for i in args:
-        prompt = prompt.replace('{{' + f'{i}' + '}}', str(args[i]))
-    return prompt
+class MissingPlaceholderError(KeyError):
+    """
+    Raised when a prompt is rendered without a value for one of its placeholders.
+    """
+
+
+class PromptTemplate():
+    """
+    A prompt template parsed once into literal and placeholder segments, and rendered with a single join.
+    Placeholders are written as `{{name}}`. Substituted values are not scanned again, so a passage containing `{{band}}` stays as it is.
+    """
+
+    placeholderPattern = re.compile(r'\{\{(\w+)\}\}')
+
+    def __init__(self, template: str):
+        parts = self.placeholderPattern.split(template)
+        # literals are at even indexes and placeholder names at odd ones
+        self.literals: list[str] = parts[0::2]
+        self.placeholders: list[str] = parts[1::2]
+
+    def render(self, args: dict[str, typing.Any]) -> str:
+        """
+        Substitute the placeholders.
+
+        Args:
+            args (dict[str, typing.Any]): The values of the placeholders, converted with `str`. Values of unknown placeholders are ignored.
+
+        Raises:
+            MissingPlaceholderError: If a placeholder has no value.
+
+        Returns:
+            str: The rendered prompt.
+        """
+        segments = [self.literals[0]]
+        for name, literal in zip(self.placeholders, self.literals[1:]):
+            if name not in args:
+                raise MissingPlaceholderError(f'Missing value of prompt placeholder {{{{{name}}}}}')
+            segments.append(str(args[name]))
+            segments.append(literal)
+        return ''.join(segments)
+
+
+compiledPrompts: dict[str, PromptTemplate] = {
+    value: PromptTemplate(value) for name, value in vars(data.config).items() if name.startswith('PROMPT_') and isinstance(value, str)
+}
+"""
+The prompt templates of `data.config`, parsed at import and looked up by their text.
+"""
+
+
+def Prompt(prompt: str, args: dict[str, typing.Any]) -> str:
+    """
+    Render a prompt template.
+
+    Args:
+        prompt (str): The template, usually one of the `PROMPT_*` constants of `data.config`.
+        args (dict[str, typing.Any]): The values of the placeholders.
+
+    Raises:
+        MissingPlaceholderError: If a placeholder has no value.
+
+    Returns:
+        str: The rendered prompt.
+    """
+    template = compiledPrompts.get(prompt)
+    if template is None:
+        template = PromptTemplate(prompt)
+    return template.render(args)
     
     
+def CompletePrompt(model: str, temperature: float, prompt: str, cache_ttl: int | None = None, cache_if: typing.Callable[[str], bool] | None = None) -> str:
+    """
+    Send a one-shot prompt to the model, optionally answering byte-identical prompts from the response cache.
+
+    Args:
+        model (str): The name of the model.
+        temperature (float): The temperature of the model.
+        prompt (str): The rendered prompt.
+        cache_ttl (int | None, optional): Seconds the response is cached, None disables the cache. Defaults to None.
+        cache_if (typing.Callable[[str], bool] | None, optional): Checks whether a response is worth caching, e.g. it has the expected format. Defaults to None.
+
+    Returns:
+        str: The response.
+    """
+    if cache_ttl is not None:
+        cached = responseCache.get(model, temperature, prompt)
+        if cached is not None:
+            return cached
+
+    resp = ChatGoogleGenerativeAI(model, temperature).initiate([prompt])
+    if cache_ttl is not None and resp and (cache_if is None or cache_if(resp)):
+        responseCache.put(model, temperature, prompt, resp, cache_ttl)
+    return resp
+
+
 def AnalyzeReadingExamResult(exam_paper: str, correct_ans_count: int, total_ans_count: int, band: int, trouble_problems: list[int], answer_sheet_format: list[dict[str, typing.Any]]) -> str:
     """
     Analyze the reading exam result and generate a report.
@@ -99,7 +411,7 @@ def AnalyzeReadingExamResult(exam_paper: str, correct_ans_count: int, total_ans_
         'answer_sheet_format': answer_sheet_format,
     })
     logger.Logger.log(prompt)
-    resp = ChatGoogleGenerativeAI('gemini-2.0-flash-thinking-exp-01-21', 0.7).initiate([prompt])
+    resp = CompletePrompt('gemini-2.0-flash-thinking-exp-01-21', 0.7, prompt, data.config.LLM_CACHE_TTL, lambda r: '[/feedback]' in r)
     # get content from [result][/result]
     final = resp[resp.find('[feedback]') + 10:resp.rfind('[/feedback]')]
     return final
@@ -124,7 +436,7 @@ def AnalyzeWritingExamResult(problem_statement: str, one_possible_version: str,
         'composition': compositon,
     })
     logger.Logger.log(prompt)
-    resp = ChatGoogleGenerativeAI('gemini-2.0-flash-thinking-exp-01-21', 0.7).initiate([prompt])
+    resp = CompletePrompt('gemini-2.0-flash-thinking-exp-01-21', 0.7, prompt, data.config.LLM_CACHE_TTL, lambda r: '[/feedback]' in r and '[/band]' in r)
     # get content from [result][/result]
     final = resp[resp.rfind('[feedback]') + 10:resp.rfind('[/feedback]')]
     # get band from [band][/band]
@@ -132,14 +444,16 @@ def AnalyzeWritingExamResult(problem_statement: str, one_possible_version: str,
     return band, final
 
 
-def AnalyzeOverallAssessment(reading_feedback: str, writing_feedback: str, oral_feedback: str) -> tuple[str, str]:
+def AnalyzeOverallAssessment(previous_band: str, previous_assessment: str, reading_feedback: str, writing_feedback: str, oral_feedback: str) -> tuple[str, str]:
     """
-    Analyze the overall assessment and generate a report.
+    Update the overall assessment with the feedback received since the previous one and generate a report.
 
     Args:
-        reading_feedback (str): The reading feedback.
-        writing_feedback (str): The writing feedback.
-        oral_feedback (str): The oral feedback.
+        previous_band (str): The band of the previous assessment.
+        previous_assessment (str): The previous assessment, empty for the first one.
+        reading_feedback (str): The reading feedback since the previous assessment.
+        writing_feedback (str): The writing feedback since the previous assessment.
+        oral_feedback (str): The oral feedback since the previous assessment.
 
     Returns:
         tuple[str, str]: The band and the report.
@@ -155,6 +469,8 @@ def AnalyzeOverallAssessment(reading_feedback: str, writing_feedback: str, oral_
     {oral_feedback}
     """
     prompt = Prompt(data.config.PROMPT_FOR_ANALYZING_OVERALL_ASSESSMENT, {
+       "previous_band": previous_band,
+       "previous_assessment": previous_assessment,
        "recent_feedbacks": overall
     })
     logger.Logger.log(prompt)
@@ -20,6 +20,144 @@ LIVEKIT_SAMPLE_RATE = 44100
 LIVEKIT_VIDEO_WIDTH = 1920
 LIVEKIT_VIDEO_HEIGHT = 1080
 
+# Database settings
+DATABASE_PRAGMA_PROFILE = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'memory',
+    'busy_timeout': 5000,
+}
+"""
+PRAGMA statements applied to every SQLite connection opened by the data provider.
+`journal_mode` is applied to the writer connection only, since it is persistent for the database file.
+A negative `cache_size` is measured in KiB instead of pages.
+"""
+
+DATABASE_READER_POOL_SIZE = 8
+"""
+Number of read-only SQLite connections opened upfront and shared by all threads, reads wait for a free one when all of them are in use.
+"""
+
+DATABASE_STATEMENT_CACHE_SIZE = 256
+"""
+Number of prepared statements cached by each SQLite connection, list queries with parameterized filters share their statements.
+"""
+
+EXAM_PAPER_CACHE_SIZE = 256
+"""
+Number of exam papers kept in the in-process cache of the data provider.
+"""
+
+PRINCIPAL_CACHE_TTL = 30
+"""
+Seconds a resolved user principal (ID, username and permission bitmask) is reused by authorization checks.
+Updates of the user drop it immediately, the TTL only bounds the staleness of changes made outside the data provider.
+"""
+
+LIST_DEFAULT_PAGE_SIZE = 100
+"""
+Page size of list APIs when the request gives a cursor but no limit. Requests without either get the whole list.
+"""
+LIST_MAX_PAGE_SIZE = 500
+"""
+Upper bound of the page size requested by clients of list APIs.
+"""
+
+RECENT_EXAM_RESULTS_PERIOD = 30 * 24 * 3600
+"""
+Seconds a submitted exam result stays in the recent results of the home screen.
+"""
+
+OVERALL_ASSESSMENT_MAX_FEEDBACKS = 8
+"""
+Maximum number of new results of each exam type whose feedback is added to the rolling overall assessment at once.
+Newer ones beyond it are assessed by a follow-up assessment, which bounds the prompt of users with a long backlog of unassessed results.
+"""
+
+# Language model response cache settings
+LLM_CACHE_PATH = './blob/llm_cache.db'
+"""
+SQLite file keeping cached language model responses across restarts.
+"""
+LLM_CACHE_MEMORY_SIZE = 256
+"""
+Number of cached language model responses also kept in memory.
+"""
+LLM_CACHE_TTL = 7 * 24 * 3600
+"""
+Seconds a cached response of exam grading or answer sheet generation is reused for the same prompt.
+"""
+
+LLM_MODEL_POOL_SIZE = 32
+"""
+Number of language model objects kept for reuse, one per combination of model, temperature, system prompt and tools.
+"""
+
+ORAL_EXAM_UPLOAD_ANSWER_AUDIO = True
+"""
+Upload the answer recordings of oral exams to the File API once and reference them in the chat, instead of sending them inline.
+The chat history is resent with every message, so inline recordings make every turn carry the audio of all earlier answers.
+"""
+
+# Exam judger admission settings
+EXAM_JUDGER_CONCURRENCY = {
+    'reading': 8,
+    'writing': 8,
+    'oral': 4,
+}
+"""
+Number of submitted exam results of each kind waiting for or being graded by the background jobs at once, None uses the CPU count.
+Each kind stays bounded no matter how many `JOB_QUEUE_WORKERS` there are, and a kind cannot flood the job queue for the others.
+"""
+EXAM_JUDGER_QUEUE_LIMIT = 32
+"""
+Number of submissions waiting for each exam judger, further submissions are rejected as busy right away.
+"""
+EXAM_JUDGER_WAIT_TIMEOUT = 10
+"""
+Seconds a submission waits for an exam judger before it is rejected as busy, the client request is held meanwhile.
+"""
+
+# Background job settings
+JOB_QUEUE_WORKERS = 4
+"""
+Number of worker threads processing background jobs, such as grading exam results with the language model.
+"""
+JOB_VISIBILITY_TIMEOUT = 300
+"""
+Seconds a claimed job may run before it is considered lost and claimed again by another worker.
+"""
+JOB_MAX_ATTEMPTS = 5
+"""
+Number of attempts of a background job before it is marked as failed.
+"""
+JOB_RETRY_BACKOFF = 10
+"""
+Seconds before the first retry of a failed job, doubled on every further retry.
+"""
+JOB_MAX_RETRY_BACKOFF = 600
+"""
+Upper bound of the retry backoff of background jobs in seconds.
+"""
+
+FILE_RESPONSE_CHUNK_SIZE = 64 * 1024
+"""
+Size of the chunks read while streaming artifacts and avatars to clients, bounds the memory held by each download.
+"""
+
+# Artifact storage settings
+ARTIFACT_STORAGE_PATH = './blob/artifacts'
+"""
+Root directory of the content-addressed artifact store.
+Artifact contents are stored as files named after their SHA-256 digest, the `artifact` table only keeps their metadata.
+"""
+ARTIFACT_STORAGE_SHARD_DEPTH = 2
+"""
+Number of two-character directory levels taken from the digest, keeps directories small, e.g. `ab/cd/abcd...`.
+"""
+
 PREFERRED_ORAL_EXAM_TOPICS = [
     "Benefits of travel",
     "Different types of tourism",
@@ -384,19 +522,24 @@ Variables:
 PROMPT_FOR_ANALYZING_OVERALL_ASSESSMENT = """
 You are an skilled, professional English teacher which aims to improve the English language skills of Chinese students.
 Your response should be in Chinese.
-You are given the recent reading and writing feedback of the student which ordered from old to new, from the oldest to the newest. Here you should analyze the result and provide feedback to the student.
+You are given the previous overall assessment of the student, and the feedback of the oral, reading and writing examinations the student took since then, ordered from the oldest to the newest. Here you should update the assessment and provide feedback to the student.
+
+Here is the previous overall assessment, with band {{previous_band}}. It is empty if the student has not been assessed yet.
+
+{{previous_assessment}}
 
 Here is the recent feedback from oral, reading, and writing examinations.
 
 {{recent_feedbacks}}
 
 Guidelines:
-- Check all the recent feedbacks, reading them carefully, and analyze the improvements of students in accordance with the timeline of feedbacks.
+- Check all the recent feedbacks, reading them carefully, and analyze the improvements of students since the previous assessment in accordance with the timeline of feedbacks.
 - Assess student's performance on the following points:
     - Overall performance of the student.
     - The strengths and weaknesses of the student.
     - Improvements in reading and writing skills.
     - Any suggestions for improvement.
+- Keep the conclusions of the previous assessment which are still valid, your feedback replaces the previous assessment.
 - Provide feedback to the student in a concise and clear manner.
 
 Notice: 
@@ -411,7 +554,9 @@ The feedback should be a brief summary of the student's performance, and a conci
 Used to prompt the user to analyze the overall assessment.
 
 Variables:
-- recent_feedbacks: List of recent feedbacks provided to the student.
+- previous_band: The band of the previous overall assessment.
+- previous_assessment: The previous overall assessment, empty for the first one.
+- recent_feedbacks: List of feedbacks provided to the student since the previous assessment.
 """
 
 PROMPT_FOR_ANSWER_SHEET_GENERATION = """
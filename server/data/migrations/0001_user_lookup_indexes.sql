@@ -0,0 +1,3 @@
+-- login and registration look users up by username or email
+create index if not exists idx_users_username on users (username);
+create index if not exists idx_users_email on users (email);
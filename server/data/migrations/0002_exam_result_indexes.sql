@@ -0,0 +1,15 @@
+-- recent results, result lists and overall assessment filter by user and order by complete time
+-- the trailing columns make the result list queries index-only
+create index if not exists idx_academicalPassageExamResult_user_time on academicalPassageExamResult (userId, completeTime, examPaperId, band);
+create index if not exists idx_essayWritingExamResult_user_time on essayWritingExamResult (userId, completeTime, examPaperId, band);
+create index if not exists idx_oralEnglishExamResult_user_time on oralEnglishExamResult (userId, completeTime, examPaperId, band);
+
+-- administrator result lists without a user filter, ordered by complete time
+create index if not exists idx_academicalPassageExamResult_time on academicalPassageExamResult (completeTime, examPaperId, userId, band);
+create index if not exists idx_essayWritingExamResult_time on essayWritingExamResult (completeTime, examPaperId, userId, band);
+create index if not exists idx_oralEnglishExamResult_time on oralEnglishExamResult (completeTime, examPaperId, userId, band);
+
+-- result lists filtered by exam paper
+create index if not exists idx_academicalPassageExamResult_paper on academicalPassageExamResult (examPaperId, completeTime);
+create index if not exists idx_essayWritingExamResult_paper on essayWritingExamResult (examPaperId, completeTime);
+create index if not exists idx_oralEnglishExamResult_paper on oralEnglishExamResult (examPaperId, completeTime);
@@ -0,0 +1,12 @@
+-- outdated artifact cleanup
+create index if not exists idx_artifact_expire on artifact (expireTime);
+-- artifact lists of a user, covering every listed column
+create index if not exists idx_artifact_user on artifact (userId, createTime, expireTime, mimetype, isPrivate);
+
+-- exam paper lists filtered by author and availability
+create index if not exists idx_academicalPassageExamPaper_user on academicalPassageExamPaper (userId, availableTime);
+create index if not exists idx_academicalPassageExamPaper_available on academicalPassageExamPaper (availableTime);
+create index if not exists idx_essayWritingExamPaper_user on essayWritingExamPaper (userId, availableTime);
+create index if not exists idx_essayWritingExamPaper_available on essayWritingExamPaper (availableTime);
+create index if not exists idx_oralEnglishExamPaper_user on oralEnglishExamPaper (userId, availableTime);
+create index if not exists idx_oralEnglishExamPaper_available on oralEnglishExamPaper (availableTime);
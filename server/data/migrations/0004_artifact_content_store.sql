@@ -0,0 +1,24 @@
+-- artifact contents move to the content-addressed blob store, the table keeps metadata only.
+-- `content` stays as a nullable column for rows that are not moved out yet.
+create table artifactMigrated (
+    id            integer primary key autoincrement,
+    digest        string,
+    size          integer not null default 0,
+    content       blob,
+    mimetype      string not null,
+    createTime    integer not null,
+    expireTime    integer not null,
+    userId        integer not null,
+    isPrivate     integer not null default 0
+);
+
+insert into artifactMigrated (id, size, content, mimetype, createTime, expireTime, userId, isPrivate)
+    select id, length(content), content, mimetype, createTime, expireTime, userId, isPrivate from artifact;
+
+drop table artifact;
+alter table artifactMigrated rename to artifact;
+
+create index if not exists idx_artifact_expire on artifact (expireTime);
+create index if not exists idx_artifact_user on artifact (userId, createTime, expireTime, mimetype, isPrivate);
+-- reference counting of deduplicated blobs
+create index if not exists idx_artifact_digest on artifact (digest);
@@ -0,0 +1,34 @@
+-- per-user summary of recent exam results backing the home screen, kept up to date when results are submitted.
+-- it only holds what the home screen shows, so reading it never touches the result or exam paper bodies.
+create table if not exists recentExamResult (
+    id            integer primary key autoincrement,
+    userId        integer not null,
+    examType      string not null,
+    resultId      integer not null,
+    examPaperId   integer not null,
+    title         string not null,
+    band          string,
+    completeTime  integer not null
+);
+
+create unique index if not exists idx_recentExamResult_result on recentExamResult (examType, resultId);
+-- the trailing columns make the home screen query index-only
+create index if not exists idx_recentExamResult_user_time on recentExamResult (userId, completeTime, examType, resultId, examPaperId, title, band);
+-- renaming an exam paper updates the summaries referring to it
+create index if not exists idx_recentExamResult_paper on recentExamResult (examType, examPaperId);
+
+-- backfill the results of the last 30 days
+insert or ignore into recentExamResult (userId, examType, resultId, examPaperId, title, band, completeTime)
+    select r.userId, 'reading', r.id, r.examPaperId, coalesce(p.title, ''), r.band, r.completeTime
+    from academicalPassageExamResult r left join academicalPassageExamPaper p on p.id = r.examPaperId
+    where r.completeTime > cast(strftime('%s', 'now') as integer) - 30 * 24 * 3600;
+
+insert or ignore into recentExamResult (userId, examType, resultId, examPaperId, title, band, completeTime)
+    select r.userId, 'writing', r.id, r.examPaperId, coalesce(p.title, ''), r.band, r.completeTime
+    from essayWritingExamResult r left join essayWritingExamPaper p on p.id = r.examPaperId
+    where r.completeTime > cast(strftime('%s', 'now') as integer) - 30 * 24 * 3600;
+
+insert or ignore into recentExamResult (userId, examType, resultId, examPaperId, title, band, completeTime)
+    select r.userId, 'oral', r.id, r.examPaperId, coalesce(p.title, ''), r.band, r.completeTime
+    from oralEnglishExamResult r left join oralEnglishExamPaper p on p.id = r.examPaperId
+    where r.completeTime > cast(strftime('%s', 'now') as integer) - 30 * 24 * 3600;
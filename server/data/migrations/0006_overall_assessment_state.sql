@@ -0,0 +1,14 @@
+-- rolling overall assessment: the summary stays in users.overallPerformance and users.overallBand,
+-- this table records the last exam result of each kind already folded into it.
+create table if not exists overallAssessmentState (
+    userId            integer primary key,
+    readingWatermark  integer not null default 0,
+    writingWatermark  integer not null default 0,
+    oralWatermark     integer not null default 0,
+    assessedTime      integer not null default 0
+);
+
+-- results of a user after the watermark, the rowid is the trailing key of these indexes
+create index if not exists idx_academicalPassageExamResult_user on academicalPassageExamResult (userId);
+create index if not exists idx_essayWritingExamResult_user on essayWritingExamResult (userId);
+create index if not exists idx_oralEnglishExamResult_user on oralEnglishExamResult (userId);
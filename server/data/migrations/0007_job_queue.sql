@@ -0,0 +1,21 @@
+-- durable background jobs, see jobQueue.JobQueue.
+-- `availableTime` is when a pending job is due, or when the visibility timeout of a running job expires.
+create table if not exists job (
+    id             integer primary key autoincrement,
+    kind           string not null,
+    payload        string not null,
+    userId         integer,
+    status         string not null default 'pending',
+    attempts       integer not null default 0,
+    maxAttempts    integer not null default 5,
+    availableTime  integer not null,
+    createTime     integer not null,
+    updateTime     integer not null,
+    result         string,
+    error          string
+);
+
+-- workers look for due pending and timed out running jobs
+create index if not exists idx_job_status_available on job (status, availableTime);
+-- purging finished jobs
+create index if not exists idx_job_status_update on job (status, updateTime);
@@ -0,0 +1,6 @@
+-- reading results are stored as soon as they are scored, the AI feedback is generated afterwards.
+-- `feedbackStatus` is `pending` until the feedback is filled in, `ready` afterwards.
+alter table academicalPassageExamResult add column feedbackStatus string not null default 'ready';
+
+-- the overall assessment waits for pending feedback of the user
+create index if not exists idx_academicalPassageExamResult_pending on academicalPassageExamResult (userId, id) where feedbackStatus = 'pending';
@@ -0,0 +1,8 @@
+-- writing and oral results are stored by background jobs, which may run again after storing the result,
+-- e.g. when the server restarts before the job is marked as done. The exam session a result comes from
+-- makes storing it idempotent, results of older servers have none.
+alter table essayWritingExamResult add column examSessionId string;
+alter table oralEnglishExamResult add column examSessionId string;
+
+create unique index if not exists idx_essayWritingExamResult_session on essayWritingExamResult (examSessionId);
+create unique index if not exists idx_oralEnglishExamResult_session on oralEnglishExamResult (examSessionId);
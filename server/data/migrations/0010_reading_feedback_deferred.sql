@@ -0,0 +1,7 @@
+-- reading results whose feedback job was not admitted by the busy reading judger are stored with `feedbackStatus` `deferred`,
+-- their feedback is queued once the judger has room again.
+create index if not exists idx_academicalPassageExamResult_deferred on academicalPassageExamResult (id) where feedbackStatus = 'deferred';
+
+-- the overall assessment waits for pending and deferred feedback of the user
+drop index if exists idx_academicalPassageExamResult_pending;
+create index if not exists idx_academicalPassageExamResult_unassessed on academicalPassageExamResult (userId, id) where feedbackStatus <> 'ready';
@@ -0,0 +1,16 @@
+-- result lists page by (completeTime, id), `id` has to follow `completeTime` for the order by and the seek condition to use the index.
+-- the trailing columns keep the result list queries index-only
+drop index if exists idx_academicalPassageExamResult_user_time;
+drop index if exists idx_essayWritingExamResult_user_time;
+drop index if exists idx_oralEnglishExamResult_user_time;
+create index if not exists idx_academicalPassageExamResult_user_time on academicalPassageExamResult (userId, completeTime, id, examPaperId, band);
+create index if not exists idx_essayWritingExamResult_user_time on essayWritingExamResult (userId, completeTime, id, examPaperId, band);
+create index if not exists idx_oralEnglishExamResult_user_time on oralEnglishExamResult (userId, completeTime, id, examPaperId, band);
+
+-- administrator result lists without a user filter
+drop index if exists idx_academicalPassageExamResult_time;
+drop index if exists idx_essayWritingExamResult_time;
+drop index if exists idx_oralEnglishExamResult_time;
+create index if not exists idx_academicalPassageExamResult_time on academicalPassageExamResult (completeTime, id, examPaperId, userId, band);
+create index if not exists idx_essayWritingExamResult_time on essayWritingExamResult (completeTime, id, examPaperId, userId, band);
+create index if not exists idx_oralEnglishExamResult_time on oralEnglishExamResult (completeTime, id, examPaperId, userId, band);
@@ -0,0 +1,57 @@
+-- keep the recent exam result summaries in step with the results and exam papers they copy from, whichever path changes them:
+-- deleting a result or an exam paper removes its summaries, renaming an exam paper renames them.
+create trigger if not exists trg_academicalPassageExamResult_delete_recent after delete on academicalPassageExamResult
+begin
+    delete from recentExamResult where examType = 'reading' and resultId = old.id;
+end;
+
+create trigger if not exists trg_essayWritingExamResult_delete_recent after delete on essayWritingExamResult
+begin
+    delete from recentExamResult where examType = 'writing' and resultId = old.id;
+end;
+
+create trigger if not exists trg_oralEnglishExamResult_delete_recent after delete on oralEnglishExamResult
+begin
+    delete from recentExamResult where examType = 'oral' and resultId = old.id;
+end;
+
+create trigger if not exists trg_academicalPassageExamPaper_delete_recent after delete on academicalPassageExamPaper
+begin
+    delete from recentExamResult where examType = 'reading' and examPaperId = old.id;
+end;
+
+create trigger if not exists trg_essayWritingExamPaper_delete_recent after delete on essayWritingExamPaper
+begin
+    delete from recentExamResult where examType = 'writing' and examPaperId = old.id;
+end;
+
+create trigger if not exists trg_oralEnglishExamPaper_delete_recent after delete on oralEnglishExamPaper
+begin
+    delete from recentExamResult where examType = 'oral' and examPaperId = old.id;
+end;
+
+create trigger if not exists trg_academicalPassageExamPaper_rename_recent after update of title on academicalPassageExamPaper when new.title is not old.title
+begin
+    update recentExamResult set title = new.title where examType = 'reading' and examPaperId = new.id;
+end;
+
+create trigger if not exists trg_essayWritingExamPaper_rename_recent after update of title on essayWritingExamPaper when new.title is not old.title
+begin
+    update recentExamResult set title = new.title where examType = 'writing' and examPaperId = new.id;
+end;
+
+create trigger if not exists trg_oralEnglishExamPaper_rename_recent after update of title on oralEnglishExamPaper when new.title is not old.title
+begin
+    update recentExamResult set title = new.title where examType = 'oral' and examPaperId = new.id;
+end;
+
+-- drop the summaries left behind by results and exam papers deleted before these triggers existed
+delete from recentExamResult where examType = 'reading' and (
+    not exists (select 1 from academicalPassageExamResult r where r.id = recentExamResult.resultId)
+    or not exists (select 1 from academicalPassageExamPaper p where p.id = recentExamResult.examPaperId));
+delete from recentExamResult where examType = 'writing' and (
+    not exists (select 1 from essayWritingExamResult r where r.id = recentExamResult.resultId)
+    or not exists (select 1 from essayWritingExamPaper p where p.id = recentExamResult.examPaperId));
+delete from recentExamResult where examType = 'oral' and (
+    not exists (select 1 from oralEnglishExamResult r where r.id = recentExamResult.resultId)
+    or not exists (select 1 from oralEnglishExamPaper p where p.id = recentExamResult.examPaperId));
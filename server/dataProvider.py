@@ -1,4 +1,6 @@
 import data.config
+import collections
+import contextlib
 from datetime import timedelta
 import json
 import sqlite3
@@ -10,70 +12,496 @@ import hashlib
 import pathlib
 import tools
 import chatModel
+import blobStore
+import queryBuilder
+import jobQueue
+import io
+import os
+import queue
 import threading
 
 
-class ExamJudgerLock():
-    def __init__(self):
-        self.readingExamQueue: list[threading.Lock] = [None] * 8
-        self.writingExamQueue: list[threading.Lock] = [None] * 8
-        self.oralExamQueue: list[threading.Lock] = [None] * 4
-        logger.Logger.log('Initializing exam judger lock')
-        logger.Logger.log(f'Reading exam judger concurrency limit: {len(self.readingExamQueue)}')
-        logger.Logger.log(f'Writing exam judger concurrency limit: {len(self.writingExamQueue)}')
-        logger.Logger.log(f'Oral exam judger concurrency limit: {len(self.oralExamQueue)}')
-        for i, x in enumerate(self.readingExamQueue):
-            self.readingExamQueue[i] = threading.Lock()
-        for i, x in enumerate(self.writingExamQueue):
-            self.writingExamQueue[i] = threading.Lock()
-        for i, x in enumerate(self.oralExamQueue):
-            self.oralExamQueue[i] = threading.Lock()
-        
-        
-    
-    def acquireReadingExamJudger(self) -> threading.Lock:
-        for i in self.readingExamQueue:
-            if not i.locked():
-                return i
-        return self.readingExamQueue[0]
-    
-    
-    def acquireWritingExamJudger(self) -> threading.Lock:
-        for i in self.writingExamQueue:
-            if not i.locked():
-                return i
-        return self.writingExamQueue[0]
-    
-    
-    def acquireOralExamJudger(self) -> threading.Lock:
-        for i in self.oralExamQueue:
-            if not i.locked():
-                return i
-        return self.oralExamQueue[0]
-        
+class JudgerBusyError(RuntimeError):
+    """
+    Raised when an exam judger cannot admit a submission in time, the submission should be retried later.
+    """
+
+
+class AdmissionController():
+    """
+    Bounded admission control of one kind of exam grading, applied when a result is submitted rather than inside the job workers.
+
+    Every admitted submission holds one of `capacity` slots until its grading job finishes, succeeded or finally failed,
+    so at most `capacity` results of the kind wait for or are being graded at once.
+    Submissions waiting for a slot are admitted in arrival order. A submission waits at most `timeout` seconds,
+    and is rejected right away when `queueLimit` submissions are already waiting.
+    """
+
+    def __init__(self, name: str, capacity: int, queueLimit: int, timeout: float, active: int = 0):
+        """
+        Args:
+            name (str): The kind of exams, used in the busy message.
+            capacity (int): The number of slots.
+            queueLimit (int): The number of submissions waiting for a slot.
+            timeout (float): Seconds a submission waits for a slot at most.
+            active (int, optional): The number of slots held by grading jobs left over from before a restart. Defaults to 0.
+        """
+        self.name = name
+        self.capacity = capacity
+        self.queueLimit = queueLimit
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.active = active
+        self.waiters: collections.deque[threading.Event] = collections.deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.timedOut = 0
+        self.totalWaitTime = 0.0
+        self.maxWaitTime = 0.0
+        self.maxQueueDepth = 0
+
+    def tryAcquire(self) -> bool:
+        """
+        Take a free slot without waiting, for work deferred earlier, so no rejection is counted when there is none.
+
+        Returns:
+            bool: Whether a slot was taken, it must be released afterwards if so.
+        """
+        with self.lock:
+            if self.active < self.capacity and not self.waiters:
+                self.active += 1
+                self.admitted += 1
+                return True
+            return False
+
+    def acquire(self, timeout: float = None) -> bool:
+        """
+        Wait for a slot.
+
+        Args:
+            timeout (float, optional): Seconds to wait at most, 0 only takes a free slot. Defaults to the timeout of the controller.
+
+        Returns:
+            bool: Whether the submission is admitted, the slot must be released afterwards if so.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        begin = time.monotonic()
+        with self.lock:
+            if self.active < self.capacity and not self.waiters:
+                self.active += 1
+                self.admitted += 1
+                return True
+            if timeout <= 0 or len(self.waiters) >= self.queueLimit:
+                self.rejected += 1
+                return False
+            waiter = threading.Event()
+            self.waiters.append(waiter)
+            self.maxQueueDepth = max(self.maxQueueDepth, len(self.waiters))
+
+        admitted = waiter.wait(timeout)
+        with self.lock:
+            # the slot may have been handed over between the timeout and taking the lock
+            if not admitted and not waiter.is_set():
+                self.waiters.remove(waiter)
+                self.timedOut += 1
+                return False
+            wait = time.monotonic() - begin
+            self.admitted += 1
+            self.totalWaitTime += wait
+            self.maxWaitTime = max(self.maxWaitTime, wait)
+            return True
+
+    def release(self) -> None:
+        with self.lock:
+            # slots left over from before a restart may exceed the capacity, they are not handed over
+            if self.waiters and self.active <= self.capacity:
+                # hand the slot over to the oldest waiter, the number of active slots stays the same
+                self.waiters.popleft().set()
+            else:
+                self.active -= 1
+
+    def submit(self, enqueue: typing.Callable[[], int], timeout: float = None) -> int:
+        """
+        Wait for a slot and enqueue the grading job which holds it, the slot is released once the job finishes.
+        The slot is taken before the job is enqueued, so concurrent submissions never exceed the capacity.
+
+        Args:
+            enqueue (typing.Callable[[], int]): Enqueues the grading job and returns its ID.
+            timeout (float, optional): Seconds to wait at most. Defaults to the timeout of the controller.
+
+        Returns:
+            int: The ID of the grading job.
+
+        Raises:
+            JudgerBusyError: If the submission is not admitted in time.
+        """
+        if not self.acquire(timeout):
+            raise JudgerBusyError(f'The {self.name} exam judger is busy, please retry later')
+        try:
+            return enqueue()
+        except BaseException:
+            self.release()
+            raise
+
+    def stats(self) -> dict[str | typing.Any]:
+        with self.lock:
+            return {
+                'capacity': self.capacity,
+                'active': self.active,
+                'queueDepth': len(self.waiters),
+                'maxQueueDepth': self.maxQueueDepth,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timedOut': self.timedOut,
+                'averageWaitTime': self.totalWaitTime / self.admitted if self.admitted else 0.0,
+                'maxWaitTime': self.maxWaitTime,
+            }
+
+
+class ExamPaperCache():
+    """
+    In-process LRU cache of exam papers, keyed by paper type and ID.
+
+    Every paper has a version which is bumped when it is invalidated, and a loaded row is only cached
+    if the version did not change while loading, so an update racing with a cache miss never leaves a stale entry.
+    The cached rows keep their JSON columns encoded and are never handed out, readers get copies with freshly decoded JSON columns.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.entries: collections.OrderedDict[tuple[str, int], tuple[int, dict[str | typing.Any]]] = collections.OrderedDict()
+        self.versions: dict[tuple[str, int], int] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind: str, examId: int, loader: typing.Callable[[], dict[str | typing.Any] | None], jsonColumns: tuple[str, ...] = ()) -> dict[str | typing.Any] | None:
+        """
+        Get a copy of the exam paper, loading it on a cache miss.
+
+        Args:
+            kind (str): The type of the paper, e.g. 'reading'.
+            examId (int): The ID of the paper.
+            loader (typing.Callable[[], dict[str | typing.Any] | None]): Loads the raw row of the paper, or None if not found.
+            jsonColumns (tuple[str, ...], optional): The columns holding JSON, decoded in the returned copy. Defaults to ().
+
+        Returns:
+            dict[str | typing.Any] | None: A private copy of the paper, or None if not found.
+        """
+        key = (kind, int(examId))
+        with self.lock:
+            version = self.versions.get(key, 0)
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                row = entry[1]
+            else:
+                self.misses += 1
+                row = None
+
+        if row is None:
+            row = loader()
+            if row is None:
+                return None
+            with self.lock:
+                if self.versions.get(key, 0) == version:
+                    self.entries[key] = (version, row)
+                    self.entries.move_to_end(key)
+                    if len(self.entries) > self.capacity:
+                        self.entries.popitem(last=False)
+
+        paper = dict(row)
+        for column in jsonColumns:
+            paper[column] = json.loads(row[column])
+        return paper
+
+    def invalidate(self, kind: str, examId: int):
+        """
+        Drop the cached paper, must be called after the change has been written to the database.
+
+        Args:
+            kind (str): The type of the paper.
+            examId (int): The ID of the paper.
+        """
+        key = (kind, int(examId))
+        with self.lock:
+            self.versions[key] = self.versions.get(key, 0) + 1
+            self.entries.pop(key, None)
+
+    def stats(self) -> dict[str, int]:
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries)}
+
+
+class PrincipalCache():
+    """
+    Short-lived cache of the principals (ID, username and permission bitmask) of authenticated users.
+
+    Entries expire after a TTL and are dropped as soon as the user is updated or deleted.
+    Like `ExamPaperCache`, a principal loaded while the user is being updated is not cached.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.entries: dict[int, tuple[float, dict[str | typing.Any]]] = {}
+        self.versions: dict[int, int] = {}
+        self.lock = threading.Lock()
+
+    def get(self, userId: int, loader: typing.Callable[[], dict[str | typing.Any] | None]) -> dict[str | typing.Any] | None:
+        """
+        Get the principal of the user, loading it if missing or expired.
+
+        Args:
+            userId (int): The ID of the user.
+            loader (typing.Callable[[], dict[str | typing.Any] | None]): Loads the principal, or None if the user does not exist.
+
+        Returns:
+            dict[str | typing.Any] | None: The principal, which must not be modified, or None if the user does not exist.
+        """
+        userId = int(userId)
+        now = time.monotonic()
+        with self.lock:
+            version = self.versions.get(userId, 0)
+            entry = self.entries.get(userId)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+
+        principal = loader()
+        if principal is not None:
+            with self.lock:
+                if self.versions.get(userId, 0) == version:
+                    self.entries[userId] = (now + self.ttl, principal)
+                    if len(self.entries) > 1024:
+                        # expired entries are otherwise only replaced by the next request of the same user
+                        for i in [i for i, entry in self.entries.items() if entry[0] <= now]:
+                            del self.entries[i]
+        return principal
+
+    def invalidate(self, userId: int):
+        """
+        Drop the cached principal, must be called after the change has been written to the database.
+
+        Args:
+            userId (int): The ID of the user.
+        """
+        userId = int(userId)
+        with self.lock:
+            self.versions[userId] = self.versions.get(userId, 0) + 1
+            self.entries.pop(userId, None)
+
+
+class ConfigSnapshot():
+    """
+    An immutable view of the `config` row at one point in time.
+
+    The data provider publishes a new snapshot by replacing its reference, readers grab the current reference without locking.
+
+    Attributes:
+        version (int): Incremented every time the config is reloaded.
+        data (dict[str | typing.Any] | None): The config row, or None if the server is not initialized. Must not be modified.
+    """
+
+    def __init__(self, version: int, data: dict[str | typing.Any] | None):
+        self.version = version
+        self.data = data
+
+
+class PooledBlob:
+    """
+    A read-only BLOB handle opened on a pooled read connection, which goes back to the pool once the handle is closed.
+    """
+
+    def __init__(self, blob: sqlite3.Blob, release: typing.Callable[[], None]) -> None:
+        self.blob = blob
+        self.release = release
+
+    def read(self, length: int = -1) -> bytes:
+        return self.blob.read(length)
+
+    def seek(self, offset: int, origin: int = os.SEEK_SET) -> None:
+        self.blob.seek(offset, origin)
+
+    def tell(self) -> int:
+        return self.blob.tell()
+
+    def __len__(self) -> int:
+        return len(self.blob)
+
+    def close(self) -> None:
+        if self.blob is not None:
+            self.blob.close()
+            self.blob = None
+            self.release()
+
+    def __enter__(self) -> 'PooledBlob':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class StatementCacheMirror:
+    """
+    Mirror of the LRU prepared statement cache of one connection, sqlite3 does not report its hits.
+    A connection is only used by one thread at a time, so the mirror is updated without a lock.
+    Its counters are read without one as well, the aggregated hit rate is an estimate.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.statements: collections.OrderedDict[str, None] = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def track(self, query: str) -> None:
+        if query in self.statements:
+            self.statements.move_to_end(query)
+            self.hits += 1
+        else:
+            self.statements[query] = None
+            if len(self.statements) > self.size:
+                self.statements.popitem(last=False)
+            self.misses += 1
 
 
 class DatabaseObject:
     """
-    Class representing a database connection object.
+    Class representing a pooled database connection object.
+
+    The database is opened in WAL mode. All writes go through a single connection serialized by a lock,
+    while reads check out one of `DATABASE_READER_POOL_SIZE` read-only connections opened upfront, and wait when all of them are in use.
 
     Args:
         dbPath (str): Path to the SQLite database file.
+        pragmas (dict[str, typing.Any], optional): PRAGMA profile applied to every connection. Defaults to `data.config.DATABASE_PRAGMA_PROFILE`.
 
     Methods:
-        query(query, args=(), one=False):
+        query(query, args=(), one=False, asTuples=False):
             Execute an SQL query on the database.
+        iterquery(query, args=(), asTuples=False, batchSize=256):
+            Execute a select query and yield its rows one by one.
         runScript(query):
             Execute an SQL script on the database.
+        commit():
+            Commit pending changes of the writer connection.
+        rollback():
+            Roll back pending changes of the writer connection.
         close():
-            Close the database connection.
+            Close all connections of the pool.
+        statementCacheStats():
+            Estimate the hit rate of the prepared statement caches.
     """
 
-    def __init__(self, dbPath: str) -> None:
-        self.db = sqlite3.connect(dbPath, check_same_thread=False)
+    def __init__(self, dbPath: str, pragmas: dict[str, typing.Any] | None = None) -> None:
+        self.dbPath = dbPath
+        self.pragmas = data.config.DATABASE_PRAGMA_PROFILE if pragmas is None else pragmas
+        # in-memory databases are private to a connection, readers have to share the writer
+        self.shared = dbPath == ':memory:'
         self.lock = threading.Lock()
+        self.statementCacheSize = data.config.DATABASE_STATEMENT_CACHE_SIZE
+        # filled while the connections are opened below, and never changed afterwards
+        self.statements: dict[sqlite3.Connection, StatementCacheMirror] = {}
+        self.db = self.connect(readonly=False)
+        self.readerConnections = [] if self.shared else [self.connect(readonly=True) for _ in range(data.config.DATABASE_READER_POOL_SIZE)]
+        self.readers: queue.Queue[sqlite3.Connection] = queue.Queue()
+        for conn in self.readerConnections:
+            self.readers.put(conn)
 
-    def query(self, query, args=(), one=False) -> list[dict[str | typing.Any]] | dict[str | typing.Any]:
+    def connect(self, readonly: bool) -> sqlite3.Connection:
+        """
+        Open a new connection in autocommit mode and apply the PRAGMA profile.
+
+        Args:
+            readonly (bool): Whether the connection is used for reads only.
+
+        Returns:
+            sqlite3.Connection: The connection.
+        """
+        conn = sqlite3.connect(self.dbPath, check_same_thread=False, isolation_level=None, cached_statements=self.statementCacheSize)
+        for key, value in self.pragmas.items():
+            if key == 'journal_mode' and readonly:
+                continue
+            conn.execute(f'pragma {key} = {value}').close()
+        if readonly:
+            conn.execute('pragma query_only = 1').close()
+        self.statements[conn] = StatementCacheMirror(self.statementCacheSize)
+        return conn
+
+    @contextlib.contextmanager
+    def reader(self) -> typing.Generator[sqlite3.Connection, None, None]:
+        """
+        Check out a read connection from the pool, waiting for one to be returned if all of them are in use.
+
+        Yields:
+            sqlite3.Connection: The read connection, returned to the pool when the context exits.
+        """
+        conn = self.readers.get()
+        try:
+            yield conn
+        finally:
+            self.readers.put(conn)
+
+    def trackStatement(self, conn: sqlite3.Connection, query: str):
+        """
+        Record the execution of a statement to estimate the hit rate of the statement cache of the connection.
+        Must be called by the thread holding the connection.
+
+        Args:
+            conn (sqlite3.Connection): The connection executing the statement.
+            query (str): The SQL text of the statement.
+        """
+        self.statements[conn].track(query)
+
+    def statementCacheStats(self) -> dict[str, typing.Any]:
+        """
+        Estimate the hit rate of the prepared statement caches of all connections.
+        The counters of the connections are summed up without stopping the queries running on them.
+
+        Returns:
+            dict[str, typing.Any]: The `hits`, `misses`, `estimatedHitRate` and the number of `cachedStatements`.
+        """
+        mirrors = list(self.statements.values())
+        hits = sum(i.hits for i in mirrors)
+        misses = sum(i.misses for i in mirrors)
+        return {
+            'hits': hits,
+            'misses': misses,
+            'estimatedHitRate': hits / (hits + misses) if hits + misses else 0.0,
+            'cachedStatements': sum(len(i.statements) for i in mirrors),
+        }
+
+    def isReadOnlyQuery(self, query: str) -> bool:
+        """
+        Check whether the query can be served by a read connection.
+
+        Args:
+            query (str): The SQL query.
+
+        Returns:
+            bool: True if the query is a plain select statement.
+        """
+        return query.lstrip()[:6].lower() == 'select'
+
+    @staticmethod
+    def materialize(cur: sqlite3.Cursor, rows: list[tuple], asTuples: bool = False) -> list[dict[str | typing.Any]] | list[tuple]:
+        """
+        Turn fetched rows into result rows, reading the column names of the cursor only once.
+
+        Args:
+            cur (sqlite3.Cursor): The cursor the rows were fetched from.
+            rows (list[tuple]): The fetched rows.
+            asTuples (bool, optional): Return the plain tuples without building dictionaries. Defaults to False.
+
+        Returns:
+            list[dict[str | typing.Any]] | list[tuple]: The rows.
+        """
+        if asTuples or cur.description is None:
+            return rows
+        names = tuple(column[0] for column in cur.description)
+        return [dict(zip(names, row)) for row in rows]
+
+    def query(self, query, args=(), one=False, asTuples=False) -> list[dict[str | typing.Any]] | dict[str | typing.Any]:
         """
         Execute an SQL query on the database.
 
@@ -81,22 +509,96 @@ class DatabaseObject:
             query (str): The SQL query to be executed.
             args (tuple, optional): Query parameters. Defaults to ().
             one (bool, optional): Return only one result. Defaults to False.
+            asTuples (bool, optional): Return rows as plain tuples in column order, which is cheaper for large results. Defaults to False.
 
         Returns:
-            list[dict[str | typing.Any]] | dict[str | typing.Any]: Query result.
+            list[dict[str | typing.Any]] | dict[str | typing.Any]: Query result. The rowid of the new row for inserts without a `returning` clause.
         """
 
+        if self.isReadOnlyQuery(query) and not self.shared:
+            with self.reader() as conn:
+                self.trackStatement(conn, query)
+                cur = conn.execute(query, args)
+                rv = self.materialize(cur, cur.fetchall(), asTuples)
+                cur.close()
+            return (rv[0] if rv else None) if one else rv
+
         with self.lock:
+            self.trackStatement(self.db, query)
             cur = self.db.execute(query, args)
-            rv = [dict((cur.description[idx][0], value)
-                       for idx, value in enumerate(row)) for row in cur.fetchall()]
+            hasRows = cur.description is not None
+            rv = self.materialize(cur, cur.fetchall(), asTuples) if hasRows else []
             lastrowid = cur.lastrowid
             cur.close()
-            if query.startswith('insert'):
+            # inserts return the new rowid, unless the statement has a returning clause
+            if query.startswith('insert') and not hasRows:
                 return lastrowid
             else:
                 return (rv[0] if rv else None) if one else rv
 
+    def iterquery(self, query: str, args=(), asTuples: bool = False, batchSize: int = 256) -> typing.Generator[dict[str | typing.Any] | tuple, None, None]:
+        """
+        Execute a select query and yield its rows as they are read, without holding the whole result in memory.
+        The rows are read from a pooled read connection, so writes of other threads are not blocked.
+        The connection stays checked out until the generator is exhausted or closed.
+
+        Args:
+            query (str): The SQL select query to be executed.
+            args (tuple, optional): Query parameters. Defaults to ().
+            asTuples (bool, optional): Yield rows as plain tuples in column order. Defaults to False.
+            batchSize (int, optional): The number of rows fetched from SQLite at once. Defaults to 256.
+
+        Yields:
+            dict[str | typing.Any] | tuple: The next row.
+        """
+        if not self.isReadOnlyQuery(query):
+            raise ValueError('Only select queries can be iterated')
+
+        if self.shared:
+            # the only connection is guarded by the writer lock, which cannot be held across yields
+            yield from self.query(query, args, asTuples=asTuples)
+            return
+
+        with self.reader() as conn:
+            self.trackStatement(conn, query)
+            cur = conn.execute(query, args)
+            try:
+                names = tuple(column[0] for column in cur.description)
+                while rows := cur.fetchmany(batchSize):
+                    if asTuples:
+                        yield from rows
+                    else:
+                        for row in rows:
+                            yield dict(zip(names, row))
+            finally:
+                cur.close()
+
+    def openBlob(self, table: str, column: str, rowId: int) -> PooledBlob | None:
+        """
+        Open a BLOB column of a row for incremental reading on a pooled read connection.
+        The connection stays checked out until the handle is closed.
+
+        Args:
+            table (str): The table name.
+            column (str): The BLOB column name.
+            rowId (int): The rowid of the row.
+
+        Returns:
+            PooledBlob | None: The read-only blob handle, or None if the row does not exist. The caller is responsible for closing it.
+        """
+        if self.shared:
+            try:
+                return PooledBlob(self.db.blobopen(table, column, rowId, readonly=True), lambda: None)
+            except sqlite3.OperationalError:
+                return None
+
+        conn = self.readers.get()
+        try:
+            return PooledBlob(conn.blobopen(table, column, rowId, readonly=True), lambda: self.readers.put(conn))
+        except sqlite3.OperationalError:
+            self.readers.put(conn)
+            return None
+
     def runScript(self, query: str):
         """
         Execute an SQL script on the database.
@@ -104,23 +606,159 @@ class DatabaseObject:
         Args:
             query (str): The SQL script to be executed.
         """
-        self.db.executescript(query)
-        self.db.commit()
+        with self.lock:
+            self.db.executescript(query)
+            self.commit()
         return None
 
+    def commit(self):
+        """Commit pending changes of the writer connection, if any."""
+        if self.db.in_transaction:
+            self.db.commit()
+
+    def rollback(self):
+        """Roll back the pending transaction of the writer connection, if any."""
+        with self.lock:
+            if self.db.in_transaction:
+                self.db.rollback()
+
     def close(self):
-        """Close the database connection."""
+        """Close all connections of the pool."""
+        for conn in self.readerConnections:
+            conn.close()
+        self.statements.clear()
         self.db.close()
         
 
 class _DataProvider:
     def __init__(self, db_path: str = './blob/database.db'):
         self.db = DatabaseObject(db_path)
-        self.judgerLock = ExamJudgerLock()
+        self.examPaperCache = ExamPaperCache(data.config.EXAM_PAPER_CACHE_SIZE)
+        self.principalCache = PrincipalCache(data.config.PRINCIPAL_CACHE_TTL)
         if not self.checkIfInitialized():
             logger.Logger.log('Database not initialized')
+        self.migrate()
+        self.configLock = threading.Lock()
+        self.configSnapshot = ConfigSnapshot(0, None)
+        self.reloadConfig()
+        # language models use the key of the current config snapshot unless a call passes its own
+        chatModel.apiKeyProvider = self.getGoogleApiKey
+        self.blobLock = threading.Lock()
+        self.blobStore: blobStore.BlobStore = blobStore.FileSystemBlobStore(data.config.ARTIFACT_STORAGE_PATH, data.config.ARTIFACT_STORAGE_SHARD_DEPTH)
+        self.migrateArtifactContents()
+        self.jobQueue = jobQueue.JobQueue(self.db, data.config.JOB_QUEUE_WORKERS, data.config.JOB_VISIBILITY_TIMEOUT, data.config.JOB_MAX_ATTEMPTS,
+                                          data.config.JOB_RETRY_BACKOFF, data.config.JOB_MAX_RETRY_BACKOFF)
+        # grading runs in the job workers, the judgers bound the results of each kind waiting for or being graded when they are submitted
+        self.judgers: dict[str, AdmissionController] = {}
+        for kind, jobKind in [('reading', 'readingExamFeedback'), ('writing', 'writingExamResult'), ('oral', 'oralExamResult')]:
+            capacity = data.config.EXAM_JUDGER_CONCURRENCY.get(kind) or os.cpu_count()
+            judger = AdmissionController(kind, capacity, data.config.EXAM_JUDGER_QUEUE_LIMIT, data.config.EXAM_JUDGER_WAIT_TIMEOUT,
+                                         self.jobQueue.countOutstanding(jobKind))
+            self.jobQueue.onFinish(jobKind, lambda jobId, judger=judger: judger.release())
+            self.judgers[kind] = judger
+        logger.Logger.log(f'Exam judger concurrency limits: {", ".join(f"{kind}: {judger.capacity}" for kind, judger in self.judgers.items())}')
+        # a finished feedback job makes room for the feedback of deferred reading results
+        self.jobQueue.onFinish('readingExamFeedback', lambda jobId: self.resumeDeferredReadingFeedback())
+        self.jobQueue.register('readingExamFeedback', lambda payload: self.runJob(self.generateReadingExamFeedback, payload))
+        self.jobQueue.register('writingExamResult', lambda payload: self.runJob(self.submitWritingExamResult, payload))
+        self.jobQueue.register('oralExamResult', lambda payload: self.runJob(self.submitOralExamResult, payload))
+        self.jobQueue.register('overallAssessment', lambda payload: self.runJob(self.triggerOverallAssessment, payload))
+        self.resumeDeferredReadingFeedback()
         pass
-    
+
+    def migrate(self, migrationsPath: str = './data/migrations') -> int:
+        """
+        Upgrade the database schema in place by running pending migration scripts.
+        Scripts are named `<version>_<name>.sql` and are applied in ascending version order, each one in its own transaction.
+        Applied versions are recorded in the `schemaVersion` table.
+
+        Args:
+            migrationsPath (str, optional): The directory containing the migration scripts. Defaults to './data/migrations'.
+
+        Returns:
+            int: The schema version after migrating.
+        """
+        self.db.runScript("create table if not exists schemaVersion (version integer primary key, name string not null, appliedTime integer not null)")
+        current = self.db.query("select max(version) as version from schemaVersion", one=True)['version'] or 0
+
+        migrations = []
+        for file in pathlib.Path(migrationsPath).glob('*.sql'):
+            version, _, name = file.stem.partition('_')
+            if version.isdigit():
+                migrations.append((int(version), name, file))
+
+        for version, name, file in sorted(migrations):
+            if version <= current:
+                continue
+            logger.Logger.log(f'Applying database migration {version}: {name}')
+            name = name.replace("'", "''")
+            try:
+                self.db.runScript(f"begin;\n{file.read_text()}\ninsert into schemaVersion (version, name, appliedTime) values ({version}, '{name}', {int(time.time())});\ncommit;")
+            except Exception:
+                # a failing statement leaves the transaction of the script open, undo the statements before it
+                self.db.rollback()
+                logger.Logger.log(f'Database migration {version} failed, rolled back')
+                raise
+            current = version
+
+        return current
+
+    def migrateArtifactContents(self) -> int:
+        """
+        Move artifact contents still stored inside the database into the blob store.
+        The contents are streamed one by one, and the database file is vacuumed afterwards to give the space back.
+
+        Returns:
+            int: The number of moved artifacts.
+        """
+        moved = 0
+        for row in self.db.iterquery("select id, content from artifact where content is not null order by id", batchSize=1):
+            self.storeArtifactBlob(row['content'], lambda digest: self.db.query("update artifact set digest = ?, size = ?, content = null where id = ?", (digest, len(row['content']), row['id'])))
+            moved += 1
+
+        if moved:
+            logger.Logger.log(f'Moved {moved} artifact contents into the blob store, vacuuming database')
+            self.db.runScript("vacuum")
+        return moved
+
+    def getJudgerStats(self) -> dict[str | typing.Any]:
+        """
+        Get the admission metrics of the exam judgers, such as queue depth and wait time.
+
+        Returns:
+            dict[str | typing.Any]: The result object with the metrics of each kind of exam.
+        """
+        return self.makeResult(True, {kind: judger.stats() for kind, judger in self.judgers.items()})
+
+    def getStatementCacheStats(self) -> dict[str | typing.Any]:
+        """
+        Get the hit rate of the prepared statement caches of the database connections.
+
+        Returns:
+            dict[str | typing.Any]: The result object.
+        """
+        return self.makeResult(True, self.db.statementCacheStats())
+
+    def reloadConfig(self) -> ConfigSnapshot:
+        """
+        Load the config row and publish it as a new snapshot.
+
+        Returns:
+            ConfigSnapshot: The new snapshot.
+        """
+        with self.configLock:
+            self.configSnapshot = ConfigSnapshot(self.configSnapshot.version + 1, self.db.query("select * from config limit 1", one=True))
+            return self.configSnapshot
+
+    def isInitialized(self) -> bool:
+        """
+        Check if the server is initialized, using the config snapshot.
+
+        Returns:
+            bool: True if initialized, False otherwise.
+        """
+        return self.configSnapshot.data is not None
+
     def checkIfInitialized(self):
         """
         Check if the database is initialized.
@@ -134,7 +772,6 @@ class _DataProvider:
             logger.Logger.log('Running initialization script')
             with open(f'./data/init.sql', 'r') as file:
                 self.db.runScript(file.read())
-                self.db.db.commit()
                 
     def addSalt(self, pwd: str) -> str:
         """
@@ -162,6 +799,80 @@ class _DataProvider:
         """
         return {'status': ok, 'data': data} if ok else {'status': ok, 'message': data}
 
+
+    def parsePagination(self, pagination: dict[str | typing.Any] | None, keyLength: int = 1) -> tuple[list[int] | None, int | None, bool]:
+        """
+        Parse the pagination options of a list request.
+        A request giving neither 'cursor' nor 'limit' is not paginated and gets the whole list, as clients which do not follow `nextCursor` expect.
+
+        Args:
+            pagination (dict[str | typing.Any] | None): The pagination options, including 'cursor', 'limit' and 'count'.
+            keyLength (int, optional): The number of keyset columns encoded in the cursor. Defaults to 1.
+
+        Returns:
+            tuple[list[int] | None, int | None, bool]: The decoded cursor (None for the first page), the page size (None for the whole list) and whether to count the total.
+        """
+        if pagination is None:
+            pagination = {}
+
+        if not pagination.get('cursor') and not pagination.get('limit'):
+            return None, None, bool(pagination.get('count', False))
+
+        try:
+            limit = int(pagination.get('limit') or data.config.LIST_DEFAULT_PAGE_SIZE)
+        except (TypeError, ValueError):
+            limit = data.config.LIST_DEFAULT_PAGE_SIZE
+        limit = max(1, min(limit, data.config.LIST_MAX_PAGE_SIZE))
+
+        cursor = None
+        if pagination.get('cursor'):
+            try:
+                cursor = [int(i) for i in str(pagination['cursor']).split(',')]
+            except ValueError:
+                cursor = None
+            if cursor is not None and len(cursor) != keyLength:
+                cursor = None
+
+        return cursor, limit, bool(pagination.get('count', False))
+
+
+    def fetchLimit(self, limit: int | None) -> int | None:
+        """
+        Get the number of rows to fetch for a page, one more than the page size so that the existence of a next page is known.
+
+        Args:
+            limit (int | None): The page size, None for the whole list.
+
+        Returns:
+            int | None: The number of rows to fetch, None for no limit.
+        """
+        return None if limit is None else limit + 1
+
+
+    def makePage(self, rows: list[dict[str | typing.Any]], limit: int | None, keyColumns: list[str], total: int | None = None) -> dict[str | typing.Any]:
+        """
+        Make a result object for one page of a list.
+        The rows are expected to be fetched with `fetchLimit(limit)` so that the existence of a next page is known.
+
+        Args:
+            rows (list[dict[str | typing.Any]]): The fetched rows.
+            limit (int | None): The page size, None for the whole list.
+            keyColumns (list[str]): The keyset columns the cursor is built from.
+            total (int | None, optional): The total count of matching rows, if requested. Defaults to None.
+
+        Returns:
+            dict[str | typing.Any]: The result object, with `nextCursor` set to None on the last page.
+        """
+        nextCursor = None
+        if limit is not None and len(rows) > limit:
+            del rows[limit:]
+            nextCursor = ','.join(str(rows[-1][k]) for k in keyColumns)
+
+        result = self.makeResult(True, data=rows)
+        result['nextCursor'] = nextCursor
+        result['total'] = total
+        return result
+
                 
     def initialize(self, userName: str, password: str, email: str, chatbotName: str, chatbotPersona: str, googleApiKey: str, AIDubEndpoint: str, AIDubModel: str) -> None:
         """
@@ -182,41 +893,83 @@ class _DataProvider:
         self.createUser(userName, password, email, 114514, 114514, 0b11111101)
         self.createUser('test_account', 'evaluation', 'test_acc@mail.xiaokang00010.top', 100, 100, 0b11111101)
         self.db.query("insert into config (chatbotName, chatbotPersona, chatbotAvatar, googleApiKey, AIDubEndpoint, AIDubModel) values (?,?,?,?,?,?)", (chatbotName, chatbotPersona, chatbotAvatar, googleApiKey, AIDubEndpoint, AIDubModel))
+        self.reloadConfig()
         return self.makeResult(True)
         
-    def checkIfUserHasPermission(self, userId: int, permission: str) -> dict[str | typing.Any]:
+    permissionBits = {
+        'new_exam_paper_creat': 0b10000000,
+        'artifact_creat': 0b01000000,
+        'all_exam_result_view': 0b00100000,
+        'self_exam_result_view': 0b00010000,
+        'artifact_rw': 0b00001000,
+        'administrator': 0b00000001,
+    }
+    """
+    Bits of the capabilities in `users.permission`.
+    """
+
+
+    def getPrincipal(self, userId: int) -> dict[str | typing.Any] | None:
         """
-        Check if the user has the permission.
+        Get the principal of the user, served from the principal cache when possible.
 
         Args:
             userId (int): The ID of the user.
+
+        Returns:
+            dict[str | typing.Any] | None: The `id`, `username` and `permission` bitmask of the user, or None if not found. It must not be modified.
+        """
+        return self.principalCache.get(userId, lambda: self.db.query("select id, username, permission from users where id = ?", (userId,), one=True))
+
+
+    def checkPrincipalPermission(self, principal: dict[str | typing.Any] | None, permission: str) -> dict[str | typing.Any]:
+        """
+        Check if the principal has the permission, without querying the database.
+
+        Args:
+            principal (dict[str | typing.Any] | None): The principal returned by `getPrincipal`.
             permission (str): The permission to be checked, includes 'new_exam_paper_creat', 'artifact_creat', 'all_exam_result_view','self_exam_result_view', 'artifact_rw', 'administrator'.
 
         Returns:
             dict[str | typing.Any]: The result object.
         """
-        user = self.getUserInfoByID(userId)
-        if user is None:
+        if principal is None:
             return self.makeResult(False, data='User not found')
         
-        if user['permission'] & 0b00000001:
+        if principal['permission'] & self.permissionBits['administrator']:
             return self.makeResult(True)
-        if permission == 'new_exam_paper_creat':
-            return self.makeResult(True) if user['permission'] & 0b10000000 else self.makeResult(False, data='No permission')
-        elif permission == 'artifact_creat':
-            return self.makeResult(True) if user['permission'] & 0b01000000 else self.makeResult(False, data='No permission')
-        elif permission == 'all_exam_result_view':
-            return self.makeResult(True) if user['permission'] & 0b00100000 else self.makeResult(False, data='No permission')
-        elif permission == 'self_exam_result_view':
-            return self.makeResult(True) if user['permission'] & 0b00010000 else self.makeResult(False, data='No permission')
-        elif permission == 'artifact_rw':
-            return self.makeResult(True) if user['permission'] & 0b00001000 else self.makeResult(False, data='No permission')
-        elif permission == 'administrator':
-            return self.makeResult(True) if user['permission'] & 0b00000001 else self.makeResult(False, data='No permission')
-        else:
+        if permission not in self.permissionBits:
             return self.makeResult(False, data='Invalid permission')
+        return self.makeResult(True) if principal['permission'] & self.permissionBits[permission] else self.makeResult(False, data='No permission')
+
+
+    def checkIfUserHasPermission(self, userId: int, permission: str) -> dict[str | typing.Any]:
+        """
+        Check if the user has the permission.
+
+        Args:
+            userId (int): The ID of the user.
+            permission (str): The permission to be checked, includes 'new_exam_paper_creat', 'artifact_creat', 'all_exam_result_view','self_exam_result_view', 'artifact_rw', 'administrator'.
+
+        Returns:
+            dict[str | typing.Any]: The result object.
+        """
+        return self.checkPrincipalPermission(self.getPrincipal(userId), permission)
         
         
+    def makeCapabilities(self, permission: int) -> dict[str, bool]:
+        """
+        Expand the permission bitmask into the capabilities of the user.
+
+        Args:
+            permission (int): The permission bitmask.
+
+        Returns:
+            dict[str, bool]: Whether the user has each capability.
+        """
+        return {name: bool(permission & bit) for name, bit in self.permissionBits.items()}
+
+
     def getUserCapabilities(self, userId: int) -> dict[str | typing.Any]:
         """
         Get the capabilities of the user.
@@ -228,19 +981,11 @@ class _DataProvider:
             dict[str | typing.Any]: The result object.
         """
         
-        user = self.db.query("select permission from users where id = ?", (userId,), one=True)
+        user = self.getPrincipal(userId)
         if user is None:
             return self.makeResult(False, data='User not found')
         
-        capability = {
-            'new_exam_paper_creat': bool(user['permission'] & 0b10000000),
-            'artifact_creat': bool(user['permission'] & 0b01000000),
-            'all_exam_result_view': bool(user['permission'] & 0b00100000),
-            'self_exam_result_view': bool(user['permission'] & 0b00010000),
-            'artifact_rw': bool(user['permission'] & 0b00001000),
-            'administrator': bool(user['permission'] & 0b00000001)
-        }
-        return self.makeResult(True, data=capability)
+        return self.makeResult(True, data=self.makeCapabilities(user['permission']))
         
         
     def getUserInfoByID(self, userId: int, simple: bool = False) -> dict[str | typing.Any]:
@@ -260,7 +1005,7 @@ class _DataProvider:
         if data is None:
             return None
         else:
-            data['capabilities'] = self.getUserCapabilities(userId)['data']
+            data['capabilities'] = self.makeCapabilities(data['permission'])
             if simple:
                 del data['oralExamQuota']
                 del data['oralExamResultViewQuota']
@@ -282,7 +1027,7 @@ class _DataProvider:
         if data is None:
             return None
         else:
-            data['capabilities'] = self.getUserCapabilities(data['id'])['data']
+            data['capabilities'] = self.makeCapabilities(data['permission'])
             return data
     
     def checkIfUsernameExists(self, username: str) -> bool:
@@ -396,47 +1141,24 @@ class _DataProvider:
         else:
             return self.makeResult(False, data='Invalid email or password')
         
-    def getRecentOralEnglishExamResults(self, userId: int):
+    def recordRecentExamResult(self, examType: str, result: dict[str | typing.Any], title: str) -> None:
         """
-        Get recent oral English exam results of the user.
+        Add a submitted exam result to the recent results summary of its user, and drop the summaries which are no longer recent.
 
         Args:
-            userId (int): The ID of the user.
-
-        Returns:
-            list[dict[str | typing.Any]]: The recent oral English exam results.
-        """
-        
-        durationOfAMonth = timedelta(days=30).total_seconds()
-        data = self.db.query("select * from oralEnglishExamResult where userId = ? and completeTime > ?", (userId, int(time.time() - durationOfAMonth)))
-        for i, exam in enumerate(data):
-            # get the exam paper
-            data[i]['examPaper'] = self.getOralExamById(exam['examPaperId'])['data']
-            
-        return data
-    
-    def getRecentAcademicalEnglishExamResults(self, userId: int):
+            examType (str): The type of the exam, `reading`, `writing` or `oral`.
+            result (dict[str | typing.Any]): The inserted exam result.
+            title (str): The title of the exam paper.
         """
-        Get recent academic English exam results of the user.
-
-        Args:
-            userId (int): The ID of the user.
-
-        Returns:
-            list[dict[str | typing.Any]]: The recent academical English exam results.
-        """
-        
-        durationOfAMonth = timedelta(days=30).total_seconds()
-        data = self.db.query("select * from academicalPassageExamResult where userId = ? and completeTime > ?", (userId, int(time.time() - durationOfAMonth)))
-        for i, exam in enumerate(data):
-            # get the exam paper
-            data[i]['examPaper'] = self.getReadingExamById(exam['examPaperId'])['data']
-            
-        return data
+        self.db.query("insert or replace into recentExamResult (userId, examType, resultId, examPaperId, title, band, completeTime) values (?,?,?,?,?,?,?)",
+                      (result['userId'], examType, result['id'], result['examPaperId'], title, result['band'], result['completeTime']))
+        self.db.query("delete from recentExamResult where userId = ? and completeTime <= ?",
+                      (result['userId'], int(time.time()) - data.config.RECENT_EXAM_RESULTS_PERIOD))
 
     def getRecentExamResults(self, userId: int) -> dict[str | typing.Any]:
         """
         Get recent exam results of the user.
+        They are read from the recent results summary, which only holds the title of the exam paper instead of the whole paper.
 
         Args:
             userId (int): The ID of the user.
@@ -445,25 +1167,13 @@ class _DataProvider:
             dict[str | typing.Any]: The recent exam results.
         """
         
-        return {'oralEnglishExamResults': self.getRecentOralEnglishExamResults(userId), 'readingExamResults': self.getRecentAcademicalEnglishExamResults(userId), 'writingExamResults': self.getRecentWritingExamResults(userId)}
-    
-    def getRecentWritingExamResults(self, userId: int):
-        """
-        Get recent writing exam results of the user.
-
-        Args:
-            userId (int): The ID of the user.
-
-        Returns:
-            list[dict[str | typing.Any]]: The recent writing exam results.
-        """
-        
-        durationOfAMonth = timedelta(days=30).total_seconds()
-        data = self.db.query("select * from essayWritingExamResult where userId = ? and completeTime > ?", (userId, int(time.time() - durationOfAMonth)))
-        for i, exam in enumerate(data):
-            # get the exam paper
-            data[i]['examPaper'] = self.getWritingExamById(exam['examPaperId'])['data']
-        return data
+        results = {'reading': [], 'writing': [], 'oral': []}
+        for examType, resultId, examPaperId, title, band, completeTime in self.db.query(
+                "select examType, resultId, examPaperId, title, band, completeTime from recentExamResult where userId = ? and completeTime > ? order by completeTime desc",
+                (userId, int(time.time()) - data.config.RECENT_EXAM_RESULTS_PERIOD), asTuples=True):
+            results[examType].append({'id': resultId, 'userId': userId, 'completeTime': completeTime, 'examPaperId': examPaperId, 'band': band,
+                                      'examPaper': {'id': examPaperId, 'title': title}})
+        return {'oralEnglishExamResults': results['oral'], 'readingExamResults': results['reading'], 'writingExamResults': results['writing']}
     
     
     def getOralEnglishExamResultById(self, examId: int) -> dict[str | typing.Any]:
@@ -537,95 +1247,114 @@ class _DataProvider:
             dict[str | typing.Any]: The result object.
         """
         
-        self.db.query("insert into academicalPassageExamPaper (userId, createTime, availableTime, expireTime, title, passages, answerSheetFormat, duration) values (?,?, ?, ?, ?, ?,?,?)", (userId, int(time.time()), availableTime, expireTime, title, passages, json.dumps(answerSheetFormat), duration))
+        # the correct answers are part of the answer sheet format, the legacy not null `answers` column is left empty
+        self.db.query("insert into academicalPassageExamPaper (userId, createTime, availableTime, expireTime, title, passages, answerSheetFormat, answers, duration) values (?,?, ?, ?, ?, ?,?,'',?)", (userId, int(time.time()), availableTime, expireTime, title, passages, json.dumps(answerSheetFormat), duration))
         return self.makeResult(True)
     
-    def getAllReadingExams(self, filter: dict[str | typing.Any] = None) -> list[dict[str | typing.Any]]:
+    def getAllReadingExams(self, filter: dict[str | typing.Any] = None, pagination: dict[str | typing.Any] = None) -> dict[str | typing.Any]:
         """
-        Get all reading exams.
+        Get all reading exams, one page at a time ordered by ID.
+
+        Args:
+            filter (dict[str | typing.Any], optional): The filter of the exams. Defaults to None.
+            pagination (dict[str | typing.Any], optional): The pagination options, including 'cursor', 'limit' and 'count'. Defaults to None.
 
         Returns:
-            list[dict[str | typing.Any]]: The list of all reading exams.
+            dict[str | typing.Any]: The result object with one page of reading exams.
         """
         
         if filter is None:
             filter = {}
             
-        filterSqlCond = ''
+        query = queryBuilder.SelectQuery("academicalPassageExamPaper")
         if 'userId' in filter:
-            filterSqlCond += f" and userId = {filter['userId']}"
+            query.whereEqual('userId', filter['userId'])
         if 'title' in filter:
-            filterSqlCond += f" and title like '%{filter['title']}%'"
+            query.whereContains('title', filter['title'])
         if 'availableTime' in filter:
             if filter['availableTime'][0] != 0:
-                filterSqlCond += f" and availableTime >= {filter['availableTime'][0]}"
+                query.where('availableTime >= ?', filter['availableTime'][0])
             if filter['availableTime'][1] != 0:
-                filterSqlCond += f" and availableTime <= {filter['availableTime'][1]}"
+                query.where('availableTime <= ?', filter['availableTime'][1])
         
-        result = self.db.query(f"select id, title, availableTime, userId, duration, expireTime from academicalPassageExamPaper where 1=1 {filterSqlCond}")
+        cursor, limit, count = self.parsePagination(pagination)
+        result = self.db.query(*query.select("id, title, availableTime, userId, duration, expireTime", "id", self.fetchLimit(limit), "id > ?", cursor))
         for i in result:
             isAvailable = int(time.time()) > i['availableTime'] and int(time.time()) < i['expireTime']
             i['isAvailable'] = isAvailable
+        total = self.db.query(*query.count(), one=True)['total'] if count else None
             
-        return result
+        return self.makePage(result, limit, ['id'], total)
     
     
-    def getAllWritingExams(self, filter: dict[str | typing.Any] = None) -> list[dict[str | typing.Any]]:
+    def getAllWritingExams(self, filter: dict[str | typing.Any] = None, pagination: dict[str | typing.Any] = None) -> dict[str | typing.Any]:
         """
-        Get all writing exams.
+        Get all writing exams, one page at a time ordered by ID.
+
+        Args:
+            filter (dict[str | typing.Any], optional): The filter of the exams. Defaults to None.
+            pagination (dict[str | typing.Any], optional): The pagination options, including 'cursor', 'limit' and 'count'. Defaults to None.
 
         Returns:
-            list[dict[str | typing.Any]]: The list of all writing exams.
+            dict[str | typing.Any]: The result object with one page of writing exams.
         """
         
         if filter is None:
             filter = {}
             
-        filterSqlCond = ''
+        query = queryBuilder.SelectQuery("essayWritingExamPaper")
         if 'userId' in filter:
-            filterSqlCond += f" and userId = {filter['userId']}"
+            query.whereEqual('userId', filter['userId'])
         if 'title' in filter:
-            filterSqlCond += f" and title like '%{filter['title']}%'"
+            query.whereContains('title', filter['title'])
         if 'availableTime' in filter:
             if filter['availableTime'][0] != 0:
-                filterSqlCond += f" and availableTime >= {filter['availableTime'][0]}"
+                query.where('availableTime >= ?', filter['availableTime'][0])
             if filter['availableTime'][1] != 0:
-                filterSqlCond += f" and availableTime <= {filter['availableTime'][1]}"
+                query.where('availableTime <= ?', filter['availableTime'][1])
         
-        result = self.db.query(f"select id, title, availableTime, userId, duration, expireTime from essayWritingExamPaper where 1=1 {filterSqlCond}")
+        cursor, limit, count = self.parsePagination(pagination)
+        result = self.db.query(*query.select("id, title, availableTime, userId, duration, expireTime", "id", self.fetchLimit(limit), "id > ?", cursor))
         for i in result:
             isAvailable = int(time.time()) > i['availableTime'] and int(time.time()) < i['expireTime']
             i['isAvailable'] = isAvailable
+        total = self.db.query(*query.count(), one=True)['total'] if count else None
             
-        return result
+        return self.makePage(result, limit, ['id'], total)
     
-    def getAllOralExams(self, filter: dict[str | typing.Any] = None) -> list[dict[str | typing.Any]]:
+    def getAllOralExams(self, filter: dict[str | typing.Any] = None, pagination: dict[str | typing.Any] = None) -> dict[str | typing.Any]:
         """
-        Get all oral exams.
+        Get all oral exams, one page at a time ordered by ID.
+
+        Args:
+            filter (dict[str | typing.Any], optional): The filter of the exams. Defaults to None.
+            pagination (dict[str | typing.Any], optional): The pagination options, including 'cursor', 'limit' and 'count'. Defaults to None.
 
         Returns:
-            list[dict[str | typing.Any]]: The list of all oral exams.
+            dict[str | typing.Any]: The result object with one page of oral exams.
         """
         
         if filter is None:
             filter = {}
             
-        filterSqlCond = ''
+        query = queryBuilder.SelectQuery("oralEnglishExamPaper")
         if 'userId' in filter:
-            filterSqlCond += f" and userId = {filter['userId']}"
+            query.whereEqual('userId', filter['userId'])
         if 'title' in filter:
-            filterSqlCond += f" and title like '%{filter['title']}%'"
+            query.whereContains('title', filter['title'])
         if 'availableTime' in filter:
             if filter['availableTime'][0] != 0:
-                filterSqlCond += f" and availableTime >= {filter['availableTime'][0]}"
+                query.where('availableTime >= ?', filter['availableTime'][0])
             if filter['availableTime'][1] != 0:
-                filterSqlCond += f" and availableTime <= {filter['availableTime'][1]}"
+                query.where('availableTime <= ?', filter['availableTime'][1])
         
-        result = self.db.query(f"select id, title, availableTime, expireTime, userId from oralEnglishExamPaper where 1=1 {filterSqlCond}")
+        cursor, limit, count = self.parsePagination(pagination)
+        result = self.db.query(*query.select("id, title, availableTime, expireTime, userId", "id", self.fetchLimit(limit), "id > ?", cursor))
         for i in result:
             isAvailable = int(time.time()) > i['availableTime'] and int(time.time()) < i['expireTime']
             i['isAvailable'] = isAvailable
-        return result
+        total = self.db.query(*query.count(), one=True)['total'] if count else None
+        return self.makePage(result, limit, ['id'], total)
     
     
     def deleteReadingExam(self, examId: int) -> dict[str | typing.Any]:
@@ -640,6 +1369,7 @@ class _DataProvider:
         """
         
         self.db.query("delete from academicalPassageExamPaper where id = ?", (examId,))
+        self.examPaperCache.invalidate('reading', examId)
         return self.makeResult(True)
     
     
@@ -670,7 +1400,7 @@ class _DataProvider:
             str | None: The Google API key, or None if not set.
         """
         
-        d = self.db.query("select googleApiKey from config", one=True)
+        d = self.configSnapshot.data
         return d['googleApiKey'] if d else None
     
     
@@ -687,23 +1417,42 @@ class _DataProvider:
         
         d = self.db.query("select avatar, avatarMime from users where id = ?", (userId,), one=True)
         return (d['avatar'], d['avatarMime']) if d else None
+
+
+    def openUserAvatarByID(self, userId: int) -> typing.Tuple[typing.BinaryIO, str] | None:
+        """
+        Open the avatar of the user by ID for incremental reading, without loading it into memory.
+
+        Args:
+            userId (int): The ID of the user.
+
+        Returns:
+            typing.Tuple[typing.BinaryIO, str] | None: The readable avatar and its MIME type, or None if not set. The caller is responsible for closing it.
+        """
+        
+        d = self.db.query("select avatarMime from users where id = ?", (userId,), one=True)
+        if d is None:
+            return None
+        avatar = self.db.openBlob('users', 'avatar', userId)
+        return (avatar, d['avatarMime']) if avatar is not None else None
     
     
-    def getUsers(self, filter: dict[str | typing.Any] = None) -> list[dict[str | typing.Any]]:
+    def getUsers(self, filter: dict[str | typing.Any] = None, pagination: dict[str | typing.Any] = None) -> dict[str | typing.Any]:
         """
-        Get all users.
+        Get all users, one page at a time ordered by ID.
 
         Args:
             filter (dict[str | typing.Any], optional): The filter of the users. Defaults to None.
+            pagination (dict[str | typing.Any], optional): The pagination options, including 'cursor', 'limit' and 'count'. Defaults to None.
 
         Returns:
-            list[dict[str | typing.Any]]: The list of all users.
+            dict[str | typing.Any]: The result object with one page of users.
         """
         
         if filter is None:
             filter = {}
             
-        filterSqlCond = ''
+        query = queryBuilder.SelectQuery("users")
         
         if 'permissions' in filter:
             # convert permission to binary
@@ -721,18 +1470,18 @@ class _DataProvider:
             if 'administrator' in filter['permissions']:
                 perm_bin = perm_bin | 0b00000001 if filter['permissions']['administrator'] else perm_bin & ~0b00000001
                 
-            filterSqlCond += f" and permission & {perm_bin} = {perm_bin}"
+            query.where('permission & ? = ?', perm_bin, perm_bin)
         if 'username' in filter:
-            filterSqlCond += f" and username like '%{filter['username']}%'"
+            query.whereContains('username', filter['username'])
         if 'email' in filter:
-            filterSqlCond += f" and email like '%{filter['email']}%'"
+            query.whereContains('email', filter['email'])
         
-        print("Built conditon", filterSqlCond)
-        
-        data = self.db.query(f"select id, username, email, oralExamQuota, oralExamResultViewQuota, permission from users where 1=1 {filterSqlCond}")
+        cursor, limit, count = self.parsePagination(pagination)
+        data = self.db.query(*query.select("id, username, email, oralExamQuota, oralExamResultViewQuota, permission", "id", self.fetchLimit(limit), "id > ?", cursor))
         for i in data:
-            i['capabilities'] = self.getUserCapabilities(i['id'])['data']
-        return data
+            i['capabilities'] = self.makeCapabilities(i['permission'])
+        total = self.db.query(*query.count(), one=True)['total'] if count else None
+        return self.makePage(data, limit, ['id'], total)
     
     
     def updateUserPermission(self, userId: int, specPermission: str, value: bool) -> dict[str | typing.Any]:
@@ -769,6 +1518,7 @@ class _DataProvider:
             return self.makeResult(False, data='Invalid permission')
         
         self.db.query("update users set permission = ? where id = ?", (perm_bin, userId))
+        self.principalCache.invalidate(userId)
         return self.makeResult(True)
     
     
@@ -795,6 +1545,7 @@ class _DataProvider:
         
         perm_bin = self.convertPermissionDictToBin(permission)
         self.db.query("update users set username = ?, email = ?, oralExamQuota = ?, oralExamResultViewQuota = ?, permission = ? where id = ?", (username, email, oralExamQuota, oralExamResultViewQuota, perm_bin, userId))
+        self.principalCache.invalidate(userId)
         return self.makeResult(True)
     
     
@@ -857,37 +1608,38 @@ class _DataProvider:
         if type(artifactContent) != bytes:
             raise TypeError("Artifact content must be bytes")
         
-        self.db.query("insert into artifact (userId, isPrivate, createTime, expireTime, mimetype, content) values (?,?,?,?,?,?)", (userId, isPrivate, int(time.time()), expireTime, mimeType, artifactContent))
-        # get id (the latest inserted sorted by time)
-        artifact = self.db.query("select id, userId, isPrivate, mimetype, createTime, expireTime from artifact order by id desc limit 1", one=True)
+        artifact = self.storeArtifactBlob(artifactContent, lambda digest: self.db.query("insert into artifact (userId, isPrivate, createTime, expireTime, mimetype, digest, size) values (?,?,?,?,?,?,?) returning id, userId, isPrivate, mimetype, createTime, expireTime", (userId, isPrivate, int(time.time()), expireTime, mimeType, digest, len(artifactContent)), one=True))
         return self.makeResult(True, data=artifact)
     
     
-    def getArtifacts(self, filter: dict[str | typing.Any] = None) -> list[dict[str | typing.Any]]:
+    def getArtifacts(self, filter: dict[str | typing.Any] = None, pagination: dict[str | typing.Any] = None) -> dict[str | typing.Any]:
         """
-        Get all artifacts of the user.
+        Get all artifacts of the user, one page at a time ordered by ID.
 
         Args:
             filter (dict[str | typing.Any], optional): The filter of the artifacts, including 'expired', 'createTime', 'type', 'userId'. Defaults to None.
+            pagination (dict[str | typing.Any], optional): The pagination options, including 'cursor', 'limit' and 'count'. Defaults to None.
 
         Returns:
-            list[dict[str | typing.Any]]: The list of all artifacts.
+            dict[str | typing.Any]: The result object with one page of artifacts.
         """
         
-        cond = ""
+        query = queryBuilder.SelectQuery("artifact")
         
         if filter is not None:
-            if 'expireTime' in filter:
-                cond += f" and expireTime < {int(filter['expired']['range_start'])} and expireTime > {int(filter['expired']['range_end'])}"
+            if 'expired' in filter:
+                query.where('expireTime < ? and expireTime > ?', int(filter['expired']['range_start']), int(filter['expired']['range_end']))
             if 'createTime' in filter:
-                cond += f" and createTime < {int(filter['createTime']['range_start'])} and createTime > {int(filter['createTime']['range_end'])}"
+                query.where('createTime < ? and createTime > ?', int(filter['createTime']['range_start']), int(filter['createTime']['range_end']))
             if 'mimetype' in filter:
-                cond += f" and mimetype like '%{filter['mimetype']}%'"
+                query.whereContains('mimetype', filter['mimetype'])
             if 'userId' in filter:
-                cond += f" and userId = {filter['userId']}"
+                query.whereEqual('userId', filter['userId'])
             
-        data = self.db.query(f"select id, userId, isPrivate, mimetype, createTime, expireTime from artifact where 1 = 1 {cond}")
-        return data
+        cursor, limit, count = self.parsePagination(pagination)
+        data = self.db.query(*query.select("id, userId, isPrivate, mimetype, createTime, expireTime", "id", self.fetchLimit(limit), "id > ?", cursor))
+        total = self.db.query(*query.count(), one=True)['total'] if count else None
+        return self.makePage(data, limit, ['id'], total)
     
     
     def getArtifactById(self, artifactId: int) -> dict[str | typing.Any] | None:
@@ -902,6 +1654,26 @@ class _DataProvider:
         return self.db.query("select id, userId, createTime, expireTime, mimetype, isPrivate from artifact where id = ?", (artifactId,), one=True)
 
 
+    def openArtifactContentById(self, artifactId: int) -> typing.BinaryIO | None:
+        """
+        Open the content of the artifact by ID for reading, without loading it into memory.
+
+        Args:
+            artifactId (int): The ID of the artifact.
+
+        Returns:
+            typing.BinaryIO | None: A readable binary file object, or None if not found. The caller is responsible for closing it.
+        """
+        
+        artifact = self.db.query("select digest, content from artifact where id = ?", (artifactId,), one=True)
+        if artifact is None:
+            return None
+        if artifact['digest'] is None:
+            # not moved into the blob store yet
+            return io.BytesIO(artifact['content']) if artifact['content'] is not None else None
+        return self.blobStore.open(artifact['digest'])
+
+
     def getArtifactContentById(self, artifactId: int) -> bytes | None:
         """
         Get the content of the artifact by ID.
@@ -913,8 +1685,47 @@ class _DataProvider:
             bytes | None: The content of the artifact, or None if not found.
         """
         
-        artifact = self.db.query("select content from artifact where id = ?", (artifactId,), one=True)
-        return artifact['content'] if artifact else None
+        file = self.openArtifactContentById(artifactId)
+        if file is None:
+            return None
+        with file:
+            return file.read()
+
+
+    def storeArtifactBlob(self, content: bytes, reference: typing.Callable[[str], typing.Any]) -> typing.Any:
+        """
+        Store an artifact content in the blob store and reference it from the database.
+        The content is written without holding `blobLock`, which is only taken to reference it,
+        so that it cannot be released by a concurrent deletion in between.
+
+        Args:
+            content (bytes): The content.
+            reference (typing.Callable[[str], typing.Any]): Writes the artifact row referencing the digest of the content.
+
+        Returns:
+            typing.Any: The return value of `reference`.
+        """
+        
+        digest = self.blobStore.put(content)
+        with self.blobLock:
+            # the last artifact with the same content may have been deleted after the put, taking the blob with it
+            if not self.blobStore.exists(digest):
+                self.blobStore.put(content)
+            return reference(digest)
+
+
+    def releaseArtifactBlobs(self, digests: typing.Iterable[str]) -> None:
+        """
+        Remove the blobs which are no longer referenced by any artifact.
+        Must be called with `blobLock` held, after the referencing artifacts have been deleted.
+
+        Args:
+            digests (typing.Iterable[str]): The digests of the deleted artifacts.
+        """
+        
+        for digest in set(digests):
+            if digest is not None and self.db.query("select 1 from artifact where digest = ? limit 1", (digest,), one=True) is None:
+                self.blobStore.delete(digest)
 
 
     def deleteArtifact(self, artifactId: int) -> dict[str | typing.Any]:
@@ -928,7 +1739,11 @@ class _DataProvider:
             dict[str | typing.Any]: The result object.
         """
         
-        self.db.query("delete from artifact where id = ?", (artifactId,))
+        with self.blobLock:
+            artifact = self.db.query("select digest from artifact where id = ?", (artifactId,), one=True)
+            self.db.query("delete from artifact where id = ?", (artifactId,))
+            if artifact is not None:
+                self.releaseArtifactBlobs([artifact['digest']])
         return self.makeResult(True)
     
     
@@ -940,7 +1755,11 @@ class _DataProvider:
             dict[str | typing.Any]: The result object.
         """
         
-        self.db.query("delete from artifact where expireTime < ?", (int(time.time()),))
+        now = int(time.time())
+        with self.blobLock:
+            outdated = self.db.query("select distinct digest from artifact where expireTime < ?", (now,))
+            self.db.query("delete from artifact where expireTime < ?", (now,))
+            self.releaseArtifactBlobs(row['digest'] for row in outdated)
         return self.makeResult(True)
     
     
@@ -955,36 +1774,39 @@ class _DataProvider:
             dict[str | typing.Any] | None: The reading exam, or false result if not found.
         """
         
-        res = self.db.query("select id, userId, createTime, availableTime, expireTime, title, passages, answerSheetFormat, duration from academicalPassageExamPaper where id = ?", (examId,), one=True)
+        res = self.examPaperCache.get('reading', examId, lambda: self.db.query("select id, userId, createTime, availableTime, expireTime, title, passages, answerSheetFormat, duration from academicalPassageExamPaper where id = ?", (examId,), one=True), ('answerSheetFormat',))
         if res is None:
             return self.makeResult(False, data='Reading exam not found')
         else:
-            res["answerSheetFormat"] = json.loads(res["answerSheetFormat"])
             return self.makeResult(True, data=res)
         
         
-    def getWritingExams(self, filter: dict[str | typing.Any] = None) -> list[dict[str | typing.Any]]:
+    def getWritingExams(self, filter: dict[str | typing.Any] = None, pagination: dict[str | typing.Any] = None) -> dict[str | typing.Any]:
         """
-        Get all writing exams.
+        Get all writing exams, one page at a time ordered by ID.
 
         Args:
             filter (dict[str | typing.Any], optional): The filter of the exams. Defaults to None.
+            pagination (dict[str | typing.Any], optional): The pagination options, including 'cursor', 'limit' and 'count'. Defaults to None.
         Returns:
-            list[dict[str | typing.Any]]: The list of all writing exams.
+            dict[str | typing.Any]: The result object with one page of writing exams.
         """
         
         if filter is None:
             filter = {}
             
-        filterSqlCond = ''
+        query = queryBuilder.SelectQuery("essayWritingExamPaper")
         if 'userId' in filter:
-            filterSqlCond += f" and userId = {filter['userId']}"
+            query.whereEqual('userId', filter['userId'])
         if 'title' in filter:
-            filterSqlCond += f" and title like '%{filter['title']}%'"
+            query.whereContains('title', filter['title'])
         if 'availableTime' in filter:
-            filterSqlCond += f" and availableTime >= {filter['availableTime'][0]} and expireTime <= {filter['availableTime'][1]}"
+            query.where('availableTime >= ? and expireTime <= ?', filter['availableTime'][0], filter['availableTime'][1])
         
-        return self.db.query(f"select * from essayWritingExamPaper where 1=1 {filterSqlCond}")
+        cursor, limit, count = self.parsePagination(pagination)
+        result = self.db.query(*query.select("*", "id", self.fetchLimit(limit), "id > ?", cursor))
+        total = self.db.query(*query.count(), one=True)['total'] if count else None
+        return self.makePage(result, limit, ['id'], total)
     
     def createWritingExam(self, userId: int, title: str, availableTime: int, expireTime: int, problemStatement: str, onePossibleVersion: str, duration: int) -> dict[str | typing.Any]:
         """
@@ -1003,9 +1825,7 @@ class _DataProvider:
             dict[str | typing.Any]: The result object.
         """
         
-        self.db.query("insert into essayWritingExamPaper (userId, createTime, availableTime, expireTime, title, problemStatement, onePossibleVersion, duration) values (?,?,?,?,?,?,?,?)", (userId, int(time.time()), availableTime, expireTime, title, problemStatement, onePossibleVersion, duration))
-        # get id (the latest inserted sorted by time)
-        exam = self.db.query("select id, userId, createTime, availableTime, expireTime, title, problemStatement, onePossibleVersion, duration from essayWritingExamPaper order by id desc limit 1", one=True)
+        exam = self.db.query("insert into essayWritingExamPaper (userId, createTime, availableTime, expireTime, title, problemStatement, onePossibleVersion, duration) values (?,?,?,?,?,?,?,?) returning id, userId, createTime, availableTime, expireTime, title, problemStatement, onePossibleVersion, duration", (userId, int(time.time()), availableTime, expireTime, title, problemStatement, onePossibleVersion, duration), one=True)
         return self.makeResult(True, data=exam)
     
     
@@ -1025,34 +1845,36 @@ class _DataProvider:
             dict[str | typing.Any]: The result object.
         """
         
-        self.db.query("insert into oralEnglishExamPaper (userId, createTime, availableTime, expireTime, title, warmUpTopics, mainTopic) values (?,?,?,?,?,?,?)", (userId, int(time.time()), availableTime, expireTime, title, json.dumps(warmUpTopics), mainTopic))
-        # get id (the latest inserted sorted by time)
-        exam = self.db.query("select id, userId, createTime, availableTime, expireTime, title, warmUpTopics, mainTopic from oralEnglishExamPaper order by id desc limit 1", one=True)
+        exam = self.db.query("insert into oralEnglishExamPaper (userId, createTime, availableTime, expireTime, title, warmUpTopics, mainTopic) values (?,?,?,?,?,?,?) returning id, userId, createTime, availableTime, expireTime, title, warmUpTopics, mainTopic", (userId, int(time.time()), availableTime, expireTime, title, json.dumps(warmUpTopics), mainTopic), one=True)
         return self.makeResult(True, data=exam)
     
-    def getOralExams(self, filter: dict[str | typing.Any] = None) -> list[dict[str | typing.Any]]:
+    def getOralExams(self, filter: dict[str | typing.Any] = None, pagination: dict[str | typing.Any] = None) -> dict[str | typing.Any]:
         """
-        Get all oral exams.
+        Get all oral exams, one page at a time ordered by ID.
 
         Args:
             filter (dict[str | typing.Any], optional): The filter of the exams. Defaults to None.
+            pagination (dict[str | typing.Any], optional): The pagination options, including 'cursor', 'limit' and 'count'. Defaults to None.
 
         Returns:
-            list[dict[str | typing.Any]]: The list of all oral exams.
+            dict[str | typing.Any]: The result object with one page of oral exams.
         """
         
         if filter is None:
             filter = {}
             
-        filterSqlCond = ''
+        query = queryBuilder.SelectQuery("oralEnglishExamPaper")
         if 'userId' in filter:
-            filterSqlCond += f" and userId = {filter['userId']}"
+            query.whereEqual('userId', filter['userId'])
         if 'title' in filter:
-            filterSqlCond += f" and title like '%{filter['title']}%'"
+            query.whereContains('title', filter['title'])
         if 'availableTime' in filter:
-            filterSqlCond += f" and availableTime >= {filter['availableTime'][0]} and expireTime <= {filter['availableTime'][1]}"
+            query.where('availableTime >= ? and expireTime <= ?', filter['availableTime'][0], filter['availableTime'][1])
         
-        return self.db.query(f"select * from oralEnglishExamPaper where 1=1 {filterSqlCond}")
+        cursor, limit, count = self.parsePagination(pagination)
+        result = self.db.query(*query.select("*", "id", self.fetchLimit(limit), "id > ?", cursor))
+        total = self.db.query(*query.count(), one=True)['total'] if count else None
+        return self.makePage(result, limit, ['id'], total)
     
     
     def getOralExamById(self, examId: int) -> dict[str | typing.Any]:
@@ -1066,11 +1888,10 @@ class _DataProvider:
             dict[str | typing.Any] | None: The oral exam, or false result if not found.
         """
         
-        res = self.db.query("select id, userId, createTime, availableTime, expireTime, title, warmUpTopics, mainTopic from oralEnglishExamPaper where id = ?", (examId,), one=True)
+        res = self.examPaperCache.get('oral', examId, lambda: self.db.query("select id, userId, createTime, availableTime, expireTime, title, warmUpTopics, mainTopic from oralEnglishExamPaper where id = ?", (examId,), one=True), ('warmUpTopics',))
         if res is None:
             return self.makeResult(False, data='Oral exam not found')
         else:
-            res["warmUpTopics"] = json.loads(res["warmUpTopics"])
             return self.makeResult(True, data=res)
     
     
@@ -1091,6 +1912,7 @@ class _DataProvider:
         """
         
         self.db.query("update oralEnglishExamPaper set title = ?, availableTime = ?, expireTime = ?, warmUpTopics = ?, mainTopic = ? where id = ?", (title, availableTime, expireTime, json.dumps(warmUpTopics), mainTopic, examId))
+        self.examPaperCache.invalidate('oral', examId)
         return self.makeResult(True)
     
     def deleteOralExam(self, examId: int) -> dict[str | typing.Any]:
@@ -1105,6 +1927,7 @@ class _DataProvider:
         """
         
         self.db.query("delete from oralEnglishExamPaper where id = ?", (examId,))
+        self.examPaperCache.invalidate('oral', examId)
         return self.makeResult(True)
     
     
@@ -1120,6 +1943,7 @@ class _DataProvider:
         """
         
         self.db.query("delete from essayWritingExamPaper where id = ?", (examId,))
+        self.examPaperCache.invalidate('writing', examId)
         return self.makeResult(True)
     
     
@@ -1134,7 +1958,7 @@ class _DataProvider:
             dict[str | typing.Any] | None: The writing exam, or false result if not found.
         """
         
-        res = self.db.query("select id, userId, createTime, availableTime, expireTime, title, problemStatement, onePossibleVersion, duration from essayWritingExamPaper where id = ?", (examId,), one=True)
+        res = self.examPaperCache.get('writing', examId, lambda: self.db.query("select id, userId, createTime, availableTime, expireTime, title, problemStatement, onePossibleVersion, duration from essayWritingExamPaper where id = ?", (examId,), one=True))
         if res is None:
             return self.makeResult(False, data='Writing exam not found')
         else:
@@ -1158,6 +1982,7 @@ class _DataProvider:
         """
         
         self.db.query("update essayWritingExamPaper set title = ?, availableTime = ?, expireTime = ?, problemStatement = ?, onePossibleVersion = ?, duration = ? where id = ?", (title, availableTime, expireTime, problemStatement, onePossibleVersion, duration, examId))
+        self.examPaperCache.invalidate('writing', examId)
         return self.makeResult(True)
     
     
@@ -1179,6 +2004,7 @@ class _DataProvider:
         """
         
         self.db.query("update academicalPassageExamPaper set title = ?, availableTime = ?, expireTime = ?, passages = ?, answerSheetFormat = ?, duration = ? where id = ?", (title, availableTime, expireTime, passages, json.dumps(answerSheetFormat), duration, examId))
+        self.examPaperCache.invalidate('reading', examId)
         return self.makeResult(True)
     
     
@@ -1194,6 +2020,9 @@ class _DataProvider:
         """
         
         self.db.query("delete from users where id = ?", (userId,))
+        self.db.query("delete from recentExamResult where userId = ?", (userId,))
+        self.db.query("delete from overallAssessmentState where userId = ?", (userId,))
+        self.principalCache.invalidate(userId)
         return self.makeResult(True)
     
     
@@ -1262,151 +2091,278 @@ class _DataProvider:
             return self.makeResult(False, data='Username already used')
         
         self.db.query("update users set username = ? where id = ?", (newUsername, userId))
+        self.principalCache.invalidate(userId)
         return self.makeResult(True)
         
         
-    def submitReadingExamResult(self, userId: int, completeTime: int, examId: int, answerSheet: dict[str | typing.Any]) -> dict[str | typing.Any]:
+    def gradeReadingAnswerSheet(self, answerSheetFormat: list[dict[str | typing.Any]], answerSheet: list[typing.Any]) -> tuple[int, str, list[dict[str | typing.Any]]]:
+        """
+        Score the answer sheet of a reading exam against the answers of the exam paper.
+
+        Args:
+            answerSheetFormat (list[dict[str | typing.Any]]): The answer sheet format of the exam paper, with the correct answers.
+            answerSheet (list[typing.Any]): The answers of the user.
+
+        Returns:
+            tuple[int, str, list[dict[str | typing.Any]]]: The number of correct answers, the band and the wrong answers.
+        """
+        problem_count = len(answerSheetFormat)
+        correct_count = 0
+        error_answers = []
+        current_ans = 0
+        band = ''
+        
+        # check the submission
+        for ori, ans in zip(answerSheetFormat, answerSheet):
+            if ori['answer'] == ans:
+                correct_count += 1
+            else:
+                error_answers.append({
+                    'user_ans': ori['answer'],
+                    'index': current_ans,
+                })
+            current_ans += 1
+                
+        # judge overall band
+        if correct_count >= problem_count * 0.7:
+            band = 'A'
+        elif correct_count >= problem_count * 0.5:
+            band = 'B'
+        elif correct_count >= problem_count * 0.3:
+            band = 'C'
+        else:
+            band = 'D'
+        return correct_count, band, error_answers
+
+
+    def submitReadingExamResult(self, userId: int, completeTime: int, examId: int, answerSheet: dict[str | typing.Any], examSessionId: str = '') -> dict[str | typing.Any]:
         """
         Submit the reading exam result.
+        The result is scored and stored right away with its feedback `pending`, the AI feedback is generated by a background job.
+        When the reading exam judger is busy the feedback is `deferred` instead, and queued by `resumeDeferredReadingFeedback` once it has room.
 
         Args:
             userId (int): The ID of the user.
             completeTime (int): The time when the exam is completed.
             examId (int): The ID of the exam.
             answerSheet (dict[str | typing.Any]): The answer sheet of the exam, in JSON format.
+            examSessionId (str, optional): The ID of the exam session. Defaults to ''.
 
         Returns:
-            dict[str | typing.Any]: The result object.
+            dict[str | typing.Any]: The result object, with the `feedbackJobId` of the job generating the feedback, None if deferred.
         """
         
-        with self.judgerLock.acquireOralExamJudger():
-            exam = self.getReadingExamById(examId)['data']
-            
-            problem_count = len(exam['answerSheetFormat'])
-            correct_count = 0
-            error_answers = []
-            current_ans = 0
-            band = ''
+        exam = self.getReadingExamById(examId)['data']
+        correct_count, band, error_answers = self.gradeReadingAnswerSheet(exam['answerSheetFormat'], answerSheet)
+        
+        # insert the result and read it back in the same statement
+        res = self.db.query("insert into academicalPassageExamResult (userId, completeTime, examSessionId, examPaperId, answerSheet, correctAnsCount, band, feedback, feedbackStatus) values (?,?,?,?,?,?,?,'','pending') returning id, userId, completeTime, examPaperId, answerSheet, correctAnsCount, band, feedback, feedbackStatus", (userId, completeTime, examSessionId, examId, json.dumps(answerSheet), correct_count, band), one=True)
+        self.recordRecentExamResult('reading', res, exam['title'])
+        try:
+            # the score is returned right away, waiting for the judger would hold it back for the optional feedback
+            res['feedbackJobId'] = self.judgers['reading'].submit(lambda: self.jobQueue.enqueue('readingExamFeedback', {'resultId': res['id']}, userId=userId), timeout=0)
+        except JudgerBusyError:
+            self.db.query("update academicalPassageExamResult set feedbackStatus = 'deferred' where id = ?", (res['id'],))
+            res['feedbackStatus'] = 'deferred'
+            res['feedbackJobId'] = None
+        return self.makeResult(True, data=res)
+
+
+    def resumeDeferredReadingFeedback(self) -> int:
+        """
+        Queue the feedback of deferred reading exam results, from the oldest one, as long as the reading exam judger has free slots.
+
+        Returns:
+            int: The number of queued feedback jobs.
+        """
+        
+        judger = self.judgers['reading']
+        queued = 0
+        while self.db.query("select 1 from academicalPassageExamResult where feedbackStatus = 'deferred' limit 1", one=True) is not None and judger.tryAcquire():
+            try:
+                # claiming the result in one statement keeps concurrent calls from queuing it twice
+                row = self.db.query("update academicalPassageExamResult set feedbackStatus = 'pending' where id = (select id from academicalPassageExamResult where feedbackStatus = 'deferred' order by id limit 1) returning id, userId", one=True)
+                if row is None:
+                    judger.release()
+                    break
+                self.jobQueue.enqueue('readingExamFeedback', {'resultId': row['id']}, userId=row['userId'])
+            except BaseException:
+                judger.release()
+                raise
+            queued += 1
+        return queued
+
+
+    def generateReadingExamFeedback(self, resultId: int) -> dict[str | typing.Any]:
+        """
+        Generate the AI feedback of a stored reading exam result, and count the result towards the next overall assessment.
+
+        Args:
+            resultId (int): The ID of the reading exam result.
+
+        Returns:
+            dict[str | typing.Any]: The result object with the updated reading exam result.
+        """
+        
+        result = self.db.query("select userId, examPaperId, answerSheet, correctAnsCount, band, feedbackStatus from academicalPassageExamResult where id = ?", (resultId,), one=True)
+        if result is None:
+            return self.makeResult(False, 'Exam result not found')
+        if result['feedbackStatus'] == 'pending':
+            exam = self.getReadingExamById(result['examPaperId'])['data']
+            _, _, error_answers = self.gradeReadingAnswerSheet(exam['answerSheetFormat'], json.loads(result['answerSheet']))
             
-            # check the submission
-            for ori, ans in zip(exam['answerSheetFormat'], answerSheet):
-                if ori['answer'] == ans:
-                    correct_count += 1
-                else:
-                    error_answers.append({
-                        'user_ans': ori['answer'],
-                        'index': current_ans,
-                    })
-                current_ans += 1
-                    
-            # judge overall band
-            if correct_count >= problem_count * 0.7:
-                band = 'A'
-            elif correct_count >= problem_count * 0.5:
-                band = 'B'
-            elif correct_count >= problem_count * 0.3:
-                band = 'C'
-            else:
-                band = 'D'
-                
             # call AI to anaylyze the answer sheet
             feedback = chatModel.AnalyzeReadingExamResult(
                 exam['passages'],
-                correct_count, 
-                problem_count,
-                band,
+                result['correctAnsCount'], 
+                len(exam['answerSheetFormat']),
+                result['band'],
                 error_answers,
                 exam['answerSheetFormat']
             )
-            
-            # insert the result
-            self.db.query("insert into academicalPassageExamResult (userId, completeTime, examPaperId, answerSheet, correctAnsCount, band, feedback) values (?,?,?,?,?,?,?)", (userId, completeTime, examId, json.dumps(answerSheet), correct_count, band, feedback))
-            
-            # fetch the result back from the database
-            res = self.db.query("select id, userId, completeTime, examPaperId, answerSheet, correctAnsCount, band, feedback from academicalPassageExamResult where userId = ? and examPaperId = ? order by id desc limit 1", (userId, examId), one=True)
-            return self.makeResult(True, data=res)
+            # only the attempt which fills in the feedback counts the result, a retried job may get here twice
+            if self.db.query("update academicalPassageExamResult set feedback = ?, feedbackStatus = 'ready' where id = ? and feedbackStatus = 'pending' returning id", (feedback, resultId), one=True) is not None:
+                self.increaseOverallAssessmentTrigger(result['userId'])
+        
+        res = self.db.query("select id, userId, completeTime, examPaperId, answerSheet, correctAnsCount, band, feedback, feedbackStatus from academicalPassageExamResult where id = ?", (resultId,), one=True)
+        return self.makeResult(True, data=res)
     
     
-    def submitWritingExamResult(self, userId: int, completeTime: int, examId: int, composition: str) -> dict[str | typing.Any]:
+    def enqueueExamResultJob(self, examType: str, payload: dict[str | typing.Any], userId: int) -> dict[str | typing.Any]:
         """
-        Submit the writing exam result.
+        Queue the grading of a writing or oral exam result once its exam judger admits it, see `submitWritingExamResult` and `submitOralExamResult`.
+
+        Args:
+            examType (str): The type of the exam, `writing` or `oral`.
+            payload (dict[str | typing.Any]): The keyword arguments of the submit method.
+            userId (int): The ID of the user.
+
+        Returns:
+            dict[str | typing.Any]: The result object with the `jobId` of the grading job, or the busy message of the exam judger.
+        """
+        try:
+            jobId = self.judgers[examType].submit(lambda: self.jobQueue.enqueue(f'{examType}ExamResult', payload, userId=userId))
+        except JudgerBusyError as e:
+            return self.makeResult(False, str(e))
+        return self.makeResult(True, {'jobId': jobId})
+
+
+    def getExamResultBySessionId(self, table: str, columns: str, examSessionId: str | None) -> dict[str | typing.Any] | None:
+        """
+        Get the exam result stored for an exam session.
+
+        Args:
+            table (str): The exam result table.
+            columns (str): The columns to select.
+            examSessionId (str | None): The ID of the exam session.
+
+        Returns:
+            dict[str | typing.Any] | None: The exam result, or None if not found or the session is unknown.
+        """
+        if examSessionId is None:
+            return None
+        return self.db.query(f"select {columns} from {table} where examSessionId = ?", (examSessionId,), one=True)
+
+
+    def submitWritingExamResult(self, userId: int, completeTime: int, examId: int, composition: str, examSessionId: str | None = None) -> dict[str | typing.Any]:
+        """
+        Submit the writing exam result, and count it towards the next overall assessment.
+        Submitting the same exam session again returns the stored result without grading it again.
 
         Args:
             userId (int): The ID of the user.
             completeTime (int): The time when the exam is completed.
             examId (int): The ID of the exam.
             composition (str): The composition of the user.
+            examSessionId (str | None, optional): The ID of the exam session. Defaults to None.
 
         Returns:
             dict[str | typing.Any]: The result object.
         """
         
-        with self.judgerLock.acquireWritingExamJudger():
-            exam = self.getWritingExamById(examId)['data']
-
-            # call AI to anaylyze the composition
-            band, feedback = chatModel.AnalyzeWritingExamResult(
-                exam['problemStatement'],
-                exam['onePossibleVersion'],
-                composition
-            )
-            
-            # insert the result
-            self.db.query("insert into essayWritingExamResult (userId, completeTime, examPaperId, answer, band, feedback) values (?,?,?,?,?,?)", (userId, completeTime, examId, composition, band, feedback))
-            
-            # fetch the result back from the database
-            res = self.db.query("select id, userId, completeTime, examPaperId, answer, band, feedback from essayWritingExamResult where userId = ? and examPaperId = ? order by id desc limit 1", (userId, examId), one=True)
+        columns = "id, userId, completeTime, examPaperId, answer, band, feedback"
+        # a retried job finds the result stored by its earlier attempt
+        res = self.getExamResultBySessionId('essayWritingExamResult', columns, examSessionId)
+        if res is not None:
             return self.makeResult(True, data=res)
+
+        exam = self.getWritingExamById(examId)['data']
+
+        # call AI to anaylyze the composition
+        band, feedback = chatModel.AnalyzeWritingExamResult(
+            exam['problemStatement'],
+            exam['onePossibleVersion'],
+            composition
+        )
+        
+        # insert the result and read it back in the same statement
+        res = self.db.query(f"insert into essayWritingExamResult (userId, completeTime, examPaperId, answer, band, feedback, examSessionId) values (?,?,?,?,?,?,?) on conflict do nothing returning {columns}", (userId, completeTime, examId, composition, band, feedback, examSessionId), one=True)
+        if res is None:
+            # another attempt of the job stored it first
+            return self.makeResult(True, data=self.getExamResultBySessionId('essayWritingExamResult', columns, examSessionId))
+        self.recordRecentExamResult('writing', res, exam['title'])
+        self.increaseOverallAssessmentTrigger(userId)
+        return self.makeResult(True, data=res)
     
     
-    def submitOralExamResult(self, userId: int, completeTime: int, examId: int, answerDetails: dict[str | typing.Any]) -> dict[str | typing.Any]:
+    def submitOralExamResult(self, userId: int, completeTime: int, examId: int, answerDetails: dict[str | typing.Any], examSessionId: str | None = None) -> dict[str | typing.Any]:
         """
-        Submit the oral exam result.
+        Submit the oral exam result, and count it towards the next overall assessment.
+        Submitting the same exam session again returns the stored result without grading it again.
 
         Args:
             userId (int): The ID of the user.
             completeTime (int): The time when the exam is completed.
             examId (int): The ID of the exam.
             answerDetails (dict[str | typing.Any]): The answer details of the exam, in JSON format.
+            examSessionId (str | None, optional): The ID of the exam session. Defaults to None.
 
         Returns:
             dict[str | typing.Any]: The result object.
         """
         
-        with self.judgerLock.acquireOralExamJudger():
-            prompt = chatModel.Prompt(data.config.PROMPT_FOR_ORAL_EXAM_ENGLISH_PRONUNCIATION_ASSESSMENT, {
-                'student_result': json.dumps(answerDetails['Pronunciation_Evaluation_Result'], indent=4, ensure_ascii=False, default=lambda o: str(o)),
-            })
-            model = chatModel.ChatGoogleGenerativeAI('gemini-2.0-flash-thinking-exp-01-21', 0.8)
-            resp = model.initiate([prompt])
-            feedbackContent = resp[resp.rfind('[feedback]') + 10:resp.rfind('[/feedback]')]
-            
-            
-            prompt = chatModel.Prompt(data.config.PROMPT_FOR_ORAL_EXAMINATION_OVERALL_FEEDBACK, {
-                'oral_exam_result': answerDetails['Feedback'],
-                'pronunciation_assessment_result': feedbackContent,
-            })
-            resp = model.initiate([prompt])
-            overall_feedback = resp[resp.rfind('[feedback]') + 10:resp.rfind('[/feedback]')]
-            overall_band = resp[resp.rfind('[band]') + 6:resp.rfind('[/band]')]
-            
-            # insert the result
-            self.db.query("insert into oralEnglishExamResult (userId, completeTime, examPaperId, answerDetails, contentFeedback, pronounciationFeedback, overallFeedback, band) values (?,?,?,?,?,?,?,?)", 
-                        (userId, completeTime, examId, json.dumps(answerDetails, default=lambda o: str(o)), answerDetails['Feedback'], feedbackContent, overall_feedback, overall_band))
-            
-            # fetch the result back from the database
-            res = self.db.query("select id, userId, completeTime, examPaperId, answerDetails, contentFeedback, pronounciationFeedback, overallFeedback, band from oralEnglishExamResult where userId = ? and examPaperId = ? order by id desc limit 1", (userId, examId), one=True)
+        columns = "id, userId, completeTime, examPaperId, answerDetails, contentFeedback, pronounciationFeedback, overallFeedback, band"
+        # a retried job finds the result stored by its earlier attempt
+        res = self.getExamResultBySessionId('oralEnglishExamResult', columns, examSessionId)
+        if res is not None:
             return self.makeResult(True, data=res)
+
+        prompt = chatModel.Prompt(data.config.PROMPT_FOR_ORAL_EXAM_ENGLISH_PRONUNCIATION_ASSESSMENT, {
+            'student_result': json.dumps(answerDetails['Pronunciation_Evaluation_Result'], indent=4, ensure_ascii=False, default=lambda o: str(o)),
+        })
+        model = chatModel.ChatGoogleGenerativeAI('gemini-2.0-flash-thinking-exp-01-21', 0.8)
+        resp = model.initiate([prompt])
+        feedbackContent = resp[resp.rfind('[feedback]') + 10:resp.rfind('[/feedback]')]
+        
+        
+        prompt = chatModel.Prompt(data.config.PROMPT_FOR_ORAL_EXAMINATION_OVERALL_FEEDBACK, {
+            'oral_exam_result': answerDetails['Feedback'],
+            'pronunciation_assessment_result': feedbackContent,
+        })
+        resp = model.initiate([prompt])
+        overall_feedback = resp[resp.rfind('[feedback]') + 10:resp.rfind('[/feedback]')]
+        overall_band = resp[resp.rfind('[band]') + 6:resp.rfind('[/band]')]
+        
+        # insert the result and read it back in the same statement
+        res = self.db.query(f"insert into oralEnglishExamResult (userId, completeTime, examPaperId, answerDetails, contentFeedback, pronounciationFeedback, overallFeedback, band, examSessionId) values (?,?,?,?,?,?,?,?,?) on conflict do nothing returning {columns}", 
+                    (userId, completeTime, examId, json.dumps(answerDetails, default=lambda o: str(o)), answerDetails['Feedback'], feedbackContent, overall_feedback, overall_band, examSessionId), one=True)
+        if res is None:
+            # another attempt of the job stored it first
+            return self.makeResult(True, data=self.getExamResultBySessionId('oralEnglishExamResult', columns, examSessionId))
+        self.recordRecentExamResult('oral', res, self.getOralExamById(examId)['data']['title'])
+        self.increaseOverallAssessmentTrigger(userId)
+        return self.makeResult(True, data=res)
     
     
-    def getReadingExamResultList(self, filter: dict[str | typing.Any] = None) -> list[dict[str | typing.Any]]:
+    def getReadingExamResultList(self, filter: dict[str | typing.Any] = None, pagination: dict[str | typing.Any] = None) -> dict[str | typing.Any]:
         """
-        Get the list of all reading exam results.
+        Get the list of all reading exam results, one page at a time from the latest one.
 
         Args:
             filter (dict[str | typing.Any], optional): The filter of the results. Defaults to None.
+            pagination (dict[str | typing.Any], optional): The pagination options, including 'cursor', 'limit' and 'count'. The cursor is made of complete time and ID. Defaults to None.
         Returns:
-            list[dict[str | typing.Any]]: The list of all reading exam results.
+            dict[str | typing.Any]: The result object with one page of reading exam results.
         """
         
         if filter is None:
@@ -1414,85 +2370,111 @@ class _DataProvider:
             
         
             
-        filterSqlCond = ''
+        query = queryBuilder.SelectQuery("academicalPassageExamResult r left join academicalPassageExamPaper p on p.id = r.examPaperId left join users u on u.id = r.userId")
         if 'userId' in filter:
-            filterSqlCond += f" and userId = {filter['userId']}"
+            query.whereEqual('r.userId', filter['userId'])
         if 'examId' in filter:
-            filterSqlCond += f" and examPaperId = {filter['examId']}"
+            query.whereEqual('r.examPaperId', filter['examId'])
         if 'completeTime' in filter:
-            filterSqlCond += f" and completeTime >= {filter['completeTime'][0]} and completeTime <= {filter['completeTime'][1]}"
+            query.whereBetween('r.completeTime', filter['completeTime'][0], filter['completeTime'][1])
         
-        res = self.db.query(f"select id, band, completeTime, examPaperId, userId from academicalPassageExamResult where 1=1 {filterSqlCond} order by completeTime desc")
+        cursor, limit, count = self.parsePagination(pagination, 2)
+        # resolve paper title and username in the same query instead of two lookups per row
+        res = self.db.query(*query.select("r.id, r.band, r.completeTime, r.examPaperId, r.userId, p.title, u.username", "r.completeTime desc, r.id desc", self.fetchLimit(limit), "(r.completeTime, r.id) < (?, ?)", cursor))
         for i in res:
             i['examPaper'] = {
-                'title': self.getReadingExamById(i['examPaperId'])['data']['title'],
+                'title': i.pop('title'),
             }
-            i['username'] = self.getUserInfoByID(i['userId'])['username']
-        return res
+        total = self.db.query(*query.count("academicalPassageExamResult r"), one=True)['total'] if count else None
+        return self.makePage(res, limit, ['completeTime', 'id'], total)
     
     
-    def getWritingExamResultList(self, filter: dict[str | typing.Any] = None) -> list[dict[str | typing.Any]]:
+    def getWritingExamResultList(self, filter: dict[str | typing.Any] = None, pagination: dict[str | typing.Any] = None) -> dict[str | typing.Any]:
         """
-        Get the list of all writing exam results.
+        Get the list of all writing exam results, one page at a time from the latest one.
 
         Args:
             filter (dict[str | typing.Any], optional): The filter of the results. Defaults to None.
+            pagination (dict[str | typing.Any], optional): The pagination options, including 'cursor', 'limit' and 'count'. The cursor is made of complete time and ID. Defaults to None.
         Returns:
-            list[dict[str | typing.Any]]: The list of all writing exam results.
+            dict[str | typing.Any]: The result object with one page of writing exam results.
         """
         
         if filter is None:
             filter = {}
             
-        filterSqlCond = ''
+        query = queryBuilder.SelectQuery("essayWritingExamResult r left join essayWritingExamPaper p on p.id = r.examPaperId left join users u on u.id = r.userId")
         if 'userId' in filter:
-            filterSqlCond += f" and userId = {filter['userId']}"
+            query.whereEqual('r.userId', filter['userId'])
         if 'examId' in filter:
-            filterSqlCond += f" and examPaperId = {filter['examId']}"
+            query.whereEqual('r.examPaperId', filter['examId'])
         if 'completeTime' in filter:
-            filterSqlCond += f" and completeTime >= {filter['completeTime'][0]} and completeTime <= {filter['completeTime'][1]}"
+            query.whereBetween('r.completeTime', filter['completeTime'][0], filter['completeTime'][1])
         
-        res = self.db.query(f"select id, band, completeTime, examPaperId, userId from essayWritingExamResult where 1=1 {filterSqlCond} order by completeTime desc")
+        cursor, limit, count = self.parsePagination(pagination, 2)
+        # resolve paper title and username in the same query instead of two lookups per row
+        res = self.db.query(*query.select("r.id, r.band, r.completeTime, r.examPaperId, r.userId, p.title, u.username", "r.completeTime desc, r.id desc", self.fetchLimit(limit), "(r.completeTime, r.id) < (?, ?)", cursor))
         for i in res:
             i['examPaper'] = {
-                'title': self.getWritingExamById(i['examPaperId'])['data']['title'],
+                'title': i.pop('title'),
             }
-            i['username'] = self.getUserInfoByID(i['userId'])['username']
-        return res
+        total = self.db.query(*query.count("essayWritingExamResult r"), one=True)['total'] if count else None
+        return self.makePage(res, limit, ['completeTime', 'id'], total)
     
     
-    def getOralExamResultList(self, filter: dict[str | typing.Any] = None) -> list[dict[str | typing.Any]]:
+    def getOralExamResultList(self, filter: dict[str | typing.Any] = None, pagination: dict[str | typing.Any] = None) -> dict[str | typing.Any]:
         """
-        Get the list of all oral exam results.
+        Get the list of all oral exam results, one page at a time from the latest one.
 
         Args:
             filter (dict[str | typing.Any], optional): The filter of the results. Defaults to None.
+            pagination (dict[str | typing.Any], optional): The pagination options, including 'cursor', 'limit' and 'count'. The cursor is made of complete time and ID. Defaults to None.
         Returns:
-            list[dict[str | typing.Any]]: The list of all oral exam results.
+            dict[str | typing.Any]: The result object with one page of oral exam results.
         """
         
         if filter is None:
             filter = {}
             
-        filterSqlCond = ''
+        query = queryBuilder.SelectQuery("oralEnglishExamResult r left join oralEnglishExamPaper p on p.id = r.examPaperId left join users u on u.id = r.userId")
         if 'userId' in filter:
-            filterSqlCond += f" and userId = {filter['userId']}"
+            query.whereEqual('r.userId', filter['userId'])
         if 'examId' in filter:
-            filterSqlCond += f" and examPaperId = {filter['examId']}"
+            query.whereEqual('r.examPaperId', filter['examId'])
         if 'completeTime' in filter:
-            filterSqlCond += f" and completeTime >= {filter['completeTime'][0]} and completeTime <= {filter['completeTime'][1]}"
+            query.whereBetween('r.completeTime', filter['completeTime'][0], filter['completeTime'][1])
         
-        res = self.db.query(f"select id, completeTime, examPaperId, userId, band from oralEnglishExamResult where 1=1 {filterSqlCond} order by completeTime desc")
+        cursor, limit, count = self.parsePagination(pagination, 2)
+        # the oral list has always carried the whole (small) paper row, keep projecting it to preserve the response shape
+        res = self.db.query(*query.select("r.id, r.completeTime, r.examPaperId, r.userId, r.band, u.username, p.id as paperId, p.userId as paperUserId, p.createTime, p.availableTime, p.expireTime, p.title, p.warmUpTopics, p.mainTopic", "r.completeTime desc, r.id desc", self.fetchLimit(limit), "(r.completeTime, r.id) < (?, ?)", cursor))
         for i in res:
-            i['examPaper'] = self.getOralExamById(i['examPaperId'])['data']
-            i['username'] = self.getUserInfoByID(i['userId'])['username']
+            paperId = i.pop('paperId')
+            paper = {
+                'id': paperId,
+                'userId': i.pop('paperUserId'),
+                'createTime': i.pop('createTime'),
+                'availableTime': i.pop('availableTime'),
+                'expireTime': i.pop('expireTime'),
+                'title': i.pop('title'),
+                'warmUpTopics': i.pop('warmUpTopics'),
+                'mainTopic': i.pop('mainTopic'),
+            }
+            if paperId is None:
+                i['examPaper'] = None
+            else:
+                paper['warmUpTopics'] = json.loads(paper['warmUpTopics'])
+                i['examPaper'] = paper
             
-        return res
+        total = self.db.query(*query.count("oralEnglishExamResult r"), one=True)['total'] if count else None
+        return self.makePage(res, limit, ['completeTime', 'id'], total)
     
     
     def triggerOverallAssessment(self, userId: int) -> dict[str | typing.Any]:
         """
         Trigger the overall assessment.
+        The assessment is rolling: the previous one is updated with the feedback of the results after the watermarks in `overallAssessmentState`,
+        at most `OVERALL_ASSESSMENT_MAX_FEEDBACKS` oldest ones of each kind, so the prompt does not grow with the history of the user.
+        The watermarks move to the last results consumed, and another assessment is queued while results are left beyond the limit.
 
         Args:
             userId (int): The ID of the user.
@@ -1501,30 +2483,98 @@ class _DataProvider:
             dict[str | typing.Any]: The result object.
         """
         import datetime
-        # get all writing exams feedback
+        user = self.db.query("select overallBand, overallPerformance from users where id = ?", (userId,), one=True)
+        if user is None:
+            return self.makeResult(False, 'User not found')
+        state = self.db.query("select readingWatermark, writingWatermark, oralWatermark from overallAssessmentState where userId = ?", (userId,), one=True) \
+            or {'readingWatermark': 0, 'writingWatermark': 0, 'oralWatermark': 0}
+
+        def newResults(table: str, columns: str, watermark: int, before: int | None = None) -> list[dict[str | typing.Any]]:
+            # the oldest results after the watermark and before the given ID
+            query = queryBuilder.SelectQuery(table).whereEqual('userId', userId).where('id > ?', watermark)
+            if before is not None:
+                query.where('id < ?', before)
+            return self.db.query(*query.select(f"id, completeTime, {columns}", "id", data.config.OVERALL_ASSESSMENT_MAX_FEEDBACKS))
+
+        writingResults = newResults('essayWritingExamResult', 'feedback', state['writingWatermark'])
+        # stop before the first reading result still waiting for its feedback, the watermark must not pass it
+        pendingReading = self.db.query("select min(id) as id from academicalPassageExamResult where userId = ? and feedbackStatus <> 'ready'", (userId,), one=True)['id']
+        readingResults = newResults('academicalPassageExamResult', 'feedback', state['readingWatermark'], pendingReading)
+        oralResults = newResults('oralEnglishExamResult', 'contentFeedback, pronounciationFeedback, overallFeedback', state['oralWatermark'])
+        if not writingResults and not readingResults and not oralResults:
+            return self.makeResult(True)
+
+        # get new writing exams feedback
         writing = "\n\n".join(f"""
 {datetime.datetime.fromtimestamp(i['completeTime']).strftime('%Y-%m-%d %H:%M:%S')}: 
 {i['feedback']}
-"""for i in self.db.query("select feedback, completeTime from essayWritingExamResult where userId = ? order by completeTime ", (userId,)))
-        # get all reading exams feedback
+"""for i in writingResults)
+        # get new reading exams feedback
         reading = "\n\n".join(f"""
 {datetime.datetime.fromtimestamp(i['completeTime']).strftime('%Y-%m-%d %H:%M:%S')}
 {i['feedback']}
-                              """for i in self.db.query("select feedback, completeTime from academicalPassageExamResult where userId = ? order by completeTime ", (userId,)))
+                              """for i in readingResults)
         oral = "\n\n".join(f"""
 {datetime.datetime.fromtimestamp(i['completeTime']).strftime('%Y-%m-%d %H:%M:%S')}
 {i['contentFeedback']}
 {i['pronounciationFeedback']}
 {i['overallFeedback']}
-                              """for i in self.db.query("select contentFeedback, pronounciationFeedback, overallFeedback, completeTime from oralEnglishExamResult where userId = ? order by completeTime ", (userId,)))
+                              """for i in oralResults)
         
         
-        # call AI to anaylyze the feedback
-        overall_band, overall_feedback = chatModel.AnalyzeOverallAssessment(writing, reading, oral)
+        # call AI to update the previous assessment with the new feedback
+        overall_band, overall_feedback = chatModel.AnalyzeOverallAssessment(
+            previous_band=user['overallBand'] if user['overallPerformance'] else '',
+            previous_assessment=user['overallPerformance'],
+            reading_feedback=reading,
+            writing_feedback=writing,
+            oral_feedback=oral)
         self.db.query("update users set overallBand = ?, overallPerformance = ? where id = ?", (overall_band, overall_feedback, userId))
+        self.db.query("insert or replace into overallAssessmentState (userId, readingWatermark, writingWatermark, oralWatermark, assessedTime) values (?,?,?,?,?)", (
+            userId,
+            readingResults[-1]['id'] if readingResults else state['readingWatermark'],
+            writingResults[-1]['id'] if writingResults else state['writingWatermark'],
+            oralResults[-1]['id'] if oralResults else state['oralWatermark'],
+            int(time.time())))
+        if max(len(writingResults), len(readingResults), len(oralResults)) == data.config.OVERALL_ASSESSMENT_MAX_FEEDBACKS:
+            # results beyond the limit may be left after the new watermarks, assess them next
+            self.jobQueue.enqueue('overallAssessment', {'userId': userId}, userId=userId)
         return self.makeResult(True)
     
     
+    def runJob(self, method: typing.Callable[..., dict[str | typing.Any]], payload: dict[str | typing.Any]) -> typing.Any:
+        """
+        Run a background job by calling a method with the payload as keyword arguments.
+
+        Args:
+            method (typing.Callable[..., dict[str | typing.Any]]): The method returning a result object.
+            payload (dict[str | typing.Any]): The keyword arguments.
+
+        Returns:
+            typing.Any: The data of the result object, stored as the job result.
+        """
+        res = method(**payload)
+        if not res['status']:
+            # let the job queue retry it
+            raise RuntimeError(res['message'])
+        return res['data']
+
+    def getJobStatus(self, jobId: int, userId: int) -> dict[str | typing.Any]:
+        """
+        Get the status of a background job.
+
+        Args:
+            jobId (int): The ID of the job.
+            userId (int): The ID of the user querying the job, who must own the job or be an administrator.
+
+        Returns:
+            dict[str | typing.Any]: The result object with the job, including its `result` once it has `succeeded`.
+        """
+        job = self.jobQueue.getJob(jobId)
+        if job is None or (job['userId'] != userId and not self.checkIfUserHasPermission(userId, 'administrator')['status']):
+            return self.makeResult(False, 'Job not found')
+        return self.makeResult(True, job)
+
     def increaseOverallAssessmentTrigger(self, userId: int) -> dict[str | typing.Any]:
         """
         Increase the overall assessment trigger of the user.
@@ -1540,7 +2590,7 @@ class _DataProvider:
         # query back
         res = self.db.query("select overallAssessmentTrigger from users where id = ?", (userId,), one=True)['overallAssessmentTrigger']
         if res % 4 == 0:
-            self.triggerOverallAssessment(userId)
+            self.jobQueue.enqueue('overallAssessment', {'userId': userId}, userId=userId)
             
         return self.makeResult(True)
     
@@ -1553,8 +2603,8 @@ class _DataProvider:
             dict[str | typing.Any]: The config of the server.
         """
         
-        res = self.db.query("select * from config limit 1", one=True)
-        return self.makeResult(True, data=res)
+        res = self.configSnapshot.data
+        return self.makeResult(True, data=dict(res) if res is not None else None)
     
     
     def updateConfig(self, chatbotName: str, chatbotPersona: str, AIDubEndpoint: str, AIDubModel: str, enableRegister: bool, googleApiKey: str):
@@ -1571,6 +2621,7 @@ class _DataProvider:
         """
         
         self.db.query("update config set chatbotName = ?, chatbotPersona = ?, AIDubEndpoint = ?, AIDubModel = ?, enableRegister = ?, googleApiKey = ?", (chatbotName, chatbotPersona, AIDubEndpoint, AIDubModel, enableRegister, googleApiKey))
+        self.reloadConfig()
         return self.makeResult(True)
 
 
@@ -19,7 +19,9 @@ import asyncio
 import livekit
 import livekit.rtc
 import google.genai
+import google.generativeai.types
 import chatModel
+import sentenceSegmenter
 import numpy
 import cv2
 import PIL.Image
@@ -31,6 +33,12 @@ import io
 
 asyncio.set_event_loop(asyncio.new_event_loop())
 
+dubBackend: typing.Callable[[str], AIDubMiddlewareAPI] = AIDubMiddlewareAPI
+"""
+Creates the AIDub clients of the oral exam sessions from the endpoint, e.g. `scriptedBackends.ScriptedDubAPI` for benchmarks.
+"""
+
+
 async def getLiveKitAPI():
     return livekit.api.LiveKitAPI(f"wss://{data.config.LIVEKIT_API_EXTERNAL_URL}", data.config.LIVEKIT_API_KEY, data.config.LIVEKIT_API_SECRET)
 
@@ -57,7 +65,7 @@ class SpeakingExaminationLLMState():
 
 class BroadcastMissionManager():
     def __init__(self):
-        self.APIInstance = AIDubMiddlewareAPI(dataProvider.DataProvider.getConfig()['data']['AIDubEndpoint'])
+        self.APIInstance = dubBackend(dataProvider.DataProvider.getConfig()['data']['AIDubEndpoint'])
         self.broadcastMissions: queue.Queue[str] = queue.Queue()
         self.readyMissions: queue.Queue[av.container.InputContainer | av.container.OutputContainer] = queue.Queue()
         self.processThread: threading.Thread = threading.Thread(target=self.processMissions, daemon=True)
@@ -82,17 +90,30 @@ class BroadcastMissionManager():
         
     def put(self, mission: str) -> None:
         print(mission)
-        mission = mission\
-                        .replace('\n', ' ')\
-                        .replace('. ', '|sep|')\
-                        .replace('? ', '|sep|')\
-                        .replace('! ', '|sep|')\
-                        .replace('  ','')
-                            
-        missions = mission.split('|sep|')
-        for m in missions:
-            self.broadcastMissions.put(m)
+        self.putStream([mission])
+
+
+    def putStream(self, chunks: typing.Iterable[str]) -> str:
+        """
+        Dub a response arriving in chunks, queueing every sentence as soon as it is complete,
+        so the first sentence is synthesized and played while the rest is still generated.
+
+        Args:
+            chunks (typing.Iterable[str]): The chunks of the response.
+
+        Returns:
+            str: The whole response.
+        """
+        segmenter = sentenceSegmenter.SentenceSegmenter()
+        response = []
+        for chunk in chunks:
+            response.append(chunk)
+            for sentence in segmenter.feed(chunk):
+                self.broadcastMissions.put(sentence)
+        for sentence in segmenter.flush():
+            self.broadcastMissions.put(sentence)
         self.broadcastMissions.put('|TRIGGER|')
+        return ''.join(response)
         
         
     def processMissions(self):
@@ -139,7 +160,7 @@ class SpeakingExaminaionVirtualExaminee():
         Hobbies: Coding, reading
         '''
         self.llm = chatModel.ChatGoogleGenerativeAI("gemini-2.0-flash-thinking-exp-01-21", 0.7, system_prompt=self.prompt)
-        self.APIInstance = AIDubMiddlewareAPI(dataProvider.DataProvider.getConfig()['data']['AIDubEndpoint'])
+        self.APIInstance = dubBackend(dataProvider.DataProvider.getConfig()['data']['AIDubEndpoint'])
         self.isInitiated = False
     
     
@@ -196,6 +217,7 @@ class SpeakingExaminationSessionBackend():
         self.audioFrameDetails = {}
         self.latestQuestion = ''
         self.automaticAnswering = False
+        self.uploadedFiles: list[google.generativeai.types.File] = []
         
         
     async def emitEvent(self, event: str, data: typing.Any) -> None:
@@ -388,6 +410,7 @@ class SpeakingExaminationSessionBackend():
         # self.bot.terminateChat()
         self.connected = False
         self.ttsManager.doCancelAllMissions()
+        threading.Thread(target=self.deleteUploadedFiles, daemon=True).start()
         logger.Logger.log('Triggering terminate session callback')
         if self.exitCallback is not None:
             self.exitCallback(self.llmStateInfo)
@@ -509,7 +532,45 @@ class SpeakingExaminationSessionBackend():
         return self.pcmToMp3(pcm)
     
 
+    async def answerPart(self, answer: bytes) -> typing.Any:
+        """
+        Make the message part of an answer recording.
+        The recording is uploaded once and referenced by URI, so the chat history does not carry the audio of every earlier answer.
+        Falls back to sending it inline if uploading is disabled or fails.
+
+        Args:
+            answer (bytes): the answer in MP3 format
+
+        Returns:
+            typing.Any: the message part
+        """
+        if data.config.ORAL_EXAM_UPLOAD_ANSWER_AUDIO:
+            try:
+                file = await asyncio.to_thread(self.llmSession.uploadFile, answer, 'audio/mp3')
+                self.uploadedFiles.append(file)
+                return file
+            except Exception as e:
+                logger.Logger.log(f'Uploading answer audio failed, sending it inline: {e!r}')
+        return {
+            'mime_type': 'audio/mp3',
+            'data': answer
+        }
+
+
+    def deleteUploadedFiles(self) -> None:
+        """
+        Delete the answer recordings uploaded during the session.
+        """
+        for file in self.uploadedFiles:
+            try:
+                self.llmSession.deleteFile(file)
+            except Exception as e:
+                logger.Logger.log(f'Deleting uploaded file {file.name} failed: {e!r}')
+        self.uploadedFiles = []
+
+
     async def chat(self):
+        # model calls and audio encoding run in worker threads, so the audio loops sharing the event loop are not stalled
         self.AWAIT_CONNECTION_TIMEOUT_CNT = 0
         while True:
             match self.llmState:
@@ -528,15 +589,14 @@ class SpeakingExaminationSessionBackend():
                 case SpeakingExaminationLLMState.PARTI_INITIATION:
                     logger.Logger.log('LLM state: PARTI_INITIATION')
                     # send system prompt
-                    resp = self.llmSession.initiate([chatModel.Prompt(data.config.PROMPT_FOR_THE_FIRST_PART_OF_ORAL_ENGLISH_EXAM, {
+                    resp = await asyncio.to_thread(self.ttsManager.putStream, self.llmSession.initiateStream([chatModel.Prompt(data.config.PROMPT_FOR_THE_FIRST_PART_OF_ORAL_ENGLISH_EXAM, {
                         'specific_topics': self.warmUpTopics
-                    })])
+                    })]))
                     self.latestQuestion = resp
                     logger.Logger.log(resp)
                     self.llmStateInfo['PartI_Conversation_Questions'].append(
                         resp
                     )
-                    self.ttsManager.put(resp)
                     await self.emitEvent('control', {
                         'event': 'next_state',
                         'data': 'PartI_Conversation'
@@ -549,9 +609,9 @@ class SpeakingExaminationSessionBackend():
                     self.llmStateInfo['PartI_Conversation_Round_Counter'] += 1
                     if self.automaticAnswering:
                         self.userAnswers.get()
-                        user_answer = self.getVirtualExamineeAnswer(self.latestQuestion)
+                        user_answer = await asyncio.to_thread(self.getVirtualExamineeAnswer, self.latestQuestion)
                     else:
-                        user_answer = self.pcmToMp3(self.userAnswers.get())
+                        user_answer = await asyncio.to_thread(self.pcmToMp3, self.userAnswers.get())
                     
                     # add to answer
                     self.llmStateInfo['PartI_Conversation_Answers'].append(
@@ -563,10 +623,7 @@ class SpeakingExaminationSessionBackend():
                             'data': 'PartII_Await_Task_Card'
                         })
                         self.llmState = SpeakingExaminationLLMState.PARTII_STUDENT_PREPARATION
-                        resp = self.llmSession.chat([{
-                            'mime_type': 'audio/mp3',
-                            'data': user_answer
-                        }, chatModel.Prompt(data.config.PROMPT_FOR_THE_SECOND_PART_OF_ORAL_ENGLISH_EXAM_1, {
+                        resp = await self.llmSession.chatAsync([await self.answerPart(user_answer), chatModel.Prompt(data.config.PROMPT_FOR_THE_SECOND_PART_OF_ORAL_ENGLISH_EXAM_1, {
                             'specific_topic': self.specificTopic
                         })])
                         self.latestQuestion = resp + "Now you can begin your speech."
@@ -588,12 +645,8 @@ class SpeakingExaminationSessionBackend():
                         })
                     else:
                         # send to AI
-                        resp = self.llmSession.chat([{
-                            'mime_type': 'audio/mp3',
-                            'data': user_answer
-                        }])
+                        resp = await asyncio.to_thread(self.ttsManager.putStream, self.llmSession.chatStream([await self.answerPart(user_answer)]))
                         self.latestQuestion = resp
-                        self.ttsManager.put(resp)
                         # add to question list
                         self.llmStateInfo['PartI_Conversation_Questions'].append(
                             resp
@@ -625,19 +678,15 @@ class SpeakingExaminationSessionBackend():
                     # get answers
                     if self.automaticAnswering:
                         self.userAnswers.get()
-                        self.llmStateInfo['PartII_Student_Statement_Answer'] = self.getVirtualExamineeAnswer(self.latestQuestion)
+                        self.llmStateInfo['PartII_Student_Statement_Answer'] = await asyncio.to_thread(self.getVirtualExamineeAnswer, self.latestQuestion)
                     else:
-                        self.llmStateInfo['PartII_Student_Statement_Answer'] = self.pcmToMp3(self.userAnswers.get())
+                        self.llmStateInfo['PartII_Student_Statement_Answer'] = await asyncio.to_thread(self.pcmToMp3, self.userAnswers.get())
                     
-                    resp = self.llmSession.chat([data.config.PROMPT_FOR_THE_SECOND_PART_OF_ORAL_ENGLISH_EXAM_2, {
-                        'mime_type': 'audio/mp3',
-                        'data': self.llmStateInfo['PartII_Student_Statement_Answer']
-                    }])
+                    resp = await asyncio.to_thread(self.ttsManager.putStream, self.llmSession.chatStream([data.config.PROMPT_FOR_THE_SECOND_PART_OF_ORAL_ENGLISH_EXAM_2, await self.answerPart(self.llmStateInfo['PartII_Student_Statement_Answer'])]))
                     self.latestQuestion = resp
                     self.llmStateInfo['PartII_Follow_Up_Questions'].append(
                         resp
                     )
-                    self.ttsManager.put(resp)
                     await self.emitEvent('control', {
                         'event': 'next_state',
                         'data': 'PartII_Follow_Up_Questioning'
@@ -655,9 +704,9 @@ class SpeakingExaminationSessionBackend():
                     # get answer
                     if self.automaticAnswering:
                         self.userAnswers.get() # drop the answer
-                        answer = self.getVirtualExamineeAnswer(self.latestQuestion)
+                        answer = await asyncio.to_thread(self.getVirtualExamineeAnswer, self.latestQuestion)
                     else:
-                        answer = self.pcmToMp3(self.userAnswers.get())
+                        answer = await asyncio.to_thread(self.pcmToMp3, self.userAnswers.get())
                         
                     # add to answer
                     self.llmStateInfo['PartII_Follow_Up_Answers'].append(
@@ -665,18 +714,14 @@ class SpeakingExaminationSessionBackend():
                     )
                     # if all rounds are done, start discussing
                     if self.llmStateInfo['PartII_Follow_Up_Round_Counter'] == 3:
-                        resp = self.llmSession.chat([
-                            {
-                                'mime_type': 'audio/mp3',
-                                'data': answer,
-                            },
+                        resp = await asyncio.to_thread(self.ttsManager.putStream, self.llmSession.chatStream([
+                            await self.answerPart(answer),
                             data.config.PROMPT_FOR_THE_THIRD_PART_OF_ORAL_ENGLISH_EXAM,
-                        ])
+                        ]))
                         self.latestQuestion = resp
                         self.llmStateInfo['PartIII_Discussion_Questions'].append(
                             resp
                         )
-                        self.ttsManager.put(resp)
                         self.llmState = SpeakingExaminationLLMState.PARTIII_DISCUSSING
                         self.llmStateInfo['PartIII_Discussion_Round_Counter'] = 0
                         await self.emitEvent('control', {
@@ -684,13 +729,9 @@ class SpeakingExaminationSessionBackend():
                             'data': 'PartIII_Discussion'
                         })
                     else:
-                        resp = self.llmSession.chat([{
-                            'mime_type': 'audio/mp3',
-                            'data': answer
-                        }])
-                        self.latestQuestion = resp
                         # send to AI
-                        self.ttsManager.put(resp)
+                        resp = await asyncio.to_thread(self.ttsManager.putStream, self.llmSession.chatStream([await self.answerPart(answer)]))
+                        self.latestQuestion = resp
                         self.llmStateInfo['PartII_Follow_Up_Questions'].append(
                             resp
                         )
@@ -710,9 +751,9 @@ class SpeakingExaminationSessionBackend():
                     # answer = self.pcmToMp3(self.userAnswers.get())
                     if self.automaticAnswering:
                         self.userAnswers.get() # drop the answer
-                        answer = self.getVirtualExamineeAnswer(self.latestQuestion)
+                        answer = await asyncio.to_thread(self.getVirtualExamineeAnswer, self.latestQuestion)
                     else:
-                        answer = self.pcmToMp3(self.userAnswers.get())
+                        answer = await asyncio.to_thread(self.pcmToMp3, self.userAnswers.get())
                         
                     # add to answer
                     self.llmStateInfo['PartIII_Discussion_Answers'].append(
@@ -724,10 +765,7 @@ class SpeakingExaminationSessionBackend():
                         await self.emitEvent('control', {
                             'event': 'await_for_analyze_result',
                         })
-                        resp = self.llmSession.chat([{
-                            'mime_type': 'audio/mp3',
-                            'data': answer
-                        }, data.config.PROMPT_FOR_ANALYZE_THE_ORAL_ENGLISH_EXAM_RESULT])
+                        resp = await self.llmSession.chatAsync([await self.answerPart(answer), data.config.PROMPT_FOR_ANALYZE_THE_ORAL_ENGLISH_EXAM_RESULT])
                         self.latestQuestion = resp
                         # parse feedback
                         feedback = resp[resp.rfind('[feedback]')+10:resp.rfind('[/feedback]')]
@@ -740,15 +778,11 @@ class SpeakingExaminationSessionBackend():
                         self.llmState = SpeakingExaminationLLMState.DISCONNECTED
                     else:
                         # start next round
-                        resp = self.llmSession.chat([{
-                            'mime_type': 'audio/mp3',
-                            'data': answer
-                        }])
+                        resp = await asyncio.to_thread(self.ttsManager.putStream, self.llmSession.chatStream([await self.answerPart(answer)]))
                         self.latestQuestion = resp
                         self.llmStateInfo['PartIII_Discussion_Questions'].append(
                             resp
                         )
-                        self.ttsManager.put(resp)
                         await self.emitEvent('control', {
                             'event': 'next_state',
                             'data': 'PartIII_Discussion'
@@ -845,56 +879,65 @@ class SpeakingExaminationSessionBackend():
 class _ExamSessionManager:
     def __init__(self):
         self.session_pool = {}
-        self.deamon: threading.Thread = threading.Thread(target=self.deamonThreadWrapper)
+        self.deamon: threading.Thread = threading.Thread(target=self.deamonThreadWrapper, daemon=True)
         self.deamon.start()
         pass
     
     
-    def finalizeReadingExamSession(self, sessionId: str) -> bool:
+    def finalizeReadingExamSession(self, sessionId: str) -> dict[str | typing.Any]:
         # remove the session from the pool
         if sessionId in self.session_pool:
             # update the exam session status in the database
             examSession = self.session_pool[sessionId]
+            # the score is returned right away, the feedback is generated in the background
             res = dataProvider.DataProvider.submitReadingExamResult(
                 userId=examSession['userId'],
                 examId=examSession['examId'],
                 completeTime=int(time.time()),
                 answerSheet=examSession['answers'],
+                examSessionId=sessionId,
             )
-            dataProvider.DataProvider.increaseOverallAssessmentTrigger(userId=examSession['userId'])
             del self.session_pool[sessionId]
             return res
     
     
-    def finalizeWritingExamSession(self, sessionId: str) -> bool:
+    def finalizeWritingExamSession(self, sessionId: str) -> dict[str | typing.Any]:
         # remove the session from the pool
         if sessionId in self.session_pool:
             # update the exam session status in the database
             examSession = self.session_pool[sessionId]
-            res = dataProvider.DataProvider.submitWritingExamResult(
-                userId=examSession['userId'],
-                examId=examSession['examId'],
-                completeTime=int(time.time()),
-                composition=examSession['answer']
-            )
-            dataProvider.DataProvider.increaseOverallAssessmentTrigger(userId=examSession['userId'])
-            del self.session_pool[sessionId]
+            # grading calls the language model, it runs in the background and the client polls the job status
+            # a busy judger keeps the session, so the client or the deamon can finalize it again later
+            res = dataProvider.DataProvider.enqueueExamResultJob('writing', {
+                'userId': examSession['userId'],
+                'examId': examSession['examId'],
+                'completeTime': int(time.time()),
+                'composition': examSession['answer'],
+                'examSessionId': sessionId,
+            }, examSession['userId'])
+            if res['status']:
+                del self.session_pool[sessionId]
             return res
         
         
-    def finalizeOralExamSession(self, sessionId: str) -> bool:
+    def finalizeOralExamSession(self, sessionId: str) -> dict[str | typing.Any]:
         # remove the session from the pool
         if sessionId in self.session_pool:
             # update the exam session status in the database
             examSession = self.session_pool[sessionId]
-            res = dataProvider.DataProvider.submitOralExamResult(
-                userId=examSession['userId'],
-                examId=examSession['examId'],
-                completeTime=int(time.time()),
-                answerDetails=examSession['answerDetails']
-            )
-            dataProvider.DataProvider.increaseOverallAssessmentTrigger(userId=examSession['userId'])
-            del self.session_pool[sessionId]
+            # grading calls the language model, it runs in the background and the client polls the job status
+            # the call is over, a busy judger keeps the session for the deamon to finalize it again later
+            res = dataProvider.DataProvider.enqueueExamResultJob('oral', {
+                'userId': examSession['userId'],
+                'examId': examSession['examId'],
+                'completeTime': int(time.time()),
+                'answerDetails': examSession['answerDetails'],
+                'examSessionId': sessionId,
+            }, examSession['userId'])
+            if res['status']:
+                del self.session_pool[sessionId]
+            else:
+                examSession['finalizePending'] = True
             return res
     
     
@@ -902,13 +945,17 @@ class _ExamSessionManager:
         logger.Logger.log('ExamSessionManager deamon thread started')
         while True:
             # check for expired sessions
-            for examSessionId, examSession in self.session_pool.items():
+            # finalizing removes sessions from the pool, and requests add them concurrently
+            for examSessionId, examSession in list(self.session_pool.items()):
                 if examSession.get('endTime') is not None and examSession['endTime'] < int(time.time()):
                     logger.Logger.log(f'ExamSession {examSessionId} expired, finalizing')
                     if examSession['type'] == 'writing':
                         self.finalizeWritingExamSession(examSessionId)
                     elif examSession['type'] =='reading':
                         self.finalizeReadingExamSession(examSessionId)
+                elif examSession.get('finalizePending'):
+                    logger.Logger.log(f'ExamSession {examSessionId} was rejected by a busy judger, finalizing again')
+                    self.finalizeOralExamSession(examSessionId)
             time.sleep(60)
     
     def createReadingExamSession(self, examId: int, userId: int) -> str:
@@ -1121,7 +1168,8 @@ class _ExamSessionManager:
         # get the details of the ongoing exam session of the user
         for examSessionId, examSession in self.session_pool.items():
             
-            if examSession['userId'] == userId and (examSession['type'] == 'oral' or examSession['endTime'] > int(time.time())):
+            # an oral session waiting to be finalized again is over for the examinee
+            if examSession['userId'] == userId and ((examSession['type'] == 'oral' and not examSession.get('finalizePending')) or (examSession['type'] != 'oral' and examSession['endTime'] > int(time.time()))):
                 return self.getSessionDetails(examSessionId)
         return None
     
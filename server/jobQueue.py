@@ -0,0 +1,208 @@
+import json
+import threading
+import time
+import typing
+import logger
+
+if typing.TYPE_CHECKING:
+    import dataProvider
+
+
+class JobQueue():
+    """
+    Durable background job queue stored in the `job` table, processed by a pool of worker threads.
+
+    A job is claimed by moving it to `running` with its `availableTime` pushed to the end of the visibility timeout.
+    A running job whose visibility timeout passed, e.g. because the server restarted while processing it, is claimed again.
+    Failed jobs are retried with exponential backoff until `maxAttempts` attempts were made.
+    """
+
+    def __init__(self, db: 'dataProvider.DatabaseObject', workers: int = 2, visibilityTimeout: int = 300, maxAttempts: int = 5,
+                 retryBackoff: int = 10, maxRetryBackoff: int = 600, pollInterval: float = 1, retention: int = 7 * 24 * 3600):
+        """
+        Args:
+            db (dataProvider.DatabaseObject): The database holding the `job` table.
+            workers (int, optional): The number of worker threads. Defaults to 2.
+            visibilityTimeout (int, optional): Seconds a claimed job stays invisible to other workers. Defaults to 300.
+            maxAttempts (int, optional): The default number of attempts of a job before it fails. Defaults to 5.
+            retryBackoff (int, optional): Seconds before the first retry, doubled on every further retry. Defaults to 10.
+            maxRetryBackoff (int, optional): The upper bound of the retry backoff in seconds. Defaults to 600.
+            pollInterval (float, optional): Seconds an idle worker waits before looking for jobs again. Defaults to 1.
+            retention (int, optional): Seconds finished jobs are kept for status queries. Defaults to 7 days.
+        """
+        self.db = db
+        self.workers = workers
+        self.visibilityTimeout = visibilityTimeout
+        self.maxAttempts = maxAttempts
+        self.retryBackoff = retryBackoff
+        self.maxRetryBackoff = maxRetryBackoff
+        self.pollInterval = pollInterval
+        self.retention = retention
+        self.handlers: dict[str, typing.Callable[[dict[str | typing.Any]], typing.Any]] = {}
+        self.finishListeners: dict[str, list[typing.Callable[[int], None]]] = {}
+        self.wakeup = threading.Condition()
+        self.threads: list[threading.Thread] = []
+        self.lastPurgeTime = 0
+
+    def register(self, kind: str, handler: typing.Callable[[dict[str | typing.Any]], typing.Any]) -> None:
+        """
+        Register the handler of a kind of jobs.
+        The handler receives the payload and returns a JSON serializable result, raising an exception makes the job retried.
+
+        Args:
+            kind (str): The kind of the jobs.
+            handler (typing.Callable[[dict[str | typing.Any]], typing.Any]): The handler.
+        """
+        self.handlers[kind] = handler
+
+    def onFinish(self, kind: str, listener: typing.Callable[[int], None]) -> None:
+        """
+        Register a callback run with the job ID whenever a job of the kind succeeded or finally failed.
+
+        Args:
+            kind (str): The kind of the jobs.
+            listener (typing.Callable[[int], None]): The callback.
+        """
+        self.finishListeners.setdefault(kind, []).append(listener)
+
+    def notifyFinished(self, kind: str, jobId: int) -> None:
+        for listener in self.finishListeners.get(kind, []):
+            try:
+                listener(jobId)
+            except Exception as e:
+                logger.Logger.log(f'Job {jobId} ({kind}) finish listener failed: {e!r}')
+
+    def enqueue(self, kind: str, payload: dict[str | typing.Any], userId: int = None, maxAttempts: int = None) -> int:
+        """
+        Add a job to the queue.
+
+        Args:
+            kind (str): The kind of the job.
+            payload (dict[str | typing.Any]): The arguments of the handler, stored as JSON.
+            userId (int, optional): The user the job belongs to, who can query its status. Defaults to None.
+            maxAttempts (int, optional): The number of attempts before the job fails. Defaults to the queue setting.
+
+        Returns:
+            int: The ID of the job.
+        """
+        now = int(time.time())
+        jobId = self.db.query("insert into job (kind, payload, userId, status, attempts, maxAttempts, availableTime, createTime, updateTime) values (?,?,?,'pending',0,?,?,?,?)",
+                              (kind, json.dumps(payload, default=lambda o: str(o)), userId, maxAttempts or self.maxAttempts, now, now, now))
+        with self.wakeup:
+            self.wakeup.notify()
+        return jobId
+
+    def countOutstanding(self, kind: str) -> int:
+        """
+        Count the pending and running jobs of a kind.
+
+        Args:
+            kind (str): The kind of the jobs.
+
+        Returns:
+            int: The number of jobs.
+        """
+        return self.db.query("select count(*) as total from job where kind = ? and status in ('pending', 'running')", (kind,), one=True)['total']
+
+    def getJob(self, jobId: int) -> dict[str | typing.Any] | None:
+        """
+        Get the status of a job.
+
+        Args:
+            jobId (int): The ID of the job.
+
+        Returns:
+            dict[str | typing.Any] | None: The job without its payload, or None if not found.
+        """
+        job = self.db.query("select id, kind, userId, status, attempts, maxAttempts, availableTime, createTime, updateTime, result, error from job where id = ?", (jobId,), one=True)
+        if job is not None and job['result'] is not None:
+            job['result'] = json.loads(job['result'])
+        return job
+
+    def claim(self) -> dict[str | typing.Any] | None:
+        """
+        Claim the next due job. The single update statement makes the claim atomic between workers.
+
+        Returns:
+            dict[str | typing.Any] | None: The claimed job, or None if no job is due.
+        """
+        now = int(time.time())
+        # running jobs which timed out on their last attempt are not retried again
+        for job in self.db.query("update job set status = 'failed', error = 'Visibility timeout expired', updateTime = ? where status = 'running' and availableTime <= ? and attempts >= maxAttempts returning id, kind",
+                                 (now, now)):
+            self.notifyFinished(job['kind'], job['id'])
+        return self.db.query("update job set status = 'running', attempts = attempts + 1, availableTime = ?, updateTime = ? "
+                             "where id = (select id from job where status in ('pending', 'running') and availableTime <= ? order by availableTime, id limit 1) "
+                             "returning id, kind, payload, attempts, maxAttempts",
+                             (now + self.visibilityTimeout, now, now), one=True)
+
+    def complete(self, job: dict[str | typing.Any], result: typing.Any) -> None:
+        # the attempt count guards against a worker finishing a job which timed out and was claimed again
+        if self.db.query("update job set status = 'succeeded', result = ?, error = null, updateTime = ? where id = ? and attempts = ? returning id",
+                         (json.dumps(result, default=lambda o: str(o)), int(time.time()), job['id'], job['attempts']), one=True) is not None:
+            self.notifyFinished(job['kind'], job['id'])
+
+    def fail(self, job: dict[str | typing.Any], error: str) -> None:
+        now = int(time.time())
+        if job['attempts'] < job['maxAttempts']:
+            backoff = min(self.retryBackoff * 2 ** (job['attempts'] - 1), self.maxRetryBackoff)
+            self.db.query("update job set status = 'pending', availableTime = ?, error = ?, updateTime = ? where id = ? and attempts = ?",
+                          (now + backoff, error, now, job['id'], job['attempts']))
+        else:
+            if self.db.query("update job set status = 'failed', error = ?, updateTime = ? where id = ? and attempts = ? returning id",
+                             (error, now, job['id'], job['attempts']), one=True) is not None:
+                self.notifyFinished(job['kind'], job['id'])
+
+    def purge(self) -> None:
+        """
+        Remove the finished jobs older than the retention period.
+        """
+        self.db.query("delete from job where status in ('succeeded', 'failed') and updateTime < ?", (int(time.time()) - self.retention,))
+
+    def runOnce(self) -> bool:
+        """
+        Claim and run one job.
+
+        Returns:
+            bool: Whether a job was run.
+        """
+        job = self.claim()
+        if job is None:
+            return False
+
+        handler = self.handlers.get(job['kind'])
+        try:
+            if handler is None:
+                raise KeyError(f'No handler registered for job kind {job["kind"]}')
+            result = handler(json.loads(job['payload']))
+        except Exception as e:
+            logger.Logger.log(f'Job {job["id"]} ({job["kind"]}) attempt {job["attempts"]} failed: {e!r}')
+            self.fail(job, repr(e))
+        else:
+            self.complete(job, result)
+        return True
+
+    def workerThreadWrapper(self):
+        logger.Logger.log(f'JobQueue worker {threading.current_thread().name} started')
+        while True:
+            try:
+                if self.runOnce():
+                    continue
+                if time.time() - self.lastPurgeTime > 3600:
+                    self.lastPurgeTime = time.time()
+                    self.purge()
+            except Exception as e:
+                logger.Logger.log(f'JobQueue worker error: {e!r}')
+            with self.wakeup:
+                self.wakeup.wait(self.pollInterval)
+
+    def start(self) -> None:
+        """
+        Start the worker threads, does nothing if they are already running.
+        """
+        if self.threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self.workerThreadWrapper, name=f'JobQueueWorker-{i}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
@@ -0,0 +1,143 @@
+import collections
+import hashlib
+import json
+import pathlib
+import sqlite3
+import threading
+import time
+import logger
+
+
+class LLMResponseCache():
+    """
+    Cache of language model responses, an in-process LRU in front of an SQLite file which survives restarts.
+
+    Entries are keyed by the hash of the model, the temperature and the normalized prompt, and expire after their TTL.
+    `lock` only guards the in-memory LRU and the counters, the SQLite file is accessed under `diskLock`, so memory hits never wait for disk IO.
+    """
+
+    def __init__(self, path: str, capacity: int):
+        """
+        Args:
+            path (str): The SQLite file of the persistent store.
+            capacity (int): The number of responses kept in memory.
+        """
+        self.path = pathlib.Path(path)
+        self.capacity = capacity
+        self.entries: collections.OrderedDict[str, tuple[float, str]] = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.diskLock = threading.Lock()
+        self.conn: sqlite3.Connection | None = None
+        self.memoryHits = 0
+        self.diskHits = 0
+        self.misses = 0
+        self.stores = 0
+        self.lastPurgeTime = 0
+
+    def connect(self) -> sqlite3.Connection:
+        # must be called with the disk lock held
+        # opened on first use, so importing the module does not touch the disk
+        if self.conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self.conn.execute('pragma journal_mode = wal').close()
+            self.conn.execute("create table if not exists llmResponse (key string primary key, response string not null, expireTime integer not null)").close()
+        return self.conn
+
+    @staticmethod
+    def normalizePrompt(prompt: str) -> str:
+        """
+        Normalize the line endings and the trailing whitespace of the prompt, which do not change its meaning.
+
+        Args:
+            prompt (str): The rendered prompt.
+
+        Returns:
+            str: The normalized prompt.
+        """
+        return '\n'.join(line.rstrip() for line in prompt.replace('\r\n', '\n').strip().split('\n'))
+
+    def makeKey(self, model: str, temperature: float, prompt: str) -> str:
+        return hashlib.sha256(json.dumps([model, temperature, self.normalizePrompt(prompt)]).encode('utf-8')).hexdigest()
+
+    def get(self, model: str, temperature: float, prompt: str) -> str | None:
+        """
+        Get the cached response of the prompt.
+
+        Args:
+            model (str): The name of the model.
+            temperature (float): The temperature of the model.
+            prompt (str): The rendered prompt.
+
+        Returns:
+            str | None: The response, or None on a miss.
+        """
+        key = self.makeKey(model, temperature, prompt)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.memoryHits += 1
+                return entry[1]
+            self.entries.pop(key, None)
+
+        try:
+            with self.diskLock:
+                row = self.connect().execute("select response, expireTime from llmResponse where key = ? and expireTime > ?", (key, int(now))).fetchone()
+        except sqlite3.Error as e:
+            logger.Logger.log(f'LLM response cache read failed: {e!r}')
+            row = None
+        with self.lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.diskHits += 1
+            # a concurrent put of the same key may be replaced by this older response, both answer the same prompt
+            self.remember(key, row[1], row[0])
+            return row[0]
+
+    def put(self, model: str, temperature: float, prompt: str, response: str, ttl: int) -> None:
+        """
+        Cache the response of the prompt.
+
+        Args:
+            model (str): The name of the model.
+            temperature (float): The temperature of the model.
+            prompt (str): The rendered prompt.
+            response (str): The response.
+            ttl (int): Seconds the response stays cached.
+        """
+        key = self.makeKey(model, temperature, prompt)
+        expireTime = int(time.time()) + ttl
+        with self.lock:
+            self.remember(key, expireTime, response)
+            self.stores += 1
+        try:
+            with self.diskLock:
+                conn = self.connect()
+                conn.execute("insert or replace into llmResponse (key, response, expireTime) values (?,?,?)", (key, response, expireTime)).close()
+                if time.time() - self.lastPurgeTime > 3600:
+                    self.lastPurgeTime = time.time()
+                    conn.execute("delete from llmResponse where expireTime <= ?", (int(time.time()),)).close()
+        except sqlite3.Error as e:
+            logger.Logger.log(f'LLM response cache write failed: {e!r}')
+
+    def remember(self, key: str, expireTime: float, response: str) -> None:
+        # must be called with the lock held
+        self.entries[key] = (expireTime, response)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> dict[str, int | float]:
+        with self.lock:
+            hits = self.memoryHits + self.diskHits
+            return {
+                'memoryHits': self.memoryHits,
+                'diskHits': self.diskHits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'hitRate': hits / (hits + self.misses) if hits + self.misses else 0.0,
+                'memorySize': len(self.entries),
+            }
@@ -0,0 +1,85 @@
+import typing
+
+
+class SelectQuery():
+    """
+    Builder of parameterized select statements used by the filtered list APIs.
+    Filter values are always bound as parameters, so the SQL text only depends on which filters are present.
+    Requests with the same filter shape therefore share one prepared statement in sqlite3's statement cache.
+    """
+
+    def __init__(self, source: str):
+        """
+        Args:
+            source (str): The table, or joined tables, to select from, e.g. `users` or `result r left join users u on u.id = r.userId`.
+        """
+        self.source = source
+        self.conditions: list[str] = []
+        self.args: list[typing.Any] = []
+
+    def where(self, condition: str, *args: typing.Any) -> 'SelectQuery':
+        """
+        Add a condition, joined to the others with `and`.
+
+        Args:
+            condition (str): The SQL condition with `?` placeholders, e.g. `userId = ?`.
+            *args (typing.Any): The values bound to the placeholders.
+
+        Returns:
+            SelectQuery: The builder itself.
+        """
+        self.conditions.append(condition)
+        self.args.extend(args)
+        return self
+
+    def whereEqual(self, column: str, value: typing.Any) -> 'SelectQuery':
+        return self.where(f'{column} = ?', value)
+
+    def whereContains(self, column: str, value: str) -> 'SelectQuery':
+        return self.where(f'{column} like ?', f'%{value}%')
+
+    def whereBetween(self, column: str, start: typing.Any, end: typing.Any) -> 'SelectQuery':
+        return self.where(f'{column} >= ? and {column} <= ?', start, end)
+
+    def whereClause(self, extra: list[str] = None) -> str:
+        conditions = self.conditions + (extra or [])
+        return f" where {' and '.join(conditions)}" if conditions else ''
+
+    def select(self, columns: str, orderBy: str = None, limit: int = None, keyset: str = None, cursor: list[typing.Any] = None) -> tuple[str, tuple]:
+        """
+        Build the select statement.
+
+        Args:
+            columns (str): The selected columns.
+            orderBy (str, optional): The `order by` expression. Defaults to None.
+            limit (int, optional): The maximum number of rows, bound as a parameter. Defaults to None.
+            keyset (str, optional): The seek condition of keyset pagination, e.g. `id > ?`, only applied when `cursor` is given. Defaults to None.
+            cursor (list[typing.Any], optional): The values bound to the seek condition. Defaults to None.
+
+        Returns:
+            tuple[str, tuple]: The SQL text and its parameters.
+        """
+        args = list(self.args)
+        extra = []
+        if keyset is not None and cursor is not None:
+            extra.append(keyset)
+            args.extend(cursor)
+        sql = f'select {columns} from {self.source}{self.whereClause(extra)}'
+        if orderBy is not None:
+            sql += f' order by {orderBy}'
+        if limit is not None:
+            sql += ' limit ?'
+            args.append(limit)
+        return sql, tuple(args)
+
+    def count(self, source: str = None) -> tuple[str, tuple]:
+        """
+        Build the statement counting every row matching the conditions, as `total`.
+
+        Args:
+            source (str, optional): The source to count from instead, e.g. without the joins which do not affect the count. Defaults to None.
+
+        Returns:
+            tuple[str, tuple]: The SQL text and its parameters.
+        """
+        return f'select count(*) as total from {source or self.source}{self.whereClause()}', tuple(self.args)
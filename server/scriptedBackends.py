@@ -0,0 +1,193 @@
+import io
+import itertools
+import json
+import pathlib
+import re
+import threading
+import time
+import typing
+import wave
+import requests
+from google.ai import generativelanguage as glm
+
+
+DEFAULT_SCRIPT: list[tuple[str, str]] = [
+    (re.escape('[task_card]'), '[task_card]Describe a place you enjoy visiting. You should say where it is, when you go there, what you do there, and explain why you enjoy it.[/task_card]'
+                               '[word_to_examinee]Here is your task card. You have one minute to prepare, and then you can begin your speech.[/word_to_examinee]'),
+    (re.escape('[answer_sheet_format]'), '[answer_sheet_format][{"type": "choice", "answer": "A", "candidateAnswers": ["A", "B", "C", "D"]}][/answer_sheet_format]'),
+    (re.escape('[feedback]'), '[feedback]The answer is well organized and mostly accurate, with a few grammatical slips. Work on linking ideas more naturally.[/feedback][band]B[/band]'),
+    ('', 'That sounds interesting. Could you tell me a little more about why you feel that way? And how often do you do it?'),
+]
+"""
+The default rules of `ScriptedModelBackend`, answering the grading prompts in the tagged format they ask for, and everything else like an examiner.
+"""
+
+
+def loadScript(path: str) -> list[tuple[str, str]]:
+    """
+    Load recorded responses from a JSON file holding a list of `{"match": pattern, "response": text}` objects.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        list[tuple[str, str]]: The rules, usable as the script of `ScriptedModelBackend`.
+    """
+    return [(rule['match'], rule['response']) for rule in json.loads(pathlib.Path(path).read_text(encoding='utf-8'))]
+
+
+class ScriptedResponse():
+    """
+    A response or a streamed chunk of a scripted model, with the attributes of `genai.types.GenerateContentResponse` the app reads.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.parts = [text] if text else []
+
+
+class ScriptedChatSession():
+    """
+    A chat session of a scripted model, behaving like `genai.ChatSession`.
+    """
+
+    def __init__(self, model: 'ScriptedGenerativeModel'):
+        self.model = model
+        self.history: list[typing.Any] = []
+
+    def send_message(self, content: typing.Any, stream: bool = False, **kwargs) -> ScriptedResponse | typing.Iterator[ScriptedResponse]:
+        response = self.model.backend.respond(content)
+        self.history.append(content)
+        if stream:
+            return self.model.backend.stream(response)
+        time.sleep(self.model.backend.latency(response))
+        return ScriptedResponse(response)
+
+
+class ScriptedGenerativeModel():
+    """
+    A scripted model, behaving like `genai.GenerativeModel`.
+    """
+
+    def __init__(self, backend: 'ScriptedModelBackend', model_name: str):
+        self.backend = backend
+        self.model_name = model_name
+
+    def start_chat(self, **kwargs) -> ScriptedChatSession:
+        return ScriptedChatSession(self)
+
+
+class ScriptedFileClient():
+    """
+    An in-memory File API, behaving like `genaiClient.FileServiceClient`. Files are active as soon as they are created.
+    """
+
+    def __init__(self):
+        self.files: dict[str, glm.File] = {}
+        self.ids = itertools.count()
+        self.lock = threading.Lock()
+
+    def create_file(self, path: typing.BinaryIO, mime_type: str | None = None, **kwargs) -> glm.File:
+        content = path.read()
+        with self.lock:
+            name = f'files/scripted-{next(self.ids)}'
+            file = glm.File(name=name, mime_type=mime_type, size_bytes=len(content), uri=f'scripted://{name}', state=glm.File.State.ACTIVE)
+            self.files[name] = file
+        return file
+
+    def get_file(self, name: str) -> glm.File:
+        return self.files[name]
+
+    def delete_file(self, name: str) -> None:
+        with self.lock:
+            self.files.pop(name, None)
+
+
+class ScriptedModelBackend():
+    """
+    A language model backend answering from a script with simulated latency, for `chatModel.modelRegistry.setBackend`.
+
+    A message is answered by the first rule whose pattern is found in its text parts.
+    The response is delivered after `firstChunkLatency`, followed by one chunk of `chunkWords` words every `chunkLatency` seconds.
+    """
+
+    def __init__(self, script: list[tuple[str, str]] | None = None, firstChunkLatency: float = 0.8, chunkLatency: float = 0.05, chunkWords: int = 8):
+        """
+        Args:
+            script (list[tuple[str, str]] | None, optional): The rules of regular expression and response. Defaults to `DEFAULT_SCRIPT`.
+            firstChunkLatency (float, optional): Seconds before the first chunk. Defaults to 0.8.
+            chunkLatency (float, optional): Seconds between two chunks. Defaults to 0.05.
+            chunkWords (int, optional): Words per chunk. Defaults to 8.
+        """
+        self.script = [(re.compile(pattern), response) for pattern, response in (script if script is not None else DEFAULT_SCRIPT)]
+        self.firstChunkLatency = firstChunkLatency
+        self.chunkLatency = chunkLatency
+        self.chunkWords = chunkWords
+        self.files = ScriptedFileClient()
+
+    def model(self, model: str, temperature: float, system_prompt: str | None, tools: list[typing.Any]) -> ScriptedGenerativeModel:
+        return ScriptedGenerativeModel(self, model)
+
+    def fileClient(self, api_key: str | None) -> ScriptedFileClient:
+        return self.files
+
+    def respond(self, content: typing.Any) -> str:
+        parts = content if isinstance(content, list) else [content]
+        text = '\n'.join(part for part in parts if isinstance(part, str))
+        for pattern, response in self.script:
+            if pattern.search(text):
+                return response
+        return ''
+
+    def chunks(self, response: str) -> list[str]:
+        words = re.findall(r'\S+\s*', response)
+        return [''.join(words[i:i + self.chunkWords]) for i in range(0, len(words), self.chunkWords)]
+
+    def latency(self, response: str) -> float:
+        return self.firstChunkLatency + self.chunkLatency * max(len(self.chunks(response)) - 1, 0)
+
+    def stream(self, response: str) -> typing.Iterator[ScriptedResponse]:
+        time.sleep(self.firstChunkLatency)
+        for index, chunk in enumerate(self.chunks(response)):
+            if index:
+                time.sleep(self.chunkLatency)
+            yield ScriptedResponse(chunk)
+
+
+class ScriptedDubAPI():
+    """
+    A text to speech backend returning silent WAV audio with simulated latency, replacing `AIDubMiddlewareAPI` through `examSessionManager.dubBackend`.
+    The audio lasts `secondsPerWord` per word of the text, and is returned after `firstByteLatency` plus `realtimeFactor` times its duration.
+    """
+
+    def __init__(self, url: str, firstByteLatency: float = 0.3, realtimeFactor: float = 0.1, secondsPerWord: float = 0.3, sampleRate: int = 16000):
+        """
+        Args:
+            url (str): The endpoint, ignored.
+            firstByteLatency (float, optional): Seconds before any audio is returned. Defaults to 0.3.
+            realtimeFactor (float, optional): Seconds of synthesis per second of audio. Defaults to 0.1.
+            secondsPerWord (float, optional): Seconds of audio per word. Defaults to 0.3.
+            sampleRate (int, optional): The sample rate of the audio. Defaults to 16000.
+        """
+        self.url = url
+        self.firstByteLatency = firstByteLatency
+        self.realtimeFactor = realtimeFactor
+        self.secondsPerWord = secondsPerWord
+        self.sampleRate = sampleRate
+
+    def dub(self, text: str, char_name: str) -> requests.models.Response:
+        duration = max(len(text.split()), 1) * self.secondsPerWord
+        time.sleep(self.firstByteLatency + self.realtimeFactor * duration)
+        with io.BytesIO() as buffer:
+            with wave.open(buffer, 'wb') as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(self.sampleRate)
+                wav.writeframes(b'\x00\x00' * int(duration * self.sampleRate))
+            content = buffer.getvalue()
+
+        response = requests.models.Response()
+        response.status_code = 200
+        response.headers['Content-Type'] = 'audio/wav'
+        response._content = content
+        return response
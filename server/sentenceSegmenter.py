@@ -0,0 +1,66 @@
+import re
+
+
+class SentenceSegmenter():
+    """
+    Incremental sentence splitter for text arriving in chunks, e.g. a streamed language model response.
+
+    A sentence ends with `.`, `?` or `!`, optionally followed by closing quotes or brackets, and then whitespace.
+    It is emitted as soon as that whitespace arrives, so it can be synthesized while the rest of the text is still generated.
+    Whitespace inside a sentence, including line breaks, is collapsed into single spaces.
+    """
+
+    boundaryPattern = re.compile(r'[.?!]+[\'")\]]*\s+')
+
+    def __init__(self):
+        self.buffer = ''
+
+    @staticmethod
+    def normalize(sentence: str) -> str:
+        return ' '.join(sentence.split())
+
+    def feed(self, chunk: str) -> list[str]:
+        """
+        Add a chunk of text.
+
+        Args:
+            chunk (str): The chunk.
+
+        Returns:
+            list[str]: The sentences completed by the chunk.
+        """
+        self.buffer += chunk
+        sentences = []
+        start = 0
+        # only the unfinished sentence stays in the buffer, so it is never scanned for long
+        for match in self.boundaryPattern.finditer(self.buffer):
+            sentence = self.normalize(self.buffer[start:match.end()])
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self) -> list[str]:
+        """
+        End the text, emitting the sentence left without a terminator.
+
+        Returns:
+            list[str]: The last sentence, or nothing if the text ended with a complete sentence.
+        """
+        sentence = self.normalize(self.buffer)
+        self.buffer = ''
+        return [sentence] if sentence else []
+
+    def split(self, text: str) -> list[str]:
+        """
+        Split a complete text into sentences.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            list[str]: The sentences.
+        """
+        return self.feed(text) + self.flush()
+